@@ -0,0 +1,290 @@
+"""
+Cache semântico de respostas.
+
+Reutiliza a resposta completa (answer, documents_used, sources) quando uma
+nova consulta tem embedding suficientemente similar ao de uma consulta já
+respondida na mesma coleção, com os mesmos parâmetros de recuperação
+(lambda_mult, k_documents, fetch_k e ef_search) e a mesma versão do corpus.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+ANSWER_CACHE_FILENAME = "answer_cache.db"
+
+# Colunas da chave adicionadas após a primeira versão do cache
+_KEY_COLUMNS = ("collection", "fetch_k", "ef_search")
+
+# Parâmetros de recuperação: (lambda_mult, k_documents, fetch_k, ef_search)
+CacheKey = Tuple[float, int, int, int]
+
+
+class SemanticAnswerCache:
+    """
+    Cache de respostas com índice NumPy em memória e persistência em SQLite.
+
+    O índice em memória guarda, por parâmetros de recuperação, a matriz de
+    embeddings normalizados das consultas respondidas na versão atual do
+    corpus; a busca é um único produto matriz-vetor. As matrizes crescem
+    geometricamente e a remoção das respostas mais antigas só avança o
+    início de cada matriz, sem reler o banco. Coleções diferentes podem
+    compartilhar o arquivo: cada instância lê e remove apenas as respostas
+    da sua coleção.
+    """
+
+    def __init__(self, db_path: str, collection: str = "", threshold: float = 0.97, max_entries: int = 10000):
+        self.db_path = db_path
+        self.collection = collection
+        self.threshold = threshold
+        self.max_entries = max_entries
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._corpus_version: Optional[int] = None
+        self._index: Dict[CacheKey, Dict[str, Any]] = {}
+        self._order: deque = deque()  # (id, chave) na ordem de inserção
+        self.hits = 0
+        self.misses = 0
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        """Cria a tabela do cache se não existir."""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    collection TEXT NOT NULL DEFAULT '',
+                    lambda_mult REAL NOT NULL,
+                    k_documents INTEGER NOT NULL,
+                    fetch_k INTEGER NOT NULL DEFAULT 0,
+                    ef_search INTEGER NOT NULL DEFAULT 0,
+                    corpus_version INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(answers)")}
+            missing = [column for column in _KEY_COLUMNS if column not in columns]
+            if missing:
+                # Respostas anteriores às colunas não têm a chave completa: descartadas
+                conn.execute("DELETE FROM answers")
+                for column in missing:
+                    default = "''" if column == "collection" else "0"
+                    column_type = "TEXT" if column == "collection" else "INTEGER"
+                    conn.execute(f"ALTER TABLE answers ADD COLUMN {column} {column_type} NOT NULL DEFAULT {default}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_collection ON answers (collection, id)")
+            conn.commit()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def make_key(lambda_mult: float, k_documents: int, fetch_k: int, ef_search: Optional[int]) -> CacheKey:
+        """Chave dos parâmetros de recuperação (ef_search None é gravado como 0)."""
+        return (float(lambda_mult), int(k_documents), int(fetch_k), int(ef_search or 0))
+
+    def _ensure_version(self, corpus_version: int) -> bool:
+        """
+        Carrega o índice da versão do corpus, descartando entradas de versões anteriores.
+
+        Returns:
+            False se a versão é anterior à já carregada (o índice não volta atrás)
+        """
+        if self._corpus_version is not None and corpus_version < self._corpus_version:
+            return False
+        if self._corpus_version != corpus_version:
+            self._load(corpus_version)
+        return True
+
+    def _load(self, corpus_version: int):
+        """Lê do banco as respostas da versão (as de versões mais novas são mantidas)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM answers WHERE collection = ? AND corpus_version < ?",
+                         (self.collection, corpus_version))
+            conn.commit()
+            rows = conn.execute("""
+                SELECT id, lambda_mult, k_documents, fetch_k, ef_search, embedding FROM answers
+                WHERE collection = ? AND corpus_version = ? ORDER BY id
+            """, (self.collection, corpus_version)).fetchall()
+
+        self._index = {}
+        self._order = deque()
+        for row_id, lambda_mult, k_documents, fetch_k, ef_search, blob in rows:
+            key = self.make_key(lambda_mult, k_documents, fetch_k, ef_search)
+            self._append(key, row_id, np.frombuffer(blob, dtype=np.float32))
+        self._corpus_version = corpus_version
+
+    def _append(self, key: CacheKey, row_id: int, vector: np.ndarray):
+        """
+        Adiciona um embedding ao índice em memória.
+
+        Cada grupo guarda a matriz (capacidade pré-alocada), os IDs alinhados
+        às linhas e o intervalo [start, size) das linhas vivas. Sem espaço,
+        as linhas vivas são copiadas para uma matriz com o dobro do tamanho.
+        """
+        group = self._index.get(key)
+        if group is None or group["matrix"].shape[1] != vector.shape[0]:
+            group = self._index[key] = {
+                "ids": [], "matrix": np.empty((16, vector.shape[0]), dtype=np.float32), "start": 0, "size": 0
+            }
+        if group["size"] == group["matrix"].shape[0]:
+            live = group["size"] - group["start"]
+            matrix = np.empty((max(16, 2 * live), vector.shape[0]), dtype=np.float32)
+            matrix[:live] = group["matrix"][group["start"]:group["size"]]
+            group.update(ids=group["ids"][group["start"]:], matrix=matrix, start=0, size=live)
+        group["matrix"][group["size"]] = vector
+        group["ids"].append(row_id)
+        group["size"] += 1
+        self._order.append((row_id, key))
+
+    def lookup(self, query_embedding: List[float], lambda_mult: float, k_documents: int, fetch_k: int,
+               ef_search: Optional[int], corpus_version: int) -> Optional[Dict[str, Any]]:
+        """
+        Procura uma resposta para uma consulta similar.
+
+        Args:
+            query_embedding: Embedding da consulta
+            lambda_mult: Parâmetro de MMR usado na recuperação
+            k_documents: Número de documentos usado na recuperação
+            fetch_k: Candidatos buscados antes do MMR
+            ef_search: ef_search da consulta (None: o da coleção)
+            corpus_version: Versão atual do corpus
+
+        Returns:
+            Resultado armazenado (com "similarity"), ou None
+        """
+        key = self.make_key(lambda_mult, k_documents, fetch_k, ef_search)
+        with self._lock:
+            entry = self._index.get(key) if self._ensure_version(corpus_version) else None
+            vector = self._normalize(query_embedding)
+            if entry is None or entry["size"] == entry["start"] or entry["matrix"].shape[1] != vector.shape[0]:
+                self.misses += 1
+                return None
+            similarities = entry["matrix"][entry["start"]:entry["size"]] @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            row_id = entry["ids"][entry["start"] + best]
+            self.hits += 1
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM answers WHERE id = ?", (row_id,)).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row[0])
+        result["similarity"] = similarity
+        return result
+
+    def store(self, query: str, query_embedding: List[float], lambda_mult: float, k_documents: int,
+              fetch_k: int, ef_search: Optional[int], corpus_version: int, result: Dict[str, Any]):
+        """
+        Armazena a resposta de uma consulta.
+
+        Args:
+            query: Pergunta original
+            query_embedding: Embedding da consulta
+            lambda_mult: Parâmetro de MMR usado na recuperação
+            k_documents: Número de documentos usado na recuperação
+            fetch_k: Candidatos buscados antes do MMR
+            ef_search: ef_search da consulta (None: o da coleção)
+            corpus_version: Versão do corpus lida antes da recuperação; respostas
+                de versões anteriores à atual do cache são ignoradas
+            result: Dicionário com answer, documents_used e sources
+        """
+        key = self.make_key(lambda_mult, k_documents, fetch_k, ef_search)
+        vector = self._normalize(query_embedding)
+        payload = json.dumps(
+            {name: result[name] for name in ("answer", "documents_used", "sources")},
+            ensure_ascii=False
+        )
+        with self._lock:
+            if not self._ensure_version(corpus_version):
+                return
+            with self._connect() as conn:
+                cursor = conn.execute("""
+                    INSERT INTO answers (collection, lambda_mult, k_documents, fetch_k, ef_search, corpus_version,
+                                         query, embedding, result, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (self.collection, *key, corpus_version, query, vector.tobytes(), payload, time.time()))
+                row_id = cursor.lastrowid
+                conn.commit()
+
+            self._append(key, row_id, vector)
+            if self.entries > self.max_entries:
+                self._evict_oldest(self.entries - self.max_entries)
+
+    def _evict_oldest(self, count: int):
+        """
+        Remove as respostas mais antigas (chamado com o lock adquirido).
+
+        Em memória, só o início do grupo de cada resposta avança; no banco,
+        as linhas são apagadas em um único DELETE.
+        """
+        evicted = []
+        while self._order and len(evicted) < count:
+            row_id, key = self._order.popleft()
+            group = self._index.get(key)
+            if group is not None and group["start"] < group["size"] and group["ids"][group["start"]] == row_id:
+                group["start"] += 1
+                if group["start"] == group["size"]:
+                    del self._index[key]
+            evicted.append(row_id)
+        if evicted:
+            placeholders = ",".join("?" * len(evicted))
+            with self._connect() as conn:
+                conn.execute(f"DELETE FROM answers WHERE id IN ({placeholders})", evicted)
+                conn.commit()
+
+    def invalidate(self, corpus_version: Optional[int] = None):
+        """
+        Invalida o cache após mudança no corpus.
+
+        Args:
+            corpus_version: Nova versão do corpus (None remove tudo)
+        """
+        with self._lock:
+            if corpus_version is None:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM answers WHERE collection = ?", (self.collection,))
+                    conn.commit()
+                self._index = {}
+                self._order = deque()
+                self._corpus_version = None
+            else:
+                self._ensure_version(corpus_version)
+
+    @property
+    def entries(self) -> int:
+        """Número de respostas da versão atual do corpus."""
+        return sum(entry["size"] - entry["start"] for entry in self._index.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores do cache de respostas."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": self.entries,
+            "threshold": self.threshold,
+            "corpus_version": self._corpus_version
+        }
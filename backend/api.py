@@ -4,12 +4,14 @@ API FastAPI para o sistema de busca de documentos.
 
 import os
 import sys
+import json
 from typing import Optional
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, status, Depends, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, status, Depends, File, UploadFile, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
@@ -19,6 +21,12 @@ from config import *
 from models import (
     LoadDocumentRequest,
     LoadDocumentResponse,
+    SyncDirectoryRequest,
+    SyncDirectoryResponse,
+    BulkIngestRequest,
+    BulkIngestResponse,
+    IngestionJobResponse,
+    IngestionJobListResponse,
     QueryRequest,
     QueryResponse,
     HealthResponse,
@@ -32,7 +40,10 @@ from models import (
     UserResponse,
     LogoutResponse
 )
-from document_service import DocumentService
+from chunking import CHUNKING_STRATEGIES
+from document_service import DocumentService, resolve_document_files
+from ingestion_jobs import IngestionJobStore, IngestionQueue
+from uploads import spool_upload, discard_upload, UploadTooLargeError, UnsupportedUploadError
 from auth import (
     verify_token,
     get_current_user,
@@ -51,18 +62,25 @@ load_dotenv()
 
 # Instância global do serviço de documentos
 document_service: Optional[DocumentService] = None
+ingestion_queue: Optional[IngestionQueue] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerencia o ciclo de vida da aplicação."""
-    global document_service
+    global document_service, ingestion_queue
     
     # Inicialização
     print("🚀 Inicializando API de busca de documentos...")
     try:
         document_service = DocumentService()
-        print("✅ Serviço de documentos inicializado com sucesso!")
+        pipelines = document_service.compile_pipelines()
+        print(f"✅ Serviço de documentos inicializado com sucesso! ({pipelines} pipeline(s) de consulta)")
+        ingestion_queue = IngestionQueue(
+            document_service, IngestionJobStore.for_directory(document_service.persist_directory)
+        )
+        resumed = await ingestion_queue.start()
+        print(f"✅ Fila de ingestão iniciada ({resumed} job(s) retomado(s))")
     except Exception as e:
         print(f"❌ Erro ao inicializar serviço: {e}")
         sys.exit(1)
@@ -71,6 +89,10 @@ async def lifespan(app: FastAPI):
     
     # Limpeza
     print("🔄 Finalizando API...")
+    if ingestion_queue:
+        await ingestion_queue.stop()
+    if document_service:
+        document_service.close()
 
 
 # Criar aplicação FastAPI
@@ -133,6 +155,30 @@ async def health_check():
     )
 
 
+def validate_chunking(chunking: Optional[str]):
+    """Rejeita estratégias de chunking desconhecidas (campos de formulário)."""
+    if chunking is not None and chunking not in CHUNKING_STRATEGIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Estratégia de chunking inválida. Use uma de: {', '.join(CHUNKING_STRATEGIES)}"
+        )
+
+
+async def receive_upload(file: UploadFile) -> dict:
+    """Grava o upload em disco (em blocos) e converte erros em respostas HTTP."""
+    try:
+        return await spool_upload(file)
+    except UnsupportedUploadError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao salvar arquivo temporário: {str(e)}"
+        )
+
+
 @app.post("/documents/load", response_model=LoadDocumentResponse)
 async def load_document(
     request: LoadDocumentRequest,
@@ -144,6 +190,7 @@ async def load_document(
     - **file_path**: Caminho para o arquivo a ser carregado
     - **chunk_size**: Tamanho dos chunks de texto (opcional)
     - **chunk_overlap**: Sobreposição entre chunks (opcional)
+    - **chunking**: "characters" ou "tokens" (opcional)
     """
     try:
         if not os.path.exists(request.file_path):
@@ -153,16 +200,22 @@ async def load_document(
             )
         
         # Carregar documento usando o serviço
-        documents_count = await document_service.load_document(
+        result = await document_service.load_document(
             file_path=request.file_path,
             chunk_size=request.chunk_size,
-            chunk_overlap=request.chunk_overlap
+            chunk_overlap=request.chunk_overlap,
+            chunking=request.chunking
         )
         
         return LoadDocumentResponse(
             success=True,
             message=f"Documento '{request.file_path}' carregado com sucesso!",
-            documents_count=documents_count
+            documents_count=result["documents_count"],
+            inserted_count=result["inserted"],
+            skipped_count=result["skipped"],
+            deleted_count=result["deleted"],
+            status=result["status"],
+            peak_rss_mb=result["peak_rss_mb"]
         )
         
     except HTTPException:
@@ -174,6 +227,237 @@ async def load_document(
         )
 
 
+@app.post("/documents/sync", response_model=SyncDirectoryResponse)
+async def sync_directory(
+    request: SyncDirectoryRequest,
+    current_user: dict = Depends(require_write_permission)
+):
+    """
+    Sincroniza um diretório com o banco de dados vetorial.
+    
+    Apenas arquivos novos ou alterados são processados; arquivos removidos
+    do diretório têm seus chunks apagados.
+    
+    - **directory**: Diretório com os documentos
+    - **chunk_size**: Tamanho dos chunks de texto (opcional)
+    - **chunk_overlap**: Sobreposição entre chunks (opcional)
+    - **chunking**: "characters" ou "tokens" (opcional)
+    - **recursive**: Incluir subdiretórios (opcional)
+    """
+    try:
+        if not os.path.isdir(request.directory):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Diretório não encontrado: {request.directory}"
+            )
+        
+        report = await document_service.sync_directory(
+            directory=request.directory,
+            chunk_size=request.chunk_size,
+            chunk_overlap=request.chunk_overlap,
+            recursive=request.recursive,
+            chunking=request.chunking
+        )
+        
+        return SyncDirectoryResponse(
+            success=not report["failed"],
+            message=(
+                f"Sincronização concluída: {len(report['added'])} novos, "
+                f"{len(report['updated'])} alterados, {len(report['removed'])} removidos"
+            ),
+            added=report["added"],
+            updated=report["updated"],
+            unchanged=report["unchanged"],
+            removed=report["removed"],
+            failed=report["failed"],
+            inserted_count=report["inserted"],
+            deleted_count=report["deleted"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro interno ao sincronizar diretório: {str(e)}"
+        )
+
+
+@app.post("/documents/bulk", response_model=BulkIngestResponse)
+async def bulk_ingest(
+    request: BulkIngestRequest,
+    current_user: dict = Depends(require_write_permission)
+):
+    """
+    Carrega vários documentos de uma vez, em paralelo.
+    
+    Os arquivos vêm de um diretório, de um padrão glob e/ou de uma lista
+    explícita (manifesto). Os embeddings de todos os arquivos são agrupados
+    nas mesmas requisições ao provedor.
+    
+    - **directory**: Diretório com os documentos (opcional)
+    - **pattern**: Padrão glob, ex.: "docs/**/*.pdf" (opcional)
+    - **files**: Lista de arquivos (opcional)
+    - **recursive**: Incluir subdiretórios do diretório (opcional)
+    - **chunk_size**, **chunk_overlap**, **chunking**: Parâmetros de chunking (opcionais)
+    - **force**: Reprocessar arquivos inalterados (opcional)
+    - **workers**: Arquivos processados simultaneamente (opcional)
+    """
+    if not (request.directory or request.pattern or request.files):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe directory, pattern ou files"
+        )
+    try:
+        paths = await run_in_threadpool(
+            resolve_document_files, request.directory, request.pattern, request.files, request.recursive
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(paths) > BULK_INGEST_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Muitos arquivos ({len(paths)}); o máximo por requisição é {BULK_INGEST_MAX_FILES}"
+        )
+    
+    try:
+        report = await document_service.bulk_load(
+            paths,
+            chunk_size=request.chunk_size,
+            chunk_overlap=request.chunk_overlap,
+            chunking=request.chunking,
+            force=request.force,
+            workers=request.workers
+        )
+        
+        loaded = len(report["added"]) + len(report["updated"])
+        return BulkIngestResponse(
+            success=not report["failed"],
+            message=(
+                f"Ingestão concluída: {loaded} carregados, {len(report['unchanged'])} inalterados, "
+                f"{len(report['failed'])} com erro"
+            ),
+            files=report["files"],
+            added=report["added"],
+            updated=report["updated"],
+            unchanged=report["unchanged"],
+            failed=report["failed"],
+            inserted_count=report["inserted"],
+            skipped_count=report["skipped"],
+            deleted_count=report["deleted"],
+            embedded_tokens=report["embedded_tokens"],
+            seconds=report["seconds"],
+            chunks_per_second=report["chunks_per_second"]
+        )
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro interno na ingestão em massa: {str(e)}"
+        )
+
+
+@app.post("/documents/jobs", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_document(
+    request: LoadDocumentRequest,
+    current_user: dict = Depends(require_write_permission)
+):
+    """
+    Enfileira a ingestão de um documento e retorna o job imediatamente.
+    
+    Acompanhe o progresso em `GET /documents/jobs/{job_id}`.
+    
+    - **file_path**: Caminho para o arquivo a ser carregado
+    - **chunk_size**: Tamanho dos chunks de texto (opcional)
+    - **chunk_overlap**: Sobreposição entre chunks (opcional)
+    - **chunking**: "characters" ou "tokens" (opcional)
+    """
+    if not os.path.exists(request.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Arquivo não encontrado: {request.file_path}"
+        )
+    
+    try:
+        job = await ingestion_queue.enqueue(
+            request.file_path,
+            chunk_size=request.chunk_size,
+            chunk_overlap=request.chunk_overlap,
+            chunking=request.chunking
+        )
+        return IngestionJobResponse(**job)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao enfileirar documento: {str(e)}"
+        )
+
+
+@app.post("/documents/jobs/upload", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_upload(
+    file: UploadFile = File(...),
+    chunk_size: Optional[int] = Form(None),
+    chunk_overlap: Optional[int] = Form(None),
+    chunking: Optional[str] = Form(None),
+    current_user: dict = Depends(require_write_permission)
+):
+    """Enfileira a ingestão de um arquivo enviado e retorna o job imediatamente."""
+    validate_chunking(chunking)
+    
+    # Cada job tem sua própria cópia; o documento é indexado pelo nome original e pelo hash
+    upload = await receive_upload(file)
+    
+    try:
+        job = await ingestion_queue.enqueue(
+            upload["path"],
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            chunking=chunking,
+            source=upload["source"],
+            display_name=upload["filename"],
+            cleanup=True
+        )
+        return IngestionJobResponse(**job)
+    except Exception as e:
+        discard_upload(upload)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao enfileirar upload: {str(e)}"
+        )
+
+
+@app.get("/documents/jobs", response_model=IngestionJobListResponse)
+async def list_ingestion_jobs(
+    status_filter: Optional[str] = Query(None, alias="status", description="Filtrar por status"),
+    offset: int = Query(0, ge=0, description="Posição inicial da página"),
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de jobs"),
+    current_user: dict = Depends(require_read_permission)
+):
+    """Lista os jobs de ingestão, do mais recente para o mais antigo."""
+    page = await run_in_threadpool(
+        ingestion_queue.store.list_jobs, status=status_filter, offset=offset, limit=limit
+    )
+    return IngestionJobListResponse(
+        jobs=[IngestionJobResponse(**job) for job in page["jobs"]],
+        total=page["total"]
+    )
+
+
+@app.get("/documents/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: str,
+    current_user: dict = Depends(require_read_permission)
+):
+    """Retorna o status, o progresso por etapa e a vazão de um job de ingestão."""
+    job = await run_in_threadpool(ingestion_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job não encontrado: {job_id}"
+        )
+    return IngestionJobResponse(**job)
+
+
 @app.post("/query", response_model=QueryResponse)
 async def query_documents(
     request: QueryRequest,
@@ -185,27 +469,32 @@ async def query_documents(
     - **query**: Pergunta ou consulta a ser executada
     - **lambda_mult**: Parâmetro para Max Marginal Relevance Search (opcional)
     - **k_documents**: Número de documentos a retornar (opcional)
+    - **ef_search**: Candidatos explorados no índice HNSW; só aumenta o ef_search da coleção (mais recall e
+      mais latência); valores até o da coleção não têm efeito (opcional)
     """
     try:
         # Verificar se há documentos carregados
-        if not document_service.has_documents():
+        if not await document_service.run_blocking(document_service.has_documents):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Nenhum documento carregado. Execute primeiro POST /documents/load"
             )
         
         # Executar consulta
-        answer, documents_used = await document_service.query_documents(
+        result = await document_service.query_documents(
             query=request.query,
             lambda_mult=request.lambda_mult,
-            k_documents=request.k_documents
+            k_documents=request.k_documents,
+            ef_search=request.ef_search
         )
         
         return QueryResponse(
             success=True,
             query=request.query,
-            answer=answer,
-            documents_used=documents_used
+            answer=result["answer"],
+            documents_used=result["documents_used"],
+            sources=result["sources"],
+            cached=result.get("cached", False)
         )
         
     except HTTPException:
@@ -217,6 +506,49 @@ async def query_documents(
         )
 
 
+def format_sse_event(event: dict) -> str:
+    """Serializa um evento do pipeline no formato Server-Sent Events."""
+    data = json.dumps(event["data"], ensure_ascii=False)
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
+@app.post("/query/stream")
+async def query_documents_stream(
+    request: QueryRequest,
+    current_user: dict = Depends(require_read_permission)
+):
+    """
+    Executa uma consulta com resposta em streaming (Server-Sent Events).
+    
+    Eventos emitidos, nesta ordem:
+    
+    - **documents**: chunks recuperados (documents_used e sources)
+    - **token**: pedaços da resposta à medida que o modelo os gera
+    - **done**: resposta completa e tempos de recuperação/geração
+    - **error**: emitido no lugar dos anteriores em caso de falha
+    """
+    if not await document_service.run_blocking(document_service.has_documents):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nenhum documento carregado. Execute primeiro POST /documents/load"
+        )
+    
+    async def event_stream():
+        async for event in document_service.stream_query(
+            query=request.query,
+            lambda_mult=request.lambda_mult,
+            k_documents=request.k_documents,
+            ef_search=request.ef_search
+        ):
+            yield format_sse_event(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/documents/status")
 async def get_documents_status(
     current_user: dict = Depends(require_read_permission)
@@ -227,7 +559,19 @@ async def get_documents_status(
         return {
             "has_documents": status_info["has_documents"],
             "documents_count": status_info.get("documents_count", 0),
+            "files_count": status_info.get("files_count", 0),
+            "total_tokens": status_info.get("total_tokens", 0),
+            "total_bytes": status_info.get("total_bytes", 0),
+            "embedding_model": status_info.get("embedding_model"),
+            "embedding_profile": status_info.get("embedding_profile"),
+            "embedding_dimensions": status_info.get("embedding_dimensions"),
+            "collection": status_info.get("collection"),
             "last_loaded": status_info.get("last_loaded"),
+            "embedding_cache": status_info.get("embedding_cache"),
+            "embedding_executor": status_info.get("embedding_executor"),
+            "vector_store": status_info.get("vector_store"),
+            "lexical_index": status_info.get("lexical_index"),
+            "answer_cache": status_info.get("answer_cache"),
             "database_path": PERSIST_DIRECTORY
         }
     except Exception as e:
@@ -237,68 +581,67 @@ async def get_documents_status(
         )
 
 
+@app.get("/documents/stats")
+async def get_documents_stats(
+    offset: int = Query(0, ge=0, description="Posição inicial da página"),
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de arquivos"),
+    current_user: dict = Depends(require_read_permission)
+):
+    """
+    Retorna estatísticas exatas por arquivo (chunks, tokens, bytes, última ingestão).
+    
+    - **offset**: Posição inicial da página
+    - **limit**: Número máximo de arquivos por página
+    """
+    try:
+        return await run_in_threadpool(document_service.get_document_stats, offset=offset, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao obter estatísticas: {str(e)}"
+        )
+
+
 @app.post("/documents/upload")
 async def upload_document(
     file: UploadFile = File(...),
-    chunk_size: int = Form(600),
-    chunk_overlap: int = Form(200),
+    chunk_size: Optional[int] = Form(None),
+    chunk_overlap: Optional[int] = Form(None),
+    chunking: Optional[str] = Form(None),
     current_user: dict = Depends(require_write_permission)
 ):
     """Carrega um documento via upload de arquivo."""
     try:
-        # Verificar se o arquivo é válido
-        if not file.filename:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Nome do arquivo não fornecido"
-            )
+        validate_chunking(chunking)
         
-        # Verificar extensão do arquivo
-        allowed_extensions = ['.txt', '.pdf', '.docx', '.md']
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        if file_extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Tipo de arquivo não suportado. Tipos permitidos: {', '.join(allowed_extensions)}"
-            )
-        
-        # Criar diretório temporário se não existir
-        temp_dir = "temp_uploads"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Salvar arquivo temporariamente
-        temp_file_path = os.path.join(temp_dir, file.filename)
+        # Gravar o arquivo em disco em blocos, com nome único e hash calculado no caminho
+        upload = await receive_upload(file)
         
-        # Garantir que o arquivo seja salvo corretamente
         try:
-            with open(temp_file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-                buffer.flush()  # Garantir que os dados sejam escritos
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao salvar arquivo temporário: {str(e)}"
-            )
-        
-        try:
-            # Carregar documento usando o serviço
+            # Carregar documento usando o serviço (indexado pelo nome original e pelo hash)
             result = await document_service.load_document(
-                file_path=temp_file_path,
+                file_path=upload["path"],
                 chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap
+                chunk_overlap=chunk_overlap,
+                chunking=chunking,
+                source=upload["source"],
+                content_hash=upload["sha256"]
             )
             
             return LoadDocumentResponse(
                 success=True,
-                message=f"Documento '{file.filename}' carregado com sucesso!",
-                documents_count=result
+                message=f"Documento '{upload['filename']}' carregado com sucesso!",
+                documents_count=result["documents_count"],
+                inserted_count=result["inserted"],
+                skipped_count=result["skipped"],
+                deleted_count=result["deleted"],
+                status=result["status"],
+                peak_rss_mb=result["peak_rss_mb"]
             )
             
         finally:
             # Limpar arquivo temporário
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+            discard_upload(upload)
         
     except HTTPException:
         raise
@@ -326,62 +669,15 @@ async def test_upload(
 ):
     """Endpoint de teste para upload de arquivos."""
     try:
-        # Verificar se o arquivo é válido
-        if not file.filename:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Nome do arquivo não fornecido"
-            )
-        
-        # Verificar extensão do arquivo
-        allowed_extensions = ['.txt', '.pdf', '.docx', '.md']
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        if file_extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Tipo de arquivo não suportado. Tipos permitidos: {', '.join(allowed_extensions)}"
-            )
-        
-        # Criar diretório temporário se não existir
-        temp_dir = "temp_uploads"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Salvar arquivo temporariamente
-        temp_file_path = os.path.join(temp_dir, file.filename)
-        
-        # Garantir que o arquivo seja salvo corretamente
-        try:
-            with open(temp_file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-                buffer.flush()
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao salvar arquivo temporário: {str(e)}"
-            )
-        
-        # Verificar se o arquivo foi salvo
-        if not os.path.exists(temp_file_path):
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Arquivo não foi salvo corretamente"
-            )
-        
-        # Verificar tamanho do arquivo
-        file_size = os.path.getsize(temp_file_path)
-        
-        # Limpar arquivo temporário
-        try:
-            os.remove(temp_file_path)
-        except:
-            pass
+        upload = await receive_upload(file)
+        discard_upload(upload)
         
         return {
             "success": True,
-            "message": f"Arquivo '{file.filename}' recebido com sucesso!",
-            "file_size": file_size,
-            "file_extension": file_extension,
+            "message": f"Arquivo '{upload['filename']}' recebido com sucesso!",
+            "file_size": upload["size"],
+            "file_extension": os.path.splitext(upload["filename"])[1].lower(),
+            "sha256": upload["sha256"],
             "user": current_user.get("name", "Unknown")
         }
         
@@ -412,7 +708,7 @@ async def list_valid_tokens(
 async def login(request: LoginRequest):
     """Realiza login do usuário."""
     try:
-        result = db_manager.authenticate_user(request.email, request.password)
+        result = await run_in_threadpool(db_manager.authenticate_user, request.email, request.password)
         return AuthResponse(**result)
     except Exception as e:
         raise HTTPException(
@@ -425,7 +721,8 @@ async def login(request: LoginRequest):
 async def register(request: RegisterRequest):
     """Registra um novo usuário."""
     try:
-        result = db_manager.create_user(
+        result = await run_in_threadpool(
+            db_manager.create_user,
             name=request.name,
             email=request.email,
             password=request.password,
@@ -461,7 +758,7 @@ async def logout(
     try:
         token = current_user.get("token")
         if token:
-            result = db_manager.logout_user(token)
+            result = await run_in_threadpool(db_manager.logout_user, token)
             return LogoutResponse(**result)
         else:
             return LogoutResponse(
@@ -509,7 +806,7 @@ async def list_users(
 ):
     """Lista todos os usuários (apenas para administradores)."""
     try:
-        users = db_manager.get_all_users()
+        users = await run_in_threadpool(db_manager.get_all_users)
         return UserListResponse(
             success=True,
             users=users
@@ -529,7 +826,8 @@ async def update_user(
 ):
     """Atualiza um usuário (apenas para administradores)."""
     try:
-        result = db_manager.update_user(
+        result = await run_in_threadpool(
+            db_manager.update_user,
             user_id=user_id,
             name=request.name,
             email=request.email,
@@ -564,7 +862,7 @@ async def delete_user(
 ):
     """Remove um usuário (apenas para administradores)."""
     try:
-        result = db_manager.delete_user(user_id)
+        result = await run_in_threadpool(db_manager.delete_user, user_id)
         
         if result["success"]:
             return UserResponse(
@@ -0,0 +1,78 @@
+"""
+Benchmark da seleção MMR: langchain (laço em Python) vs mmr.py (vetorizado).
+
+Uso:
+    python bench_mmr.py [--dims 3072] [--repeats 5]
+
+Para cada combinação de k e fetch_k são gerados candidatos aleatórios
+agrupados (imitando chunks parecidos de um mesmo documento), medido o tempo
+médio de seleção de cada implementação e conferido se os índices escolhidos
+são os mesmos.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_community.vectorstores.utils import maximal_marginal_relevance as langchain_mmr
+
+from config import LAMBDA_MULT
+from mmr import maximal_marginal_relevance
+
+
+K_VALUES = [4, 10, 20, 50]
+FETCH_K_VALUES = [20, 100, 500, 1000]
+
+
+def make_candidates(fetch_k: int, dims: int, rng) -> np.ndarray:
+    """Candidatos em grupos ao redor de alguns centros (muitos quase duplicados)."""
+    centers = rng.standard_normal((max(1, fetch_k // 10), dims))
+    candidates = centers[rng.integers(0, len(centers), fetch_k)] + 0.3 * rng.standard_normal((fetch_k, dims))
+    return candidates.astype(np.float32)
+
+
+def timed(function, repeats: int):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - started) / repeats, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da seleção MMR")
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--lambda-mult", type=float, default=LAMBDA_MULT)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"📐 {args.dims} dimensões, lambda_mult={args.lambda_mult}, média de {args.repeats} execuções\n")
+    print(f"{'k':>4}{'fetch_k':>9}{'langchain ms':>15}{'vetorizado ms':>15}{'ganho':>9}{'iguais':>8}")
+
+    for fetch_k in FETCH_K_VALUES:
+        candidates = make_candidates(fetch_k, args.dims, rng)
+        # O Chroma devolve os embeddings como lista de arrays
+        candidate_list = list(candidates)
+        query = candidates[0] + rng.standard_normal(args.dims).astype(np.float32)
+        for k in K_VALUES:
+            if k > fetch_k:
+                continue
+            before, expected = timed(
+                lambda: langchain_mmr(query, candidate_list, lambda_mult=args.lambda_mult, k=k), args.repeats
+            )
+            after, selected = timed(
+                lambda: maximal_marginal_relevance(query, candidate_list, lambda_mult=args.lambda_mult, k=k),
+                args.repeats
+            )
+            same = "sim" if selected == expected else "não"
+            print(f"{k:>4}{fetch_k:>9}{before * 1000:>15.2f}{after * 1000:>15.2f}{before / after:>8.1f}x{same:>8}")
+
+
+if __name__ == "__main__":
+    main()
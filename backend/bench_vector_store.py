@@ -0,0 +1,206 @@
+"""
+Benchmark do armazenamento vetorial: Chroma (HNSW, float32) vs coleção
+compacta (quantizada) vs coleção exata (float32 em memmap, força bruta).
+
+Uso:
+    python bench_vector_store.py [--scale N] [--dims D] [--queries Q] [--k K] [--openai]
+
+Os chunks de historia.txt (600/200 caracteres) são replicados com ruído até
+o tamanho desejado (--scale cópias). Para cada configuração são medidos o
+tempo de carga (inserção + construção do índice), o tamanho em disco, a
+memória residente dos vetores, a latência das consultas e o recall@k em
+relação à busca exata em float32.
+
+Sem --openai, os embeddings são gerados localmente por projeção aleatória
+de palavras (hashing), com energia decrescente ao longo das dimensões para
+imitar modelos Matryoshka; os números de truncamento são indicativos e
+devem ser confirmados com text-embedding-3-large (--openai).
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+import shutil
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chromadb
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from compact_store import CompactCollection, normalize
+from exact_store import ExactCollection
+
+
+DEFAULT_TEXT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "historia.txt")
+
+# (nome, quantização, dimensões, reordenar)
+COMPACT_CONFIGURATIONS = [
+    ("Compacta float16", "float16", None, True),
+    ("Compacta int8", "int8", None, True),
+    ("Compacta int8 1024d", "int8", 1024, True),
+    ("Compacta int8 256d", "int8", 256, True),
+    ("Compacta int8 256d sem reord.", "int8", 256, False),
+]
+
+
+class HashedProjectionEmbeddings:
+    """Embeddings locais: soma de vetores aleatórios fixos por palavra (feature hashing)."""
+
+    def __init__(self, dims: int, buckets: int = 4096, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        spectrum = 1.0 / np.sqrt(1.0 + np.arange(dims) / 64.0)
+        self.table = (rng.standard_normal((buckets, dims)) * spectrum).astype(np.float32)
+        self.buckets = buckets
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), self.table.shape[1]), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for word in re.findall(r"\w+", text.lower()):
+                bucket = zlib.crc32(word.encode("utf-8")) % self.buckets
+                counts[bucket] = counts.get(bucket, 0) + 1
+            for bucket, count in counts.items():
+                vectors[row] += (1.0 + np.log(count)) * self.table[bucket]
+        return normalize(vectors)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def recall_at_k(results, truth) -> float:
+    return sum(len(set(found) & set(expected)) for found, expected in zip(results, truth)) / truth.size
+
+
+def report(name, load_seconds, disk_bytes, ram_bytes, latencies, recall):
+    print(f"{name:<32}{load_seconds:>8.2f}{disk_bytes / 1024 ** 2:>10.1f}{ram_bytes / 1024 ** 2:>10.1f}"
+          f"{statistics.median(latencies) * 1000:>9.2f}{np.percentile(latencies, 95) * 1000:>9.2f}{recall:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do armazenamento vetorial")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TEXT)
+    parser.add_argument("--scale", type=int, default=10, help="Cópias (com ruído) dos chunks do corpus")
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--openai", action="store_true", help="Usar text-embedding-3-large (requer OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as file:
+        chunks = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=200).split_text(file.read())
+
+    rng = np.random.default_rng(42)
+    starts = rng.integers(0, len(chunks), args.queries)
+    queries_text = []
+    for index in starts:
+        words = chunks[index].split()
+        offset = int(rng.integers(0, max(1, len(words) - 12)))
+        queries_text.append(" ".join(words[offset:offset + 12]))
+
+    if args.openai:
+        from langchain_openai import OpenAIEmbeddings
+        from config import EMBEDDING_MODEL, OPENAI_API_KEY
+        embedder = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=OPENAI_API_KEY)
+        base = normalize(np.asarray(embedder.embed_documents(chunks), dtype=np.float32))
+        queries = normalize(np.asarray(embedder.embed_documents(queries_text), dtype=np.float32))
+    else:
+        embedder = HashedProjectionEmbeddings(args.dims)
+        base = embedder.embed_documents(chunks)
+        queries = embedder.embed_documents(queries_text)
+
+    # Réplicas com ruído simulam um corpus maior com documentos parecidos
+    copies = [base] + [
+        normalize(base + 0.5 * normalize(rng.standard_normal(base.shape).astype(np.float32)))
+        for _ in range(args.scale - 1)
+    ]
+    vectors = np.concatenate(copies)
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+    documents = [chunks[i % len(chunks)] for i in range(len(vectors))]
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    origin = "text-embedding-3-large" if args.openai else "projeção local"
+    print(f"📄 {len(vectors):,} vetores de {vectors.shape[1]} dimensões ({origin}); "
+          f"float32 = {vectors.nbytes / 1024 ** 2:.1f} MB; {len(queries)} consultas, k={args.k}\n")
+    print(f"{'Configuração':<32}{'Carga s':>8}{'Disco MB':>10}{'RAM MB':>10}{'p50 ms':>9}{'p95 ms':>9}{f'recall@{args.k}':>10}")
+
+    workdir = tempfile.mkdtemp(prefix="bench_vector_store_")
+    try:
+        # Chroma (HNSW sobre float32, como o serviço usa hoje)
+        chroma_dir = os.path.join(workdir, "chroma")
+        client = chromadb.PersistentClient(path=chroma_dir)
+        collection = client.create_collection("bench")
+        started = time.perf_counter()
+        for start in range(0, len(vectors), 1000):
+            collection.add(ids=ids[start:start + 1000], embeddings=vectors[start:start + 1000],
+                           documents=documents[start:start + 1000])
+        load_seconds = time.perf_counter() - started
+        latencies, results = [], []
+        for query in queries:
+            started = time.perf_counter()
+            found = collection.query(query_embeddings=[query], n_results=args.k, include=[])
+            latencies.append(time.perf_counter() - started)
+            results.append([int(chunk_id.split("-")[1]) for chunk_id in found["ids"][0]])
+        # O hnswlib mantém o índice inteiro (vetores float32 + grafo) em memória
+        hnsw_bytes = sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(chroma_dir)
+            for name in files if name.endswith(".bin")
+        )
+        report("Chroma HNSW float32", load_seconds, directory_size(chroma_dir), max(hnsw_bytes, vectors.nbytes),
+               latencies, recall_at_k(results, truth))
+        del client
+
+        for name, quantization, dimensions, rescore in COMPACT_CONFIGURATIONS:
+            directory = os.path.join(workdir, name.replace(" ", "_"))
+            collection = CompactCollection(directory, quantization, dimensions)
+            started = time.perf_counter()
+            for start in range(0, len(vectors), 1000):
+                collection.upsert(ids[start:start + 1000], vectors[start:start + 1000], documents[start:start + 1000])
+            load_seconds = time.perf_counter() - started
+            # Reabrir: memória no estado de uma reinicialização (sem folga de crescimento)
+            collection = CompactCollection(directory, quantization, dimensions)
+            latencies, results = [], []
+            for query in queries:
+                started = time.perf_counter()
+                slots, _ = collection.search(query, args.k, rescore=rescore)
+                latencies.append(time.perf_counter() - started)
+                results.append(slots.tolist())
+            stats = collection.get_stats()
+            report(name, load_seconds, stats["disk_bytes"], stats["ram_bytes"], latencies,
+                   recall_at_k(results, truth))
+
+        # Exata: matriz float32 em memmap, produto matriz-vetor + argpartition
+        directory = os.path.join(workdir, "exact")
+        collection = ExactCollection(directory)
+        started = time.perf_counter()
+        for start in range(0, len(vectors), 1000):
+            collection.upsert(ids[start:start + 1000], vectors[start:start + 1000], documents[start:start + 1000])
+        load_seconds = time.perf_counter() - started
+        collection = ExactCollection(directory)
+        latencies, results = [], []
+        for query in queries:
+            started = time.perf_counter()
+            slots, _ = collection.search(query, args.k)
+            latencies.append(time.perf_counter() - started)
+            results.append(slots.tolist())
+        stats = collection.get_stats()
+        # Memória: a matriz mapeada fica inteira no cache de páginas durante as buscas
+        report("Exata float32 memmap", load_seconds, stats["disk_bytes"], stats["mapped_bytes"], latencies,
+               recall_at_k(results, truth))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Índice lexical BM25 (índice invertido) dos chunks.
+
+O índice é atualizado na ingestão, junto com a coleção vetorial, e fica em
+um SQLite ao lado do banco vetorial. Complementa a busca densa em consultas
+de correspondência exata (nomes próprios, datas), que o embedding aproxima
+mal: "Pedro Álvares Cabral", "1822".
+
+Os termos são normalizados sem acentos e em minúsculas ("Áurea" = "aurea");
+palavras vazias do português são ignoradas.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import BM25_K1, BM25_B, LEXICAL_QUERY_MAX_TERMS
+
+
+BM25_INDEX_FILENAME = "bm25_index.db"
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Palavras vazias (já sem acentos), incluindo as interrogativas das perguntas
+STOPWORDS = frozenset("""
+    a o os as um uma uns umas de da do das dos em no na nos nas ao aos pelo pela pelos pelas
+    por para com sem sob sobre entre ate apos e ou mas nem que se como quando onde quem qual quais
+    quanto quantos quanta quantas porque foi foram era eram ser sao esta estao estava teve tem
+    isso isto esse essa este aquele aquela seu sua seus suas lhe lhes me te nao sim ja mais
+""".split())
+
+
+def strip_accents(text: str) -> str:
+    """Remove acentos e cedilhas ("Álvares" -> "Alvares")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos indexáveis de um texto (sem acentos, minúsculos, sem palavras vazias)."""
+    return [
+        word for word in _WORD_PATTERN.findall(strip_accents(text).lower())
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def is_lexical_query(query: str, max_terms: int = LEXICAL_QUERY_MAX_TERMS) -> bool:
+    """
+    Indica se a consulta é só de correspondência exata e dispensa o embedding.
+
+    São lexicais as consultas entre aspas e as curtas (até max_terms termos)
+    formadas apenas por nomes próprios e números: "Pedro Álvares Cabral",
+    "1822", "Lei Áurea".
+    """
+    query = query.strip()
+    if len(query) > 2 and query[0] in "\"'“" and query[-1] in "\"'”":
+        return True
+    words = [
+        word for word in _WORD_PATTERN.findall(query)
+        if strip_accents(word).lower() not in STOPWORDS
+    ]
+    return 0 < len(words) <= max_terms and all(word.isdigit() or word[0].isupper() for word in words)
+
+
+class BM25Index:
+    """Índice invertido em SQLite com ranqueamento BM25."""
+
+    def __init__(self, db_path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.init_database()
+
+    @classmethod
+    def for_directory(cls, persist_directory: str) -> "BM25Index":
+        """Cria o índice ao lado do banco de dados vetorial."""
+        return cls(os.path.join(persist_directory, BM25_INDEX_FILENAME))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        """Cria as tabelas do índice se não existirem."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+
+            # Chunks indexados (número interno, comprimento em termos e origem)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    doc INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chunk_id TEXT NOT NULL UNIQUE,
+                    source TEXT,
+                    length INTEGER NOT NULL
+                )
+            """)
+
+            # Listas invertidas: frequência de cada termo em cada chunk
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc)")
+
+            # Totais (linha única) para o IDF, o comprimento médio e o status
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    chunks INTEGER NOT NULL DEFAULT 0,
+                    length INTEGER NOT NULL DEFAULT 0,
+                    terms INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO totals (id) VALUES (1)")
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(totals)")}
+            if "terms" not in columns:
+                # Índices anteriores ao contador: contados uma única vez
+                cursor.execute("ALTER TABLE totals ADD COLUMN terms INTEGER NOT NULL DEFAULT 0")
+                cursor.execute("UPDATE totals SET terms = (SELECT COUNT(DISTINCT term) FROM postings) WHERE id = 1")
+            conn.commit()
+
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str], sources: Optional[Sequence[str]] = None) -> int:
+        """
+        Indexa chunks (IDs já indexados são substituídos).
+
+        Returns:
+            Número de chunks indexados
+        """
+        if not chunk_ids:
+            return 0
+        sources = sources or [None] * len(chunk_ids)
+        with self._lock, self._connect() as conn:
+            cursor = conn.cursor()
+            self._delete(cursor, chunk_ids)
+            chunk_counts = [Counter(tokenize(text)) for text in texts]
+            batch_terms = set().union(*chunk_counts)
+            new_terms = len(batch_terms) - self._count_existing(cursor, batch_terms)
+            added_length = 0
+            for chunk_id, counts, source in zip(chunk_ids, chunk_counts, sources):
+                length = sum(counts.values())
+                added_length += length
+                cursor.execute(
+                    "INSERT INTO chunks (chunk_id, source, length) VALUES (?, ?, ?)", (chunk_id, source, length)
+                )
+                doc = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                    [(term, doc, tf) for term, tf in counts.items()]
+                )
+            cursor.execute(
+                "UPDATE totals SET chunks = chunks + ?, length = length + ?, terms = terms + ? WHERE id = 1",
+                (len(chunk_ids), added_length, new_terms)
+            )
+            conn.commit()
+        return len(chunk_ids)
+
+    def delete(self, chunk_ids: Sequence[str]) -> int:
+        """Remove chunks do índice. Retorna quantos estavam indexados."""
+        if not chunk_ids:
+            return 0
+        with self._lock, self._connect() as conn:
+            cursor = conn.cursor()
+            removed = self._delete(cursor, chunk_ids)
+            conn.commit()
+        return removed
+
+    @staticmethod
+    def _count_existing(cursor: sqlite3.Cursor, terms: Iterable[str]) -> int:
+        """Quantos dos termos ainda têm postings (buscas pela chave primária)."""
+        terms, existing = list(terms), 0
+        for start in range(0, len(terms), 500):
+            batch = terms[start:start + 500]
+            marks = ",".join("?" * len(batch))
+            existing += cursor.execute(
+                f"SELECT COUNT(DISTINCT term) FROM postings WHERE term IN ({marks})", batch
+            ).fetchone()[0]
+        return existing
+
+    @classmethod
+    def _delete(cls, cursor: sqlite3.Cursor, chunk_ids: Sequence[str]) -> int:
+        removed = removed_length = 0
+        touched_terms = set()
+        for start in range(0, len(chunk_ids), 500):
+            batch = list(chunk_ids[start:start + 500])
+            marks = ",".join("?" * len(batch))
+            rows = cursor.execute(
+                f"SELECT doc, length FROM chunks WHERE chunk_id IN ({marks})", batch
+            ).fetchall()
+            if not rows:
+                continue
+            docs = [row[0] for row in rows]
+            doc_marks = ",".join("?" * len(docs))
+            touched_terms.update(
+                row[0] for row in cursor.execute(f"SELECT DISTINCT term FROM postings WHERE doc IN ({doc_marks})", docs)
+            )
+            cursor.execute(f"DELETE FROM postings WHERE doc IN ({doc_marks})", docs)
+            cursor.execute(f"DELETE FROM chunks WHERE doc IN ({doc_marks})", docs)
+            removed += len(rows)
+            removed_length += sum(row[1] for row in rows)
+        if removed:
+            removed_terms = len(touched_terms) - cls._count_existing(cursor, touched_terms)
+            cursor.execute(
+                "UPDATE totals SET chunks = chunks - ?, length = length - ?, terms = terms - ? WHERE id = 1",
+                (removed, removed_length, removed_terms)
+            )
+        return removed
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        """
+        Busca os chunks com maior pontuação BM25.
+
+        Args:
+            query: Consulta em texto livre
+            k: Número máximo de resultados
+
+        Returns:
+            Lista de (chunk_id, pontuação), da maior para a menor
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+        with self._connect() as conn:
+            chunk_count, total_length = conn.execute("SELECT chunks, length FROM totals WHERE id = 1").fetchone()
+            if not chunk_count:
+                return []
+            marks = ",".join("?" * len(terms))
+            rows = conn.execute(f"""
+                SELECT p.term, p.doc, p.tf, c.length FROM postings p JOIN chunks c ON c.doc = p.doc
+                WHERE p.term IN ({marks})
+            """, terms).fetchall()
+            if not rows:
+                return []
+
+            row_terms, docs, tf, lengths = zip(*rows)
+            docs = np.asarray(docs, dtype=np.int64)
+            tf = np.asarray(tf, dtype=np.float32)
+            lengths = np.asarray(lengths, dtype=np.float32)
+
+            # IDF do BM25 (sempre positivo) de cada linha, a partir da frequência do termo
+            document_frequency = Counter(row_terms)
+            idf = np.asarray([
+                np.log(1.0 + (chunk_count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                for term in row_terms
+            ], dtype=np.float32)
+            average_length = total_length / chunk_count
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / max(average_length, 1e-9))
+            contributions = idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+            unique_docs, positions = np.unique(docs, return_inverse=True)
+            scores = np.zeros(len(unique_docs), dtype=np.float32)
+            np.add.at(scores, positions, contributions)
+            top = np.argsort(-scores, kind="stable")[:k]
+
+            doc_list = [int(doc) for doc in unique_docs[top]]
+            doc_marks = ",".join("?" * len(doc_list))
+            ids = dict(conn.execute(f"SELECT doc, chunk_id FROM chunks WHERE doc IN ({doc_marks})", doc_list))
+        return [(ids[doc], float(score)) for doc, score in zip(doc_list, scores[top])]
+
+    def count(self) -> int:
+        """Número de chunks indexados."""
+        with self._connect() as conn:
+            return conn.execute("SELECT chunks FROM totals WHERE id = 1").fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Chunks, termos distintos e tamanho do índice em disco (só a linha de totais é lida)."""
+        with self._connect() as conn:
+            chunks, length, terms = conn.execute("SELECT chunks, length, terms FROM totals WHERE id = 1").fetchone()
+        return {
+            "chunks": chunks,
+            "terms": terms,
+            "average_length": round(length / chunks, 1) if chunks else 0.0,
+            "disk_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        }
+
+    def rebuild_from_collection(self, collection, page_size: int = 1000) -> int:
+        """
+        Reconstrói o índice a partir de uma coleção existente.
+
+        Usado uma única vez para bancos criados antes do índice lexical; a
+        coleção é percorrida em páginas para manter o uso de memória limitado.
+
+        Returns:
+            Número de chunks indexados
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM chunks")
+            conn.execute("UPDATE totals SET chunks = 0, length = 0, terms = 0 WHERE id = 1")
+            conn.commit()
+
+        indexed = offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+            metadatas = page.get("metadatas") or [{}] * len(page["ids"])
+            indexed += self.add(
+                page["ids"], page["documents"], [(metadata or {}).get("source") for metadata in metadatas]
+            )
+        return indexed
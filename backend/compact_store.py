@@ -0,0 +1,655 @@
+"""
+Armazenamento vetorial compacto (embeddings quantizados).
+
+Alternativa ao Chroma para coleções grandes. Os vetores ficam em memória
+quantizados (float16, ou int8 com uma escala por vetor) e, opcionalmente,
+truncados nas primeiras dimensões (Matryoshka, como nos modelos
+text-embedding-3). A busca percorre todos os vetores compactos e os melhores
+candidatos são reordenados com os vetores float32 completos, lidos de um
+arquivo em disco (memmap) sem ocupar RAM.
+
+CompactCollection imita a parte da API de coleção do Chroma usada pelo
+serviço (upsert, get, delete, count, query); CompactVectorStore a expõe como
+VectorStore do LangChain.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from config import (
+    PERSIST_DIRECTORY,
+    VECTOR_QUANTIZATION,
+    VECTOR_DIMENSIONS,
+    VECTOR_RESCORE_FACTOR,
+    VECTOR_KEEP_FULL_PRECISION,
+)
+from mmr import maximal_marginal_relevance
+
+
+COMPACT_STORE_DIRNAME = "compact_store"
+QUANTIZATION_MODES = ("int8", "float16")
+
+# Elementos convertidos para float32 por vez durante a busca (16 MB de memória temporária)
+_SEARCH_BLOCK_ELEMENTS = 4 * 1024 * 1024
+
+# Fração de posições apagadas a partir da qual os arquivos são reescritos
+_VACUUM_RATIO = 0.25
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza as linhas para norma 1 (produto interno = cosseno)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def truncate(vectors: np.ndarray, dimensions: Optional[int]) -> np.ndarray:
+    """Mantém as primeiras dimensões (Matryoshka) e renormaliza."""
+    if dimensions and dimensions < vectors.shape[1]:
+        return normalize(vectors[:, :dimensions])
+    return vectors
+
+
+def quantize(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantiza vetores normalizados.
+
+    Returns:
+        (códigos, escalas): float16 sem escala, ou int8 com uma escala por
+        vetor (max |v| / 127)
+    """
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class CompactCollection:
+    """
+    Coleção de vetores quantizados persistida em arquivos.
+
+    Arquivos do diretório:
+        manifest.json  configurações da coleção (fixadas na criação)
+        codes.bin      vetores quantizados (carregados em memória)
+        scales.bin     escala de cada vetor (int8)
+        full.f32       vetores float32 normalizados (memmap, para reordenar)
+        chunks.db      IDs, textos e metadados (SQLite)
+
+    Os vetores são apenas acrescentados; remoções liberam a posição e os
+    arquivos são reescritos quando as posições livres passam de 25%.
+    """
+
+    backend = "compact"
+    quantization_modes = QUANTIZATION_MODES
+
+    def __init__(self, directory: str, quantization: str = VECTOR_QUANTIZATION,
+                 dimensions: Optional[int] = VECTOR_DIMENSIONS, rescore_factor: int = VECTOR_RESCORE_FACTOR,
+                 keep_full_precision: bool = VECTOR_KEEP_FULL_PRECISION):
+        if quantization not in self.quantization_modes:
+            raise ValueError(
+                f"Quantização inválida: {quantization}. Use uma de: {', '.join(self.quantization_modes)}"
+            )
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.rescore_factor = max(1, rescore_factor)
+        self._lock = threading.RLock()
+
+        manifest = self._read_manifest()
+        if manifest is None:
+            manifest = {
+                "quantization": quantization,
+                "dimensions": dimensions,
+                "full_dimensions": None,
+                "keep_full_precision": keep_full_precision
+            }
+            self._write_manifest(manifest)
+        elif (manifest["quantization"], manifest["dimensions"]) != (quantization, dimensions):
+            print(
+                f"⚠️ Coleção compacta criada com {manifest['quantization']}/{manifest['dimensions']}; "
+                f"ignorando {quantization}/{dimensions}"
+            )
+        self.name = os.path.basename(os.path.normpath(directory))
+        self.quantization = manifest["quantization"]
+        self.dimensions = manifest["dimensions"]
+        self.full_dimensions = manifest["full_dimensions"]
+        self.keep_full_precision = manifest["keep_full_precision"]
+
+        self._init_database()
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path("manifest.json"), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        temp_path = self._path("manifest.json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(temp_path, self._path("manifest.json"))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path("chunks.db"), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id TEXT PRIMARY KEY,
+                    slot INTEGER NOT NULL UNIQUE,
+                    source TEXT,
+                    document TEXT,
+                    metadata TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source)")
+            conn.commit()
+
+    @property
+    def _code_dtype(self):
+        return np.int8 if self.quantization == "int8" else np.float16
+
+    @property
+    def _stored_dimensions(self) -> Optional[int]:
+        if self.full_dimensions is None:
+            return None
+        return min(self.dimensions or self.full_dimensions, self.full_dimensions)
+
+    def _file_rows(self, name: str, row_bytes: int) -> int:
+        try:
+            return os.path.getsize(self._path(name)) // row_bytes
+        except FileNotFoundError:
+            return 0
+
+    def _load(self):
+        """Carrega os vetores compactos e descarta escritas incompletas."""
+        self._size = 0
+        self._codes = np.empty((0, self._stored_dimensions or 0), dtype=self._code_dtype)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._full = None
+
+        if self.full_dimensions is not None:
+            dims = self._stored_dimensions
+            code_bytes = dims * np.dtype(self._code_dtype).itemsize
+            rows = [self._file_rows("codes.bin", code_bytes)]
+            if self.quantization == "int8":
+                rows.append(self._file_rows("scales.bin", 4))
+            if self.keep_full_precision:
+                rows.append(self._file_rows("full.f32", self.full_dimensions * 4))
+            size = min(rows)
+
+            # Uma gravação interrompida pode deixar um arquivo com linhas a mais
+            for name, row_bytes in (("codes.bin", code_bytes), ("scales.bin", 4),
+                                    ("full.f32", self.full_dimensions * 4)):
+                if os.path.exists(self._path(name)) and os.path.getsize(self._path(name)) > size * row_bytes:
+                    os.truncate(self._path(name), size * row_bytes)
+
+            if size:
+                self._codes = np.fromfile(self._path("codes.bin"), dtype=self._code_dtype).reshape(size, dims)
+                self._scales = (
+                    np.fromfile(self._path("scales.bin"), dtype=np.float32)
+                    if self.quantization == "int8" else np.ones(size, dtype=np.float32)
+                )
+            self._size = size
+        self._load_slots()
+
+    def _load_slots(self):
+        """Marca as posições ocupadas e descarta chunks sem vetor gravado."""
+        self._alive = np.zeros(self._size, dtype=bool)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chunks WHERE slot >= ?", (self._size,))
+            conn.commit()
+            slots = [row["slot"] for row in conn.execute("SELECT slot FROM chunks")]
+        self._alive[slots] = True
+        self._alive_count = len(slots)
+
+    def _full_vectors(self) -> Optional[np.memmap]:
+        """Memmap dos vetores float32 (reaberto quando a coleção cresce)."""
+        if not self.keep_full_precision or not self._size:
+            return None
+        if self._full is None or self._full.shape[0] != self._size:
+            self._full = np.memmap(self._path("full.f32"), dtype=np.float32, mode="r",
+                                   shape=(self._size, self.full_dimensions))
+        return self._full
+
+    def _append(self, vectors: np.ndarray) -> np.ndarray:
+        """Acrescenta vetores normalizados aos arquivos e à memória; retorna as posições."""
+        codes, scales = quantize(truncate(vectors, self.dimensions), self.quantization)
+        if self.keep_full_precision:
+            with open(self._path("full.f32"), "ab") as file:
+                vectors.astype(np.float32).tofile(file)
+        if scales is not None:
+            with open(self._path("scales.bin"), "ab") as file:
+                scales.tofile(file)
+        with open(self._path("codes.bin"), "ab") as file:
+            codes.tofile(file)
+
+        start, stop = self._size, self._size + len(vectors)
+        self._reserve(stop)
+        self._codes[start:stop] = codes
+        if scales is not None:
+            self._scales[start:stop] = scales
+        self._alive[start:stop] = True
+        self._size = stop
+        return np.arange(start, stop)
+
+    def _reserve(self, rows: int):
+        """Garante capacidade para rows vetores em memória (crescimento geométrico)."""
+        capacity = self._codes.shape[0]
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        codes = np.empty((capacity, self._stored_dimensions), dtype=self._code_dtype)
+        codes[:self._size] = self._codes[:self._size]
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._codes, self._scales, self._alive = codes, scales, alive
+
+    # ------------------------------------------------------------------
+    # API no formato do Chroma
+    # ------------------------------------------------------------------
+
+    @property
+    def metadata(self) -> Optional[Dict[str, Any]]:
+        """Metadados da coleção (ex.: perfil de embedding), como no Chroma."""
+        return (self._read_manifest() or {}).get("metadata")
+
+    def modify(self, metadata: Dict[str, Any]):
+        """Substitui os metadados da coleção."""
+        with self._lock:
+            manifest = self._read_manifest()
+            manifest["metadata"] = metadata
+            self._write_manifest(manifest)
+
+    def count(self) -> int:
+        """Número de vetores na coleção."""
+        return self._alive_count
+
+    def add(self, ids: List[str], embeddings: Sequence[Sequence[float]], documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Optional[Dict[str, Any]]]] = None):
+        """Insere vetores (IDs existentes são substituídos)."""
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids: List[str], embeddings: Sequence[Sequence[float]], documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Optional[Dict[str, Any]]]] = None):
+        """
+        Insere ou substitui vetores.
+
+        Args:
+            ids: IDs dos vetores
+            embeddings: Vetores (qualquer norma; são normalizados)
+            documents: Textos associados
+            metadatas: Metadados associados
+        """
+        if not ids:
+            return
+        vectors = normalize(np.asarray(embeddings, dtype=np.float32))
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._lock:
+            if self.full_dimensions is None:
+                self.full_dimensions = vectors.shape[1]
+                manifest = self._read_manifest()
+                manifest["full_dimensions"] = self.full_dimensions
+                self._write_manifest(manifest)
+                self._codes = np.empty((0, self._stored_dimensions), dtype=self._code_dtype)
+            elif vectors.shape[1] != self.full_dimensions:
+                raise ValueError(
+                    f"Dimensão do embedding ({vectors.shape[1]}) difere da coleção ({self.full_dimensions})"
+                )
+
+            self._remove(list(ids))
+            slots = self._append(vectors)
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO chunks (id, slot, source, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (chunk_id, int(slot), (metadata or {}).get("source"), document,
+                         json.dumps(metadata or {}, ensure_ascii=False))
+                        for chunk_id, slot, document, metadata in zip(ids, slots, documents, metadatas)
+                    ]
+                )
+                conn.commit()
+            self._alive_count += len(ids)
+
+    def _where_sql(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+        """Filtros por ID e por igualdade de metadados."""
+        clauses, params = [], []
+        if ids is not None:
+            clauses.append(f"id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        for key, value in (where or {}).items():
+            if key.startswith("$") or isinstance(value, dict):
+                raise ValueError(f"Filtro não suportado pela coleção compacta: {key}")
+            if key == "source":
+                clauses.append("source = ?")
+            else:
+                clauses.append("json_extract(metadata, ?) = ?")
+                params.append(f"$.{key}")
+            params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _select(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+                limit: Optional[int] = None, offset: Optional[int] = None) -> List[sqlite3.Row]:
+        rows = []
+        # IDs em lotes (limite de parâmetros do SQLite)
+        id_batches = [ids[start:start + 500] for start in range(0, len(ids), 500)] if ids is not None else [None]
+        with self._connect() as conn:
+            for batch in id_batches:
+                condition, params = self._where_sql(batch, where)
+                sql = f"SELECT id, slot, document, metadata FROM chunks{condition} ORDER BY slot"
+                if limit is not None or offset:
+                    sql += " LIMIT ? OFFSET ?"
+                    params += [-1 if limit is None else limit, offset or 0]
+                rows.extend(conn.execute(sql, params).fetchall())
+        return rows
+
+    def _embeddings_for(self, slots: np.ndarray) -> np.ndarray:
+        """Vetores completos das posições (ou os compactos, sem a precisão completa)."""
+        if not len(slots):
+            return np.empty((0, self.full_dimensions or 0), dtype=np.float32)
+        full = self._full_vectors()
+        if full is not None:
+            return np.asarray(full[slots])
+        vectors = self._codes[slots].astype(np.float32) * self._scales[slots, None]
+        # Completar com zeros para manter a dimensão das consultas
+        padded = np.zeros((len(slots), self.full_dimensions), dtype=np.float32)
+        padded[:, :vectors.shape[1]] = vectors
+        return padded
+
+    def _result(self, rows: List[sqlite3.Row], include: Iterable[str]) -> Dict[str, Any]:
+        include = set(include)
+        result = {
+            "ids": [row["id"] for row in rows],
+            "documents": [row["document"] for row in rows] if "documents" in include else None,
+            "metadatas": [json.loads(row["metadata"] or "{}") for row in rows] if "metadatas" in include else None,
+            "embeddings": None
+        }
+        if "embeddings" in include:
+            with self._lock:
+                result["embeddings"] = self._embeddings_for(np.array([row["slot"] for row in rows], dtype=np.int64))
+        return result
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Iterable[str] = ("metadatas", "documents")) -> Dict[str, Any]:
+        """Lê vetores por ID e/ou filtro de metadados, na ordem de inserção."""
+        return self._result(self._select(ids, where, limit, offset), include)
+
+    def _remove(self, ids: List[str]) -> int:
+        rows = self._select(ids=ids)
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM chunks WHERE id = ?", [(row["id"],) for row in rows])
+            conn.commit()
+        self._alive[[row["slot"] for row in rows]] = False
+        self._alive_count -= len(rows)
+        return len(rows)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Remove vetores por ID e/ou filtro de metadados."""
+        with self._lock:
+            if where is not None:
+                ids = [row["id"] for row in self._select(ids, where)]
+            if ids:
+                self._remove(list(ids))
+            if self._size and self._size - self._alive_count > _VACUUM_RATIO * self._size:
+                self.vacuum()
+
+    def vacuum(self):
+        """Reescreve os arquivos sem as posições apagadas."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive[:self._size])
+            full = self._full_vectors()
+            if full is not None:
+                np.asarray(full[keep]).tofile(self._path("full.f32.tmp"))
+            self._codes = self._codes[keep]
+            self._codes.tofile(self._path("codes.bin.tmp"))
+            self._scales = self._scales[keep]
+            if self.quantization == "int8":
+                self._scales.tofile(self._path("scales.bin.tmp"))
+
+            self._full = None
+            for name in ("full.f32", "codes.bin", "scales.bin"):
+                if os.path.exists(self._path(f"{name}.tmp")):
+                    os.replace(self._path(f"{name}.tmp"), self._path(name))
+            self._renumber(keep)
+
+    def _renumber(self, keep: np.ndarray):
+        """Renumera as posições após a reescrita (a ordem de inserção é mantida)."""
+        with self._connect() as conn:
+            conn.execute("UPDATE chunks SET slot = -1 - slot")
+            conn.executemany(
+                "UPDATE chunks SET slot = ? WHERE slot = ?",
+                [(new, -1 - int(old)) for new, old in enumerate(keep)]
+            )
+            conn.commit()
+        self._size = len(keep)
+        self._alive = np.ones(self._size, dtype=bool)
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Produto interno aproximado da consulta com todos os vetores compactos."""
+        query = truncate(query[None, :], self.dimensions)[0]
+        scores = np.empty(self._size, dtype=np.float32)
+        block_rows = max(256, _SEARCH_BLOCK_ELEMENTS // self._codes.shape[1])
+        for start in range(0, self._size, block_rows):
+            stop = min(start + block_rows, self._size)
+            scores[start:stop] = self._codes[start:stop].astype(np.float32) @ query
+        if self.quantization == "int8":
+            scores *= self._scales[:self._size]
+        return scores
+
+    def search(self, query: Sequence[float], n_results: int, where: Optional[Dict[str, Any]] = None,
+               rescore: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca exaustiva sobre os vetores compactos com reordenação opcional.
+
+        Returns:
+            (posições, similaridades de cosseno) em ordem decrescente
+        """
+        query = normalize(np.asarray(query, dtype=np.float32)[None, :])[0]
+        with self._lock:
+            if not self._alive_count:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            if query.shape[0] != self.full_dimensions:
+                raise ValueError(
+                    f"Dimensão da consulta ({query.shape[0]}) difere da coleção ({self.full_dimensions})"
+                )
+            mask = self._alive[:self._size]
+            if where:
+                mask = np.zeros(self._size, dtype=bool)
+                mask[[row["slot"] for row in self._select(where=where)]] = True
+
+            scores = self._approximate_scores(query)
+            scores[~mask] = -np.inf
+            available = int(mask.sum())
+            full = self._full_vectors() if rescore else None
+            candidates = min(available, n_results * (self.rescore_factor if full is not None else 1))
+            if not candidates:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+            slots = np.argpartition(-scores, candidates - 1)[:candidates]
+            if full is not None:
+                slots.sort()  # leitura sequencial do memmap
+                similarities = np.asarray(full[slots]) @ query
+            else:
+                similarities = scores[slots]
+            order = np.argsort(-similarities)[:n_results]
+            return slots[order], similarities[order]
+
+    def query(self, query_embeddings: Sequence[Sequence[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              include: Iterable[str] = ("metadatas", "documents", "distances")) -> Dict[str, Any]:
+        """Busca no formato do Chroma (listas por consulta; distância = 1 - cosseno)."""
+        include = set(include)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+        for query in query_embeddings:
+            slots, similarities = self.search(query, n_results, where)
+            with self._connect() as conn:
+                by_slot = {
+                    row["slot"]: row for row in conn.execute(
+                        f"SELECT id, slot, document, metadata FROM chunks WHERE slot IN ({','.join('?' * len(slots))})",
+                        [int(slot) for slot in slots]
+                    )
+                }
+            found_at = [index for index, slot in enumerate(slots) if int(slot) in by_slot]
+            found = self._result([by_slot[int(slots[index])] for index in found_at], include)
+            results["ids"].append(found["ids"])
+            results["documents"].append(found["documents"])
+            results["metadatas"].append(found["metadatas"])
+            results["embeddings"].append(found["embeddings"])
+            results["distances"].append([float(1.0 - similarities[index]) for index in found_at])
+        for key in ("documents", "metadatas", "distances", "embeddings"):
+            if key not in include:
+                results[key] = None
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamanho da coleção em memória e em disco."""
+        disk_bytes = sum(
+            os.path.getsize(self._path(name)) for name in os.listdir(self.directory)
+            if os.path.isfile(self._path(name))
+        )
+        return {
+            "vectors": self._alive_count,
+            "slots": self._size,
+            "quantization": self.quantization,
+            "dimensions": self._stored_dimensions,
+            "full_dimensions": self.full_dimensions,
+            "keep_full_precision": self.keep_full_precision,
+            "ram_bytes": int(self._codes.nbytes + self._scales.nbytes + self._alive.nbytes),
+            "disk_bytes": disk_bytes
+        }
+
+
+class CompactVectorStore(VectorStore):
+    """VectorStore do LangChain sobre uma CompactCollection."""
+
+    collection_class = CompactCollection
+    dirname = COMPACT_STORE_DIRNAME
+
+    def __init__(self, persist_directory: str = PERSIST_DIRECTORY, embedding_function: Optional[Embeddings] = None,
+                 collection_name: str = "langchain", **settings):
+        """
+        Args:
+            persist_directory: Diretório do banco de dados vetorial
+            embedding_function: Modelo de embedding
+            collection_name: Nome da coleção
+            settings: quantization, dimensions, rescore_factor, keep_full_precision
+        """
+        self._embedding_function = embedding_function
+        self._collection = self.collection_class(
+            os.path.join(persist_directory, self.dirname, collection_name), **settings
+        )
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding_function
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Gera os embeddings dos textos e os insere (ou substitui) na coleção."""
+        texts = list(texts)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        embeddings = self._embedding_function.embed_documents(texts)
+        self._collection.upsert(ids, embeddings, texts, metadatas)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self._collection.delete(ids=ids)
+
+    def delete_collection(self) -> None:
+        """Apaga a coleção inteira (arquivos incluídos)."""
+        shutil.rmtree(self._collection.directory, ignore_errors=True)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        found = self._collection.get(ids=list(ids))
+        return [
+            Document(page_content=text, metadata=metadata, id=chunk_id)
+            for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+        ]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    def _documents(self, results: Dict[str, Any]) -> List[Tuple[Document, float]]:
+        return [
+            (Document(page_content=text, metadata=metadata or {}, id=chunk_id), distance)
+            for chunk_id, text, metadata, distance in zip(
+                results["ids"][0], results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+        ]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Documentos mais próximos do vetor, com a distância de cosseno."""
+        return self._documents(self._collection.query([embedding], n_results=k, where=filter))
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, filter: Optional[Dict[str, Any]] = None,
+                                                **kwargs: Any) -> List[Document]:
+        results = self._collection.query(
+            [embedding], n_results=fetch_k, where=filter,
+            include=["metadatas", "documents", "distances", "embeddings"]
+        )
+        if not results["ids"][0]:
+            return []
+        selected = maximal_marginal_relevance(
+            np.array(embedding, dtype=np.float32), results["embeddings"][0], k=k, lambda_mult=lambda_mult
+        )
+        candidates = self._documents(results)
+        return [candidates[index][0] for index in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+                                      filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding_function.embed_query(query), k, fetch_k, lambda_mult, filter
+        )
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "CompactVectorStore":
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
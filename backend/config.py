@@ -11,6 +11,19 @@ load_dotenv()
 # Configurações do modelo de embedding
 EMBEDDING_MODEL = "text-embedding-3-large"
 
+# Perfis de embedding: modelo, dimensões de saída (None = nativa do modelo) e
+# textos por requisição. O perfil usado fica gravado nos metadados da coleção;
+# trocar de perfil exige reindexar em outra coleção (migrate_embeddings.py).
+EMBEDDING_PROFILES = {
+    "large": {"model": EMBEDDING_MODEL, "dimensions": None, "batch_size": 512},
+    "large-1024": {"model": EMBEDDING_MODEL, "dimensions": 1024, "batch_size": 512},
+    "large-256": {"model": EMBEDDING_MODEL, "dimensions": 256, "batch_size": 1024},
+    "small": {"model": "text-embedding-3-small", "dimensions": None, "batch_size": 1024},
+    "small-512": {"model": "text-embedding-3-small", "dimensions": 512, "batch_size": 1024},
+    "ada-002": {"model": "text-embedding-ada-002", "dimensions": None, "batch_size": 512},
+}
+EMBEDDING_PROFILE = os.getenv("EMBEDDING_PROFILE", "large")
+
 # Configurações do modelo de chat
 CHAT_MODEL = "gpt-4o-mini"
 MODEL_NAME = "gpt-4o-mini"
@@ -25,17 +38,108 @@ if not OPENAI_API_KEY or OPENAI_API_KEY == "sua_chave_openai_aqui":
     print("Configure a variável de ambiente OPENAI_API_KEY ou edite o arquivo config.py")
     OPENAI_API_KEY = None
 
+# Configurações da fila de ingestão em segundo plano
+INGESTION_WORKERS = 2  # Jobs processados simultaneamente
+INGESTION_PROCESS_WORKERS = 2  # Processos para leitura/divisão de arquivos (0 = usar threads)
+INGESTION_BATCH_SIZE = 1024  # Chunks por lote de embedding/inserção (limita a memória e define o progresso)
+STREAMING_BLOCK_SIZE = 1024 * 1024  # Caracteres lidos por vez de arquivos de texto
+STREAMING_MIN_BYTES = 50 * 1024 ** 2  # Na fila, arquivos maiores são lidos em streaming (sem pool de processos)
+BULK_INGEST_WORKERS = 8  # Arquivos processados simultaneamente na ingestão em massa
+BULK_INGEST_MAX_FILES = 10_000  # Arquivos por requisição de ingestão em massa
+
+# Configurações da leitura paralela de PDFs
+PDF_LOADER_WORKERS = 0  # Processos para extrair páginas (0 = número de núcleos)
+PDF_PAGES_PER_TASK = 4  # Páginas por tarefa enviada ao pool
+PDF_PARALLEL_MIN_PAGES = 8  # PDFs menores são lidos sequencialmente
+
+# Uploads: gravados em disco em blocos, com nome único
+UPLOAD_TEMP_DIR = "temp_uploads"
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes lidos/escritos por vez
+MAX_UPLOAD_BYTES = 200 * 1024 ** 2  # 200 MB
+UPLOAD_SOURCE_HASH_CHARS = 16  # Caracteres do SHA-256 no nome lógico do upload no índice
+
+# Extensões de documentos suportadas
+SUPPORTED_EXTENSIONS = ['.txt', '.pdf', '.docx', '.md']
+
 # Configurações do text splitter
 CHUNK_SIZE = 600
 CHUNK_OVERLAP = 200
+
+# Estratégia de chunking: "characters" (RecursiveCharacterTextSplitter) ou
+# "tokens" (frases inteiras até CHUNK_SIZE_TOKENS tokens, ver chunking.py; divide
+# mais devagar, mas embeda menos tokens)
+CHUNKING_STRATEGY = "characters"
+CHUNK_SIZE_TOKENS = 160
+CHUNK_OVERLAP_TOKENS = 16
 SEPARATOR = "\n"
 
 # Configurações do retriever
 LAMBDA_MULT = 0.8
 K_DOCUMENTS = 4
+FETCH_K = 20  # Candidatos buscados antes do MMR
+RETRIEVAL_TIMEOUT = 15.0  # Segundos para embedding + busca no retriever assíncrono (None = sem limite)
+
+# Índice lexical BM25 (bm25_index.py) e busca híbrida com fusão por posição recíproca (RRF)
+LEXICAL_INDEX_ENABLED = True
+BM25_K1 = 1.2
+BM25_B = 0.75
+HYBRID_RRF_K = 60  # Constante da RRF: 1 / (HYBRID_RRF_K + posição)
+LEXICAL_QUERY_MAX_TERMS = 4  # Consultas curtas só com nomes próprios/números dispensam o embedding
+
+# Pipelines de consulta pré-compilados na inicialização: (lambda_mult, k_documents)
+QUERY_PIPELINE_PRESETS = [(LAMBDA_MULT, K_DOCUMENTS)]
 
 # Configurações do banco de dados
 PERSIST_DIRECTORY = "./chromadb"
+DEFAULT_COLLECTION = "langchain"  # Coleção padrão do Chroma (bancos laterais sem sufixo)
+VECTOR_COLLECTION = os.getenv("VECTOR_COLLECTION", DEFAULT_COLLECTION)  # Coleção ativa (uma por perfil de embedding)
+
+# Armazenamento vetorial: "chroma" (HNSW, float32), "compact" (quantizado, ver compact_store.py)
+# ou "exact" (float32 em memmap com busca exata, ver exact_store.py; indicado até ~100 mil chunks)
+VECTOR_STORE_BACKEND = "chroma"
+VECTOR_STORE_BACKENDS = ("chroma", "compact", "exact")
+VECTOR_COLLECTION_BACKENDS = {}  # Backend por coleção (sobrepõe VECTOR_STORE_BACKEND), ex.: {"manuais": "exact"}
+
+# Perfis do índice HNSW do Chroma (ver hnsw_profiles.py; calibrar com tune_hnsw.py).
+# max_neighbors (M) e ef_construction são fixados na criação da coleção;
+# ef_search é o padrão das buscas e pode ser alterado por consulta.
+HNSW_PROFILES = {
+    "latency": {"max_neighbors": 16, "ef_construction": 100, "ef_search": 20},
+    "balanced": {"max_neighbors": 16, "ef_construction": 200, "ef_search": 100},
+    "recall": {"max_neighbors": 32, "ef_construction": 400, "ef_search": 300},
+}
+HNSW_PROFILE = os.getenv("HNSW_PROFILE", "balanced")  # Perfil das coleções novas
+VECTOR_QUANTIZATION = "int8"  # "int8" (escala por vetor) ou "float16"
+VECTOR_DIMENSIONS = None  # Truncamento Matryoshka (ex.: 1024); None = dimensão completa
+VECTOR_RESCORE_FACTOR = 4  # Candidatos (k × fator) reordenados com os vetores float32
+VECTOR_KEEP_FULL_PRECISION = True  # Guardar os vetores float32 em disco (memmap) para reordenar
+
+# Executor de embeddings (lotes por tokens, requisições paralelas, backoff em 429)
+EMBEDDING_BATCH_TOKENS = 32_000  # Tokens por requisição (o limite da OpenAI é 300k)
+EMBEDDING_BATCH_SIZE = 512  # Textos por requisição (o limite da OpenAI é 2048)
+EMBEDDING_MAX_CONCURRENCY = 4  # Requisições de embedding simultâneas
+EMBEDDING_MAX_RETRIES = 6
+EMBEDDING_RETRY_BASE_DELAY = 0.5  # Segundos (dobra a cada tentativa, com jitter)
+EMBEDDING_RETRY_MAX_DELAY = 30.0
+
+# Cache persistente de embeddings (SQLite ao lado do banco vetorial)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_MAX_ENTRIES = 500_000
+EMBEDDING_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+
+# Cache LRU de embeddings de consultas (em memória, opcionalmente em disco)
+QUERY_EMBEDDING_CACHE_ENABLED = True
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+QUERY_EMBEDDING_CACHE_TTL = 3600  # segundos
+QUERY_EMBEDDING_CACHE_PERSIST = False  # compartilhar via cache SQLite entre processos
+
+# Cache semântico de respostas (reutiliza respostas de perguntas similares)
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_THRESHOLD = 0.97  # similaridade de cosseno mínima entre as consultas
+ANSWER_CACHE_MAX_ENTRIES = 10000
+
+# Threads para chamadas síncronas (Chroma, loaders, SQLite) fora do event loop
+BLOCKING_IO_WORKERS = 8
 
 # Configurações padrão dos argumentos
 DEFAULT_LOAD_MODE = "query"
@@ -0,0 +1,58 @@
+"""
+Fixtures compartilhadas pelos testes do backend: o corpus de exemplo e um
+DocumentService offline (LLM e embeddings falsos) em diretório temporário.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from document_service import DocumentService
+
+
+HISTORIA = (
+    "Pedro Álvares Cabral chegou ao Brasil em 1500.\n"
+    "A independência do Brasil foi proclamada em 1822 por Dom Pedro I.\n"
+    "A abolição da escravatura ocorreu em 1888 com a Lei Áurea.\n"
+)
+
+
+@pytest.fixture
+def historia_text():
+    """Corpus de exemplo: três frases, uma por linha (um chunk cada com chunk_size=80)."""
+    return HISTORIA
+
+
+@pytest.fixture
+def historia(tmp_path):
+    """Arquivo historia.txt com o corpus de exemplo."""
+    path = tmp_path / "historia.txt"
+    path.write_text(HISTORIA, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    """
+    Fábrica de DocumentService com banco em tmp_path/db.
+
+    Usa FakeListChatModel e DeterministicFakeEmbedding(size) salvo se outro
+    embeddings for informado; o cache de respostas fica desligado por padrão.
+    Os demais argumentos são repassados ao DocumentService.
+    """
+    def make(embeddings=None, size=32, answer_cache=False, **kwargs):
+        return DocumentService(
+            llm=FakeListChatModel(responses=["Resposta de teste"]),
+            embeddings=embeddings or DeterministicFakeEmbedding(size=size),
+            persist_directory=str(tmp_path / "db"),
+            answer_cache=answer_cache,
+            **kwargs
+        )
+    return make
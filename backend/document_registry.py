@@ -0,0 +1,361 @@
+"""
+Registro lateral (sidecar) dos documentos indexados.
+
+O registro é atualizado no momento da ingestão e guarda, por arquivo, as
+estatísticas (chunks, tokens, bytes), a impressão digital do arquivo
+(tamanho, mtime, hash do conteúdo), os parâmetros de chunking e os IDs dos
+chunks. Com isso o status do corpus é consultado em tempo constante e uma
+reingestão só precisa processar os arquivos que mudaram.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+
+REGISTRY_FILENAME = "document_registry.db"
+
+# Colunas adicionadas após a primeira versão do registro
+_DOCUMENT_COLUMNS = {
+    "file_size": "INTEGER",
+    "mtime": "REAL",
+    "content_hash": "TEXT",
+    "chunk_size": "INTEGER",
+    "chunk_overlap": "INTEGER",
+    "chunking": "TEXT",
+}
+
+
+def normalize_source(source: Optional[str]) -> str:
+    """
+    Chave do registro para o "source" gravado nos metadados de um chunk.
+
+    Bancos anteriores ao registro gravavam o caminho como foi informado ao
+    loader (relativo ao diretório de trabalho da API); a ingestão atual usa
+    caminhos absolutos, então caminhos relativos são resolvidos aqui.
+    """
+    if not source:
+        return "desconhecido"
+    return source if os.path.isabs(source) else os.path.abspath(source)
+
+
+class DocumentRegistry:
+    """Registro SQLite de documentos, chunks e totais do corpus."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.init_database()
+
+    @classmethod
+    def for_directory(cls, persist_directory: str) -> "DocumentRegistry":
+        """Cria o registro ao lado do banco de dados vetorial."""
+        return cls(os.path.join(persist_directory, REGISTRY_FILENAME))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Cria as tabelas do registro se não existirem."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+
+            # Estatísticas e impressão digital por arquivo de origem
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    source TEXT PRIMARY KEY,
+                    chunks INTEGER NOT NULL DEFAULT 0,
+                    tokens INTEGER NOT NULL DEFAULT 0,
+                    bytes INTEGER NOT NULL DEFAULT 0,
+                    embedding_model TEXT,
+                    last_ingested_at TEXT
+                )
+            """)
+            existing = {row["name"] for row in cursor.execute("PRAGMA table_info(documents)")}
+            for column, column_type in _DOCUMENT_COLUMNS.items():
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE documents ADD COLUMN {column} {column_type}")
+
+            # IDs dos chunks de cada arquivo
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS document_chunks (
+                    source TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    PRIMARY KEY (source, chunk_id)
+                )
+            """)
+
+            # Totais agregados (linha única) para consultas O(1)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS corpus_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    documents INTEGER NOT NULL DEFAULT 0,
+                    chunks INTEGER NOT NULL DEFAULT 0,
+                    tokens INTEGER NOT NULL DEFAULT 0,
+                    bytes INTEGER NOT NULL DEFAULT 0,
+                    embedding_model TEXT,
+                    last_ingested_at TEXT,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO corpus_totals (id) VALUES (1)")
+            conn.commit()
+
+    def upsert_document(self, source: str, chunks: int, tokens: int, size_bytes: int,
+                        chunk_ids: List[str], embedding_model: Optional[str] = None,
+                        file_size: Optional[int] = None, mtime: Optional[float] = None,
+                        content_hash: Optional[str] = None, chunk_size: Optional[int] = None,
+                        chunk_overlap: Optional[int] = None, chunking: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Registra (ou substitui) o estado indexado de um arquivo.
+
+        Os totais do corpus são ajustados pela diferença em relação ao estado
+        anterior do arquivo, tudo em uma única transação.
+
+        Args:
+            source: Caminho do arquivo de origem
+            chunks: Número de chunks do arquivo
+            tokens: Total de tokens dos chunks
+            size_bytes: Total de bytes (UTF-8) dos chunks
+            chunk_ids: IDs dos chunks do arquivo na coleção
+            embedding_model: Modelo de embedding utilizado
+            file_size: Tamanho do arquivo em bytes
+            mtime: Data de modificação do arquivo
+            content_hash: Hash SHA-256 do conteúdo do arquivo
+            chunk_size: Tamanho de chunk usado
+            chunk_overlap: Sobreposição de chunk usada
+            chunking: Estratégia de chunking usada ("characters" ou "tokens")
+
+        Returns:
+            Registro atualizado do arquivo
+        """
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            previous = cursor.execute(
+                "SELECT chunks, tokens, bytes FROM documents WHERE source = ?", (source,)
+            ).fetchone()
+            old = dict(previous) if previous else {"chunks": 0, "tokens": 0, "bytes": 0}
+
+            cursor.execute("""
+                INSERT OR REPLACE INTO documents (
+                    source, chunks, tokens, bytes, embedding_model, last_ingested_at,
+                    file_size, mtime, content_hash, chunk_size, chunk_overlap, chunking
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (source, chunks, tokens, size_bytes, embedding_model, now,
+                  file_size, mtime, content_hash, chunk_size, chunk_overlap, chunking))
+
+            cursor.execute("DELETE FROM document_chunks WHERE source = ?", (source,))
+            cursor.executemany(
+                "INSERT OR IGNORE INTO document_chunks (source, chunk_id) VALUES (?, ?)",
+                [(source, chunk_id) for chunk_id in chunk_ids]
+            )
+
+            cursor.execute("""
+                UPDATE corpus_totals SET
+                    documents = documents + ?,
+                    chunks = chunks + ?,
+                    tokens = tokens + ?,
+                    bytes = bytes + ?,
+                    embedding_model = ?,
+                    last_ingested_at = ?,
+                    version = version + 1
+                WHERE id = 1
+            """, (0 if previous else 1, chunks - old["chunks"], tokens - old["tokens"],
+                  size_bytes - old["bytes"], embedding_model, now))
+            conn.commit()
+
+        return self.get_document(source)
+
+    def touch_document(self, source: str, file_size: int, mtime: float):
+        """Atualiza tamanho e mtime de um arquivo cujo conteúdo não mudou."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE documents SET file_size = ?, mtime = ? WHERE source = ?",
+                (file_size, mtime, source)
+            )
+            conn.commit()
+
+    def remove_document(self, source: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove um arquivo do registro.
+
+        Args:
+            source: Caminho do arquivo de origem
+
+        Returns:
+            Registro removido, ou None se não existia
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            row = cursor.execute("SELECT * FROM documents WHERE source = ?", (source,)).fetchone()
+            if row is None:
+                return None
+            cursor.execute("DELETE FROM documents WHERE source = ?", (source,))
+            cursor.execute("DELETE FROM document_chunks WHERE source = ?", (source,))
+            cursor.execute("""
+                UPDATE corpus_totals SET
+                    documents = documents - 1,
+                    chunks = chunks - ?,
+                    tokens = tokens - ?,
+                    bytes = bytes - ?,
+                    version = version + 1
+                WHERE id = 1
+            """, (row["chunks"], row["tokens"], row["bytes"]))
+            conn.commit()
+            return dict(row)
+
+    def get_document(self, source: str) -> Optional[Dict[str, Any]]:
+        """Retorna o registro de um arquivo, ou None se não registrado."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE source = ?", (source,)).fetchone()
+            return dict(row) if row else None
+
+    def get_chunk_ids(self, source: str) -> List[str]:
+        """Retorna os IDs dos chunks registrados para um arquivo."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT chunk_id FROM document_chunks WHERE source = ?", (source,)
+            ).fetchall()
+            return [row["chunk_id"] for row in rows]
+
+    def list_sources(self, prefix: Optional[str] = None) -> List[str]:
+        """
+        Lista os arquivos registrados.
+
+        Args:
+            prefix: Se informado, apenas arquivos dentro deste diretório
+        """
+        with self._connect() as conn:
+            if prefix:
+                prefix = os.path.join(prefix, "")
+                rows = conn.execute(
+                    "SELECT source FROM documents WHERE substr(source, 1, ?) = ? ORDER BY source",
+                    (len(prefix), prefix)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT source FROM documents ORDER BY source").fetchall()
+            return [row["source"] for row in rows]
+
+    def get_totals(self) -> Dict[str, Any]:
+        """Retorna os totais agregados do corpus (consulta de linha única)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM corpus_totals WHERE id = 1").fetchone()
+            totals = dict(row)
+            totals.pop("id", None)
+            return totals
+
+    def list_documents(self, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """
+        Lista as estatísticas por arquivo de forma paginada.
+
+        Args:
+            offset: Posição inicial
+            limit: Número máximo de itens
+
+        Returns:
+            Dicionário com os itens da página e o total de arquivos
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT source, chunks, tokens, bytes, embedding_model, last_ingested_at,
+                       file_size, mtime, content_hash, chunk_size, chunk_overlap, chunking
+                FROM documents ORDER BY source LIMIT ? OFFSET ?
+            """, (limit, offset)).fetchall()
+            total = conn.execute("SELECT documents FROM corpus_totals WHERE id = 1").fetchone()[0]
+            return {
+                "items": [dict(row) for row in rows],
+                "offset": offset,
+                "limit": limit,
+                "total": total
+            }
+
+    def is_empty(self) -> bool:
+        """Verifica se o registro ainda não possui documentos."""
+        return self.get_totals()["documents"] == 0
+
+    def rebuild_from_collection(self, collection, token_counter, embedding_model: Optional[str] = None,
+                                page_size: int = 1000) -> Dict[str, Any]:
+        """
+        Reconstrói o registro a partir de uma coleção do Chroma existente.
+
+        Usado uma única vez para bancos criados antes do registro; a coleção é
+        percorrida em páginas para manter o uso de memória limitado. Os
+        caminhos relativos gravados por versões antigas são resolvidos para
+        absolutos (normalize_source), a mesma chave usada pela ingestão. Como
+        a impressão digital dos arquivos não é conhecida, a próxima ingestão
+        de cada arquivo o reprocessa e substitui seus chunks.
+
+        Args:
+            collection: Coleção do Chroma
+            token_counter: Função que conta os tokens de um texto
+            embedding_model: Modelo de embedding associado
+            page_size: Tamanho de cada página lida da coleção
+
+        Returns:
+            Totais reconstruídos
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM documents")
+            conn.execute("DELETE FROM document_chunks")
+            conn.execute("""
+                UPDATE corpus_totals SET documents = 0, chunks = 0, tokens = 0, bytes = 0
+                WHERE id = 1
+            """)
+            conn.commit()
+
+        per_source: Dict[str, Dict[str, int]] = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            documents = page.get("documents") or []
+            if not documents:
+                break
+            chunk_rows = []
+            metadatas = page.get("metadatas") or [{}] * len(documents)
+            for chunk_id, text, metadata in zip(page["ids"], documents, metadatas):
+                source = normalize_source((metadata or {}).get("source"))
+                stats = per_source.setdefault(source, {"chunks": 0, "tokens": 0, "bytes": 0})
+                stats["chunks"] += 1
+                stats["tokens"] += token_counter(text or "")
+                stats["bytes"] += len((text or "").encode("utf-8"))
+                chunk_rows.append((source, chunk_id))
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO document_chunks (source, chunk_id) VALUES (?, ?)",
+                    chunk_rows
+                )
+                conn.commit()
+            offset += len(documents)
+
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT INTO documents (source, chunks, tokens, bytes, embedding_model, last_ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (source, stats["chunks"], stats["tokens"], stats["bytes"], embedding_model, now)
+                for source, stats in per_source.items()
+            ])
+            conn.execute("""
+                UPDATE corpus_totals SET
+                    documents = ?, chunks = ?, tokens = ?, bytes = ?,
+                    embedding_model = ?, last_ingested_at = ?, version = version + 1
+                WHERE id = 1
+            """, (
+                len(per_source),
+                sum(stats["chunks"] for stats in per_source.values()),
+                sum(stats["tokens"] for stats in per_source.values()),
+                sum(stats["bytes"] for stats in per_source.values()),
+                embedding_model,
+                now
+            ))
+            conn.commit()
+
+        return self.get_totals()
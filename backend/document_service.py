@@ -3,92 +3,912 @@ Serviço para gerenciamento de documentos e consultas.
 """
 
 import os
+import glob
+import time
 import asyncio
-from typing import List, Dict, Any, Optional
+import hashlib
+import functools
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Iterator
 from datetime import datetime
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain_chroma import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
+from langchain_community.document_loaders import TextLoader, Docx2txtLoader
+from langchain.schema import Document
 
 from config import *
+from chunking import make_text_splitter, chunk_defaults
+from answer_cache import SemanticAnswerCache, ANSWER_CACHE_FILENAME
+from document_registry import DocumentRegistry, REGISTRY_FILENAME
+from pdf_loader import ParallelPDFLoader
+from compact_store import CompactVectorStore, COMPACT_STORE_DIRNAME
+from exact_store import ExactVectorStore, EXACT_STORE_DIRNAME
+from embedding_profiles import (
+    get_profile, custom_profile, profile_key, output_dimensions, make_embeddings, ensure_profile
+)
+from embedding_executor import EmbeddingExecutor, EmbeddingCoalescer
+from embedding_cache import CachedEmbeddings, EmbeddingStore, QueryEmbeddingCache, EMBEDDING_CACHE_FILENAME
+from query_pipeline import QueryPipeline
+from filter_retriever import RedundantFilterRetriever, HybridRetriever
+from bm25_index import BM25Index, BM25_INDEX_FILENAME
+from hnsw_profiles import get_hnsw_profile, collection_configuration, hnsw_settings
+from tokenizer import count_tokens
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Calcula o hash SHA-256 de um arquivo lendo-o em blocos."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_document_files(directory: str, recursive: bool = True) -> List[str]:
+    """Lista (em ordem) os arquivos suportados de um diretório, com caminho absoluto."""
+    paths = []
+    if recursive:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in files)
+    else:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return sorted(
+        os.path.abspath(path) for path in paths
+        if os.path.isfile(path) and os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+    )
+
+
+def resolve_document_files(directory: Optional[str] = None, pattern: Optional[str] = None,
+                           files: Optional[List[str]] = None, recursive: bool = True) -> List[str]:
+    """
+    Resolve os arquivos de uma ingestão em massa.
+    
+    Args:
+        directory: Diretório com os documentos
+        pattern: Padrão glob (ex.: "docs/**/*.pdf")
+        files: Lista explícita de arquivos (manifesto)
+        recursive: Incluir subdiretórios de directory
+        
+    Returns:
+        Caminhos absolutos, sem repetição e em ordem, dos arquivos suportados
+        
+    Raises:
+        Exception: Diretório inexistente ou arquivo do manifesto inexistente/não suportado
+    """
+    paths = set()
+    if directory:
+        if not os.path.isdir(directory):
+            raise Exception(f"Diretório não encontrado: {directory}")
+        paths.update(list_document_files(directory, recursive=recursive))
+    if pattern:
+        paths.update(
+            os.path.abspath(path) for path in glob.glob(pattern, recursive=True)
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+        )
+    for path in files or []:
+        if not os.path.isfile(path):
+            raise Exception(f"Arquivo não encontrado: {path}")
+        if os.path.splitext(path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise Exception(f"Tipo de arquivo não suportado: {path}")
+        paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def iter_text_documents(file_path: str, block_size: int = STREAMING_BLOCK_SIZE) -> Iterator[Document]:
+    """
+    Lê um arquivo de texto em blocos de ~block_size caracteres.
+    
+    Os blocos terminam em uma quebra de parágrafo (ou de linha) sempre que
+    possível, para que os chunks fiquem iguais aos do arquivo inteiro. Arquivos
+    menores que um bloco geram um único documento, como o TextLoader.
+    """
+    pending = ""
+    with open(file_path, encoding="utf-8") as file:
+        while block := file.read(block_size):
+            pending += block
+            if len(block) < block_size:
+                break  # Fim do arquivo
+            for separator in ("\n\n", "\n"):
+                cut = pending.rfind(separator)
+                if cut >= 0:
+                    cut += len(separator)
+                    break
+            if cut < 0 and len(pending) >= 4 * block_size:
+                cut = len(pending)  # Sem quebras de linha: cortar mesmo assim
+            if cut <= 0:
+                continue
+            yield Document(page_content=pending[:cut], metadata={"source": file_path})
+            pending = pending[cut:]
+    if pending or not os.path.getsize(file_path):
+        yield Document(page_content=pending, metadata={"source": file_path})
+
+
+def iter_chunks(file_path: str, chunk_size: int = 600, chunk_overlap: int = 200,
+                chunking: Optional[str] = None) -> Iterator[Document]:
+    """
+    Lê um arquivo e gera seus chunks sob demanda.
+    
+    Páginas (PDF) e blocos (texto) são carregados e divididos um de cada vez,
+    de modo que a memória não cresce com o tamanho do arquivo.
+    """
+    # Carregar documento baseado na extensão
+    if file_path.endswith('.pdf'):
+        documents = ParallelPDFLoader(file_path).lazy_load()
+    elif file_path.endswith('.docx'):
+        documents = Docx2txtLoader(file_path).lazy_load()
+    else:
+        documents = iter_text_documents(file_path)
+    
+    # Dividir em chunks (por caracteres ou por tokens, conforme a estratégia)
+    text_splitter = make_text_splitter(chunk_size, chunk_overlap, chunking)
+    
+    for document in documents:
+        yield from text_splitter.split_documents([document])
+
+
+def split_document(file_path: str, chunk_size: int = 600, chunk_overlap: int = 200,
+                   chunking: Optional[str] = None) -> List[Document]:
+    """
+    Lê um arquivo e o divide em chunks.
+    
+    Função de módulo (sem estado) para poder rodar em um pool de processos.
+    """
+    return list(iter_chunks(file_path, chunk_size, chunk_overlap, chunking))
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Memória residente (RSS) atual do processo em MB, lida de /proc/self/statm.
+    
+    Diferente de ru_maxrss (pico desde o início do processo), reflete o
+    momento da leitura; None fora do Linux.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * _PAGE_SIZE / 1024 ** 2, 1)
+
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Agrupa um iterável em listas de até size itens."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def make_chunk_id(source: str, content: str) -> str:
+    """Gera um ID determinístico para um chunk a partir da origem e do conteúdo."""
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{source}\0{content_hash}".encode("utf-8")).hexdigest()
+
+
+def collection_db_path(persist_directory: str, filename: str, collection_name: str = VECTOR_COLLECTION) -> str:
+    """
+    Caminho de um banco lateral (registro, índice BM25) de uma coleção.
+    
+    A coleção padrão do Chroma ("langchain") mantém os arquivos criados antes
+    do suporte a várias coleções; as demais usam o nome da coleção no arquivo
+    (ex.: document_registry.manuais.db).
+    """
+    if collection_name != DEFAULT_COLLECTION:
+        stem, extension = os.path.splitext(filename)
+        filename = f"{stem}.{collection_name}{extension}"
+    return os.path.join(persist_directory, filename)
+
+
+def resolve_backend(persist_directory: str, collection_name: str = VECTOR_COLLECTION,
+                    backend: Optional[str] = None) -> str:
+    """
+    Escolhe o backend de uma coleção.
+    
+    Ordem: backend informado, VECTOR_COLLECTION_BACKENDS, backend com que a
+    coleção já existe em disco (compact/exact) e, por fim, VECTOR_STORE_BACKEND.
+    
+    Raises:
+        ValueError: Backend desconhecido
+    """
+    backend = backend or VECTOR_COLLECTION_BACKENDS.get(collection_name)
+    if backend is None:
+        for name, dirname in (("exact", EXACT_STORE_DIRNAME), ("compact", COMPACT_STORE_DIRNAME)):
+            if os.path.isdir(os.path.join(persist_directory, dirname, collection_name)):
+                backend = name
+                break
+    backend = backend or VECTOR_STORE_BACKEND
+    if backend not in VECTOR_STORE_BACKENDS:
+        raise ValueError(f"Backend vetorial inválido: {backend}. Use um de: {', '.join(VECTOR_STORE_BACKENDS)}")
+    return backend
+
+
+def make_vectorstore(persist_directory: str, embeddings: Optional[Any] = None,
+                     collection_name: str = VECTOR_COLLECTION, backend: Optional[str] = None,
+                     hnsw_profile: Optional[str] = None):
+    """
+    Abre (ou cria) uma coleção do banco vetorial.
+    
+    Args:
+        persist_directory: Diretório do banco de dados vetorial
+        embeddings: Modelo de embedding da coleção
+        collection_name: Nome da coleção
+        backend: "chroma", "compact" (embeddings quantizados) ou "exact" (float32,
+            busca exata); padrão: ver resolve_backend
+        hnsw_profile: Perfil HNSW usado se a coleção do Chroma for criada (padrão: HNSW_PROFILE)
+    """
+    backend = resolve_backend(persist_directory, collection_name, backend)
+    if backend in ("compact", "exact"):
+        store_class = CompactVectorStore if backend == "compact" else ExactVectorStore
+        return store_class(
+            persist_directory=persist_directory,
+            embedding_function=embeddings,
+            collection_name=collection_name
+        )
+    return Chroma(
+        persist_directory=persist_directory,
+        embedding_function=embeddings,
+        collection_name=collection_name,
+        collection_configuration=collection_configuration(get_hnsw_profile(hnsw_profile))
+    )
 
 
 class DocumentService:
     """Serviço para gerenciamento de documentos e consultas."""
     
-    def __init__(self):
-        """Inicializa o serviço de documentos."""
-        if not OPENAI_API_KEY:
+    def __init__(self, llm=None, embeddings=None, persist_directory: str = PERSIST_DIRECTORY,
+                 embedding_cache: bool = EMBEDDING_CACHE_ENABLED,
+                 query_embedding_cache: bool = QUERY_EMBEDDING_CACHE_ENABLED,
+                 answer_cache: bool = ANSWER_CACHE_ENABLED,
+                 vector_store_backend: Optional[str] = None,
+                 embedding_profile: Optional[str] = None,
+                 collection_name: str = VECTOR_COLLECTION,
+                 hnsw_profile: Optional[str] = None):
+        """
+        Inicializa o serviço de documentos.
+        
+        Args:
+            llm: Modelo de chat a utilizar (padrão: ChatOpenAI)
+            embeddings: Modelo de embedding a utilizar (padrão: OpenAIEmbeddings)
+            persist_directory: Diretório do banco de dados vetorial
+            embedding_cache: Se os embeddings de documentos devem passar pelo cache persistente
+            query_embedding_cache: Se os embeddings de consultas devem passar pelo cache LRU
+            answer_cache: Se respostas de consultas similares devem ser reutilizadas
+            vector_store_backend: "chroma", "compact" ou "exact" (padrão: ver resolve_backend)
+            embedding_profile: Perfil de EMBEDDING_PROFILES (padrão: EMBEDDING_PROFILE)
+            collection_name: Coleção do banco vetorial
+            hnsw_profile: Perfil HNSW de HNSW_PROFILES para coleções novas do Chroma (padrão: HNSW_PROFILE)
+            
+        Raises:
+            EmbeddingProfileError: A coleção foi indexada com outro perfil de embedding
+        """
+        if (llm is None or embeddings is None) and not OPENAI_API_KEY:
             raise Exception("OPENAI_API_KEY não está configurada. Configure a variável de ambiente OPENAI_API_KEY.")
         
-        self.llm = ChatOpenAI(
+        self.llm = llm or ChatOpenAI(
             model_name=MODEL_NAME,
             temperature=TEMPERATURE,
             openai_api_key=OPENAI_API_KEY
         )
         
-        self.embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+        # Perfil de embedding (modelo, dimensões e lote); as novas tentativas
+        # ficam a cargo do EmbeddingExecutor
+        if embeddings is None:
+            self.embedding_profile = get_profile(embedding_profile)
+            self.embeddings = make_embeddings(self.embedding_profile)
+        else:
+            self.embedding_profile = get_profile(embedding_profile) if embedding_profile else custom_profile(embeddings)
+            self.embeddings = embeddings
+        self.embedding_model = profile_key(self.embedding_profile)
+        self.embedding_dimensions = output_dimensions(self.embedding_profile)
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        
+        # Lotes por tokens enviados em paralelo, com backoff adaptativo em 429
+        # e pedidos simultâneos (ingestão em massa) agrupados nas mesmas requisições
+        self.embedding_executor = EmbeddingExecutor(
+            self.embeddings, max_batch_size=self.embedding_profile["batch_size"]
+        )
+        self.embedding_coalescer = EmbeddingCoalescer(self.embedding_executor)
+        self.embeddings = self.embedding_coalescer
+        
+        # Cache persistente de embeddings por (modelo, hash do texto) e
+        # cache LRU com TTL para embeddings de consultas
+        self.embedding_cache: Optional[CachedEmbeddings] = None
+        if embedding_cache or query_embedding_cache:
+            store = None
+            if embedding_cache:
+                store = EmbeddingStore(
+                    os.path.join(persist_directory, EMBEDDING_CACHE_FILENAME),
+                    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+                    max_bytes=EMBEDDING_CACHE_MAX_BYTES
+                )
+            query_cache = None
+            if query_embedding_cache:
+                query_cache = QueryEmbeddingCache(
+                    max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+                    ttl_seconds=QUERY_EMBEDDING_CACHE_TTL
+                )
+            self.embedding_cache = CachedEmbeddings(
+                self.embeddings,
+                store,
+                self.embedding_model,
+                query_cache=query_cache,
+                persist_queries=QUERY_EMBEDDING_CACHE_PERSIST
+            )
+            self.embeddings = self.embedding_cache
         
         # Inicializar ou carregar banco de dados vetorial
-        if os.path.exists(PERSIST_DIRECTORY):
+        if os.path.exists(persist_directory):
             print("✅ Banco de dados existente carregado")
-            self.vectorstore = Chroma(
-                persist_directory=PERSIST_DIRECTORY,
-                embedding_function=self.embeddings
-            )
         else:
             print("📁 Criando novo banco de dados vetorial")
-            self.vectorstore = Chroma(
-                persist_directory=PERSIST_DIRECTORY,
-                embedding_function=self.embeddings
+        self.vector_store_backend = resolve_backend(persist_directory, collection_name, vector_store_backend)
+        self.vectorstore = make_vectorstore(persist_directory, self.embeddings, collection_name,
+                                            self.vector_store_backend, hnsw_profile)
+        
+        # Recusar coleções indexadas com outro modelo/dimensão
+        ensure_profile(self.vectorstore._collection, self.embedding_profile, self.embedding_dimensions)
+        
+        # Contador de chunks em memória (inicializado a partir dos metadados da coleção)
+        self._count_lock = threading.Lock()
+        self._chunk_count: Optional[int] = None
+        
+        # Pool limitado para as chamadas síncronas (Chroma, loaders, SQLite)
+        self.executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_IO_WORKERS,
+            thread_name_prefix="document-service"
+        )
+        
+        # Um lock por documento: cargas diretas e jobs da fila não intercalam
+        # a troca (inserir novos, apagar antigos) do mesmo source
+        self._source_locks_guard = threading.Lock()
+        self._source_locks: Dict[str, threading.Lock] = {}
+        
+        # Pipelines de consulta compilados, por (lambda_mult, k_documents)
+        self._pipelines_lock = threading.Lock()
+        self._pipelines: Dict[Tuple[float, int], QueryPipeline] = {}
+        
+        # Registro lateral com estatísticas por arquivo
+        self.registry = DocumentRegistry(collection_db_path(persist_directory, REGISTRY_FILENAME, collection_name))
+        if self.registry.is_empty() and self.count_chunks() > 0:
+            print("🔄 Reconstruindo registro de estatísticas a partir da coleção existente...")
+            self.registry.rebuild_from_collection(
+                self.vectorstore._collection,
+                count_tokens,
+                self.embedding_model
             )
+        self.corpus_version = self.registry.get_totals()["version"]
+        
+        # Índice lexical BM25, atualizado junto com a coleção
+        self.lexical_index: Optional[BM25Index] = None
+        if LEXICAL_INDEX_ENABLED:
+            self.lexical_index = BM25Index(collection_db_path(persist_directory, BM25_INDEX_FILENAME, collection_name))
+            if self.lexical_index.count() == 0 and self.count_chunks() > 0:
+                print("🔄 Construindo índice lexical (BM25) a partir da coleção existente...")
+                self.lexical_index.rebuild_from_collection(self.vectorstore._collection)
+        
+        # Cache semântico de respostas, invalidado a cada mudança no corpus
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        if answer_cache:
+            self.answer_cache = SemanticAnswerCache(
+                os.path.join(persist_directory, ANSWER_CACHE_FILENAME),
+                collection=collection_name,
+                threshold=ANSWER_CACHE_THRESHOLD,
+                max_entries=ANSWER_CACHE_MAX_ENTRIES
+            )
+    
+    async def run_blocking(self, func, *args, **kwargs):
+        """Executa uma função síncrona no pool de threads do serviço."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    def source_lock(self, source: str) -> threading.Lock:
+        """Lock que serializa a ingestão de um documento (chave: caminho absoluto do source)."""
+        key = os.path.abspath(source)
+        with self._source_locks_guard:
+            return self._source_locks.setdefault(key, threading.Lock())
+    
+    async def load_document(self, file_path: str, chunk_size: Optional[int] = None,
+                            chunk_overlap: Optional[int] = None, force: bool = False,
+                            source: Optional[str] = None, content_hash: Optional[str] = None,
+                            chunking: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Carrega um documento no banco de dados vetorial sem bloquear o event loop.
+        
+        Args:
+            file_path: Caminho para o arquivo
+            chunk_size: Tamanho dos chunks (padrão da estratégia de chunking)
+            chunk_overlap: Sobreposição entre chunks (padrão da estratégia de chunking)
+            force: Reprocessa o arquivo mesmo que não tenha mudado
+            source: Nome lógico do documento no índice (padrão: o próprio caminho)
+            content_hash: SHA-256 do arquivo, se já calculado (ex.: durante o upload)
+            chunking: Estratégia de chunking, "characters" ou "tokens" (padrão: CHUNKING_STRATEGY)
+            
+        Returns:
+            Dicionário com status, documents_count, inserted, skipped e deleted
+        """
+        return await self.run_blocking(
+            self.load_document_sync, file_path, chunk_size, chunk_overlap, force, source, content_hash, chunking
+        )
     
-    async def load_document(self, file_path: str, chunk_size: int = 600, chunk_overlap: int = 200) -> int:
+    def load_document_sync(self, file_path: str, chunk_size: Optional[int] = None,
+                           chunk_overlap: Optional[int] = None, force: bool = False,
+                           source: Optional[str] = None, content_hash: Optional[str] = None,
+                           chunking: Optional[str] = None) -> Dict[str, Any]:
         """
-        Carrega um documento no banco de dados vetorial.
+        Carrega um documento no banco de dados vetorial (versão síncrona).
+        
+        Arquivos cujo tamanho/mtime (ou hash do conteúdo) e parâmetros de
+        chunking não mudaram desde a última ingestão não são reprocessados.
+        Quando o arquivo mudou, apenas os chunks novos são inseridos e os que
+        deixaram de existir são removidos. Cargas do mesmo documento (diretas
+        ou pela fila de ingestão) são serializadas por source_lock.
         
         Args:
             file_path: Caminho para o arquivo
-            chunk_size: Tamanho dos chunks
-            chunk_overlap: Sobreposição entre chunks
+            chunk_size: Tamanho dos chunks (padrão da estratégia de chunking)
+            chunk_overlap: Sobreposição entre chunks (padrão da estratégia de chunking)
+            force: Reprocessa o arquivo mesmo que não tenha mudado
+            source: Nome lógico do documento no índice (padrão: o próprio caminho)
+            content_hash: SHA-256 do arquivo, se já calculado (ex.: durante o upload)
+            chunking: Estratégia de chunking, "characters" ou "tokens" (padrão: CHUNKING_STRATEGY)
             
         Returns:
-            Número de documentos carregados
+            Dicionário com status ("added", "updated" ou "unchanged"),
+            documents_count (chunks do arquivo), inserted, skipped, deleted
+            e peak_rss_mb (maior RSS do processo medida durante esta ingestão)
         """
         try:
-            # Carregar documento baseado na extensão
-            if file_path.endswith('.pdf'):
-                loader = PyPDFLoader(file_path)
-            elif file_path.endswith('.docx'):
-                loader = Docx2txtLoader(file_path)
-            else:
-                loader = TextLoader(file_path, encoding='utf-8')
+            with self.source_lock(source or file_path):
+                prepared = self.prepare_document(
+                    file_path, chunk_size, chunk_overlap, force, source, content_hash, chunking
+                )
+                if prepared["unchanged"]:
+                    return prepared["unchanged"]
+                
+                chunks = iter_chunks(
+                    prepared["file_path"], prepared["chunk_size"], prepared["chunk_overlap"], prepared["chunking"]
+                )
+                return self.index_chunks(prepared, chunks)
+            
+        except Exception as e:
+            print(f"Erro detalhado ao carregar documento: {str(e)}")
+            print(f"Tipo do erro: {type(e).__name__}")
+            raise Exception(f"Erro ao carregar documento: {str(e)}")
+    
+    def prepare_document(self, file_path: str, chunk_size: Optional[int] = None,
+                         chunk_overlap: Optional[int] = None, force: bool = False,
+                         source: Optional[str] = None, content_hash: Optional[str] = None,
+                         chunking: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Primeira etapa da ingestão: verifica se o arquivo mudou.
+        
+        Args:
+            file_path: Caminho do arquivo a ser lido
+            chunk_size: Tamanho dos chunks (padrão da estratégia de chunking)
+            chunk_overlap: Sobreposição entre chunks (padrão da estratégia de chunking)
+            force: Reprocessa o arquivo mesmo que não tenha mudado
+            source: Nome lógico do documento no índice (padrão: o próprio caminho)
+            content_hash: SHA-256 do arquivo, se já calculado (evita reler o arquivo)
+            chunking: Estratégia de chunking, "characters" ou "tokens" (padrão: CHUNKING_STRATEGY)
+        
+        Returns:
+            Dicionário com o caminho absoluto, a impressão digital do arquivo,
+            o registro anterior e, se nada mudou, o resultado pronto em "unchanged"
+        """
+        file_path = os.path.abspath(file_path)
+        source = os.path.abspath(source) if source else file_path
+        chunking = chunking or CHUNKING_STRATEGY
+        default_size, default_overlap = chunk_defaults(chunking)
+        chunk_size = default_size if chunk_size is None else chunk_size
+        chunk_overlap = default_overlap if chunk_overlap is None else chunk_overlap
+        stat = os.stat(file_path)
+        previous = self.registry.get_document(source)
+        prepared = {
+            "file_path": file_path,
+            "source": source,
+            "file_size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "content_hash": None,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "chunking": chunking,
+            "previous": previous,
+            "unchanged": None
+        }
+        
+        same_params = (
+            previous is not None
+            and previous["chunk_size"] == chunk_size
+            and previous["chunk_overlap"] == chunk_overlap
+            and (previous["chunking"] or "characters") == chunking
+        )
+        if same_params and not force and previous["file_size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+            prepared["unchanged"] = self._unchanged_result(previous)
+            return prepared
+        
+        prepared["content_hash"] = content_hash or hash_file(file_path)
+        if same_params and not force and previous["content_hash"] == prepared["content_hash"]:
+            self.registry.touch_document(source, stat.st_size, stat.st_mtime)
+            prepared["unchanged"] = self._unchanged_result(previous)
+        return prepared
+    
+    def index_chunks(self, prepared: Dict[str, Any], chunks: Iterable[Document],
+                     progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+        """
+        Última etapa da ingestão: gera embeddings, insere e troca os chunks do arquivo.
+        
+        Os chunks são consumidos em lotes de INGESTION_BATCH_SIZE (podem vir de
+        um gerador): cada lote é deduplicado, embedado e inserido antes de o
+        próximo ser lido. Só os IDs dos chunks ficam em memória até o fim.
+        
+        Args:
+            prepared: Resultado de prepare_document
+            chunks: Chunks gerados por iter_chunks/split_document
+            progress: Callback opcional chamado com (chunks processados, total ou None)
             
-            documents = loader.load()
+        Returns:
+            Dicionário no formato de load_document_sync, com peak_rss_mb: a
+            maior RSS do processo amostrada após cada lote desta ingestão
+        """
+        source = prepared["source"]
+        previous = prepared["previous"]
+        total = len(chunks) if hasattr(chunks, "__len__") else None
+        
+        chunk_ids: Dict[str, None] = {}  # IDs únicos do arquivo, em ordem
+        processed = inserted = tokens = size_bytes = 0
+        rss_samples = [current_rss_mb()]
+        if progress:
+            progress(0, total)
+        
+        # Inserir primeiro os chunks novos, lote a lote, e só então remover os
+        # antigos, para que o arquivo nunca fique sem chunks durante a troca
+        for batch in batched(chunks, INGESTION_BATCH_SIZE):
+            unique = {}
+            for chunk in batch:
+                chunk.metadata["source"] = source
+                chunk_id = make_chunk_id(source, chunk.page_content)
+                if chunk_id not in chunk_ids and chunk_id not in unique:
+                    unique[chunk_id] = chunk
             
-            # Dividir em chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap
-            )
+            new_ids = self._new_chunk_ids(list(unique))
+            if new_ids:
+                self.vectorstore.add_documents([unique[chunk_id] for chunk_id in new_ids], ids=new_ids)
+                if self.lexical_index is not None:
+                    self.lexical_index.add(new_ids, [unique[chunk_id].page_content for chunk_id in new_ids],
+                                           [source] * len(new_ids))
+            
+            for chunk_id, chunk in unique.items():
+                chunk_ids[chunk_id] = None
+                tokens += count_tokens(chunk.page_content)
+                size_bytes += len(chunk.page_content.encode("utf-8"))
+            processed += len(batch)
+            inserted += len(new_ids)
+            rss_samples.append(current_rss_mb())
+            if progress:
+                progress(processed, total)
+        
+        stale_ids = self._previous_chunk_ids(source, previous) - chunk_ids.keys()
+        self._delete_chunks(list(stale_ids))
+        self._adjust_chunk_count(inserted - len(stale_ids))
+        
+        # Atualizar o registro (estatísticas, impressão digital e IDs)
+        self.registry.upsert_document(
+            source=source,
+            chunks=len(chunk_ids),
+            tokens=tokens,
+            size_bytes=size_bytes,
+            chunk_ids=list(chunk_ids),
+            embedding_model=self.embedding_model,
+            file_size=prepared["file_size"],
+            mtime=prepared["mtime"],
+            content_hash=prepared["content_hash"] or hash_file(prepared["file_path"]),
+            chunk_size=prepared["chunk_size"],
+            chunk_overlap=prepared["chunk_overlap"],
+            chunking=prepared["chunking"]
+        )
+        if inserted or stale_ids:
+            self._corpus_changed()
+        
+        return {
+            "status": "updated" if previous else "added",
+            "documents_count": processed,
+            "inserted": inserted,
+            "skipped": processed - inserted,
+            "deleted": len(stale_ids),
+            "peak_rss_mb": max(rss_samples) if None not in rss_samples else None
+        }
+    
+    @staticmethod
+    def _unchanged_result(previous: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "unchanged",
+            "documents_count": previous["chunks"],
+            "inserted": 0,
+            "skipped": previous["chunks"],
+            "deleted": 0,
+            "peak_rss_mb": current_rss_mb()
+        }
+    
+    def _previous_chunk_ids(self, source: str, previous: Optional[Dict[str, Any]]) -> set:
+        """IDs dos chunks já indexados de um arquivo (registro ou metadados da coleção)."""
+        ids = set(self.registry.get_chunk_ids(source)) if previous else set()
+        if not ids:
+            # Bancos anteriores ao registro: localizar pelos metadados, que
+            # podem ter o caminho relativo usado na ingestão original
+            candidates = [source]
+            try:
+                candidates.append(os.path.relpath(source))
+            except ValueError:
+                pass  # Outra unidade (Windows): não há caminho relativo
+            for candidate in dict.fromkeys(candidates):
+                found = self.vectorstore._collection.get(where={"source": candidate}, include=[])
+                ids.update(found["ids"])
+        return ids
+    
+    def _delete_chunks(self, chunk_ids: List[str]):
+        """Remove chunks da coleção (e do índice lexical) em lotes."""
+        for start in range(0, len(chunk_ids), 500):
+            self.vectorstore._collection.delete(ids=chunk_ids[start:start + 500])
+        if self.lexical_index is not None:
+            self.lexical_index.delete(chunk_ids)
+    
+    async def remove_document(self, file_path: str) -> Dict[str, Any]:
+        """Remove um arquivo e seus chunks do banco vetorial."""
+        return await self.run_blocking(self.remove_document_sync, file_path)
+    
+    def remove_document_sync(self, file_path: str) -> Dict[str, Any]:
+        """
+        Remove um arquivo e seus chunks do banco vetorial (versão síncrona).
+        
+        Args:
+            file_path: Caminho do arquivo registrado
             
-            chunks = text_splitter.split_documents(documents)
+        Returns:
+            Dicionário com status ("removed" ou "not_found") e deleted
+        """
+        file_path = os.path.abspath(file_path)
+        previous = self.registry.get_document(file_path)
+        if previous is None:
+            return {"status": "not_found", "deleted": 0}
+        
+        chunk_ids = list(self._previous_chunk_ids(file_path, previous))
+        self._delete_chunks(chunk_ids)
+        self._adjust_chunk_count(-len(chunk_ids))
+        self.registry.remove_document(file_path)
+        self._corpus_changed()
+        return {"status": "removed", "deleted": len(chunk_ids)}
+    
+    async def sync_directory(self, directory: str, chunk_size: Optional[int] = None,
+                             chunk_overlap: Optional[int] = None, recursive: bool = True,
+                             chunking: Optional[str] = None) -> Dict[str, Any]:
+        """Sincroniza um diretório com o banco vetorial sem bloquear o event loop."""
+        return await self.run_blocking(
+            self.sync_directory_sync, directory, chunk_size, chunk_overlap, recursive, chunking
+        )
+    
+    def sync_directory_sync(self, directory: str, chunk_size: Optional[int] = None,
+                            chunk_overlap: Optional[int] = None, recursive: bool = True,
+                            chunking: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Sincroniza um diretório com o banco vetorial (reingestão incremental).
+        
+        Arquivos inalterados não são reprocessados, arquivos alterados têm
+        apenas seus chunks trocados e arquivos removidos do diretório têm
+        seus chunks apagados da coleção.
+        
+        Args:
+            directory: Diretório com os documentos
+            chunk_size: Tamanho dos chunks (padrão da estratégia de chunking)
+            chunk_overlap: Sobreposição entre chunks (padrão da estratégia de chunking)
+            recursive: Incluir subdiretórios
             
-            # Adicionar ao banco vetorial
-            self.vectorstore.add_documents(chunks)
+        Returns:
+            Relatório com os arquivos por status e os totais de chunks
+        """
+        directory = os.path.abspath(directory)
+        if not os.path.isdir(directory):
+            raise Exception(f"Diretório não encontrado: {directory}")
+        
+        report = {
+            "added": [], "updated": [], "unchanged": [], "removed": [], "failed": [],
+            "inserted": 0, "deleted": 0
+        }
+        
+        present = set()
+        for path in list_document_files(directory, recursive=recursive):
+            present.add(path)
+            try:
+                result = self.load_document_sync(path, chunk_size, chunk_overlap, chunking=chunking)
+            except Exception as e:
+                report["failed"].append({"file": path, "error": str(e)})
+                continue
+            report[result["status"]].append(path)
+            report["inserted"] += result["inserted"]
+            report["deleted"] += result["deleted"]
+        
+        for source in self.registry.list_sources(prefix=directory):
+            if source in present or os.path.exists(source):
+                continue
+            if not recursive and os.path.dirname(source) != directory:
+                continue
+            result = self.remove_document_sync(source)
+            report["removed"].append(source)
+            report["deleted"] += result["deleted"]
+        
+        return report
+    
+    async def bulk_load(self, paths: List[str], chunk_size: Optional[int] = None,
+                        chunk_overlap: Optional[int] = None, chunking: Optional[str] = None,
+                        force: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+        """Carrega vários arquivos em paralelo sem bloquear o event loop."""
+        loop = asyncio.get_running_loop()
+        # Fora do pool do serviço: os arquivos usam um pool próprio
+        return await loop.run_in_executor(None, functools.partial(
+            self.bulk_load_sync, paths, chunk_size, chunk_overlap, chunking, force, workers
+        ))
+    
+    def bulk_load_sync(self, paths: List[str], chunk_size: Optional[int] = None,
+                       chunk_overlap: Optional[int] = None, chunking: Optional[str] = None,
+                       force: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Carrega vários arquivos em paralelo (ingestão em massa).
+        
+        Os arquivos são distribuídos entre workers; todos compartilham o mesmo
+        EmbeddingCoalescer, que junta os chunks de arquivos diferentes nas
+        mesmas requisições e respeita um único limite de concorrência e de
+        taxa do provedor. Diferente de sync_directory, arquivos ausentes não
+        são removidos do índice.
+        
+        Args:
+            paths: Arquivos a carregar (ver resolve_document_files)
+            chunk_size: Tamanho dos chunks (padrão da estratégia de chunking)
+            chunk_overlap: Sobreposição entre chunks (padrão da estratégia de chunking)
+            chunking: Estratégia de chunking, "characters" ou "tokens"
+            force: Reprocessa os arquivos mesmo que não tenham mudado
+            workers: Arquivos processados simultaneamente (padrão: BULK_INGEST_WORKERS)
             
-            return len(chunks)
+        Returns:
+            Relatório com os arquivos por status, os totais de chunks, a
+            duração e a vazão
+        """
+        report = {
+            "files": len(paths), "added": [], "updated": [], "unchanged": [], "failed": [],
+            "inserted": 0, "skipped": 0, "deleted": 0
+        }
+        tokens_before = self.embedding_executor.get_stats()["tokens"]
+        started = time.perf_counter()
+        
+        workers = max(1, min(workers or BULK_INGEST_WORKERS, len(paths) or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-ingest") as pool:
+            futures = {
+                pool.submit(self.load_document_sync, path, chunk_size, chunk_overlap, force, chunking=chunking): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    report["failed"].append({"file": path, "error": str(e)})
+                    continue
+                report[result["status"]].append(path)
+                report["inserted"] += result["inserted"]
+                report["skipped"] += result["skipped"]
+                report["deleted"] += result["deleted"]
+        
+        for status in ("added", "updated", "unchanged"):
+            report[status].sort()
+        seconds = time.perf_counter() - started
+        report["seconds"] = round(seconds, 3)
+        report["chunks_per_second"] = round(report["inserted"] / seconds, 1) if seconds else 0.0
+        report["embedded_tokens"] = self.embedding_executor.get_stats()["tokens"] - tokens_before
+        return report
+    
+    def _new_chunk_ids(self, chunk_ids: List[str]) -> List[str]:
+        """
+        Filtra os IDs que ainda não estão na coleção.
+        
+        Args:
+            chunk_ids: IDs determinísticos dos chunks
             
-        except Exception as e:
-            print(f"Erro detalhado ao carregar documento: {str(e)}")
-            print(f"Tipo do erro: {type(e).__name__}")
-            raise Exception(f"Erro ao carregar documento: {str(e)}")
+        Returns:
+            IDs ainda não indexados, na ordem original
+        """
+        existing = set()
+        for start in range(0, len(chunk_ids), 500):
+            found = self.vectorstore._collection.get(ids=chunk_ids[start:start + 500], include=[])
+            existing.update(found["ids"])
+        return [chunk_id for chunk_id in chunk_ids if chunk_id not in existing]
+    
+    def get_pipeline(self, lambda_mult: float = LAMBDA_MULT, k_documents: int = K_DOCUMENTS) -> QueryPipeline:
+        """
+        Retorna o pipeline de consulta para (lambda_mult, k_documents),
+        compilando-o apenas na primeira vez em que a chave é usada.
+        """
+        key = (float(lambda_mult), int(k_documents))
+        pipeline = self._pipelines.get(key)
+        if pipeline is None:
+            with self._pipelines_lock:
+                pipeline = self._pipelines.get(key)
+                if pipeline is None:
+                    pipeline = QueryPipeline(
+                        vectorstore=self.vectorstore,
+                        embeddings=self.embeddings,
+                        llm=self.llm,
+                        lambda_mult=key[0],
+                        k_documents=key[1],
+                        executor=self.executor,
+                        answer_cache=self.answer_cache,
+                        corpus_version=lambda: self.corpus_version
+                    )
+                    self._pipelines[key] = pipeline
+        return pipeline
+    
+    def get_retriever(self, lambda_mult: float = LAMBDA_MULT, k_documents: int = K_DOCUMENTS,
+                      fetch_k: int = FETCH_K, timeout: Optional[float] = RETRIEVAL_TIMEOUT,
+                      ef_search: Optional[int] = None) -> RedundantFilterRetriever:
+        """
+        Cria um RedundantFilterRetriever sobre a coleção ativa.
+        
+        O retriever compartilha os embeddings (com cache) e o pool de threads
+        do serviço, então pode ser usado com ainvoke nos endpoints assíncronos.
+        """
+        return RedundantFilterRetriever(
+            embedding=self.embeddings,
+            chroma=self.vectorstore,
+            lambda_mult=lambda_mult,
+            k_documents=k_documents,
+            fetch_k=fetch_k,
+            ef_search=ef_search,
+            executor=self.executor,
+            timeout=timeout
+        )
     
-    async def query_documents(self, query: str, lambda_mult: float = 0.8, k_documents: int = 4) -> tuple:
+    def get_hybrid_retriever(self, lambda_mult: float = LAMBDA_MULT, k_documents: int = K_DOCUMENTS,
+                             fetch_k: int = FETCH_K, timeout: Optional[float] = RETRIEVAL_TIMEOUT,
+                             ef_search: Optional[int] = None) -> HybridRetriever:
+        """
+        Cria um HybridRetriever (BM25 + MMR com fusão RRF) sobre a coleção ativa.
+        
+        Raises:
+            Exception: Índice lexical desativado (LEXICAL_INDEX_ENABLED)
+        """
+        if self.lexical_index is None:
+            raise Exception("Índice lexical desativado (LEXICAL_INDEX_ENABLED = False)")
+        return HybridRetriever(
+            embedding=self.embeddings,
+            chroma=self.vectorstore,
+            bm25=self.lexical_index,
+            lambda_mult=lambda_mult,
+            k_documents=k_documents,
+            fetch_k=fetch_k,
+            ef_search=ef_search,
+            executor=self.executor,
+            timeout=timeout
+        )
+    
+    def compile_pipelines(self, presets: Optional[List[Tuple[float, int]]] = None) -> int:
+        """
+        Pré-compila os pipelines de consulta (chamado na inicialização da API).
+        
+        Args:
+            presets: Lista de pares (lambda_mult, k_documents)
+            
+        Returns:
+            Número de pipelines disponíveis
+        """
+        for lambda_mult, k_documents in presets or QUERY_PIPELINE_PRESETS:
+            self.get_pipeline(lambda_mult, k_documents)
+        return len(self._pipelines)
+    
+    async def query_documents(self, query: str, lambda_mult: float = 0.8, k_documents: int = 4,
+                              ef_search: Optional[int] = None) -> Dict[str, Any]:
         """
         Executa uma consulta nos documentos.
         
@@ -96,82 +916,98 @@ class DocumentService:
             query: Pergunta a ser respondida
             lambda_mult: Parâmetro para Max Marginal Relevance Search
             k_documents: Número de documentos a retornar
+            ef_search: Candidatos explorados no índice HNSW nesta consulta; só valores acima do da coleção têm efeito
             
         Returns:
-            Tupla com (resposta, documentos_utilizados)
+            Dicionário com answer, documents_used, sources (conteúdo, metadados
+            e score dos mesmos chunks usados no prompt) e cached
         """
         try:
-            # Criar retriever
-            retriever = self.vectorstore.as_retriever(
-                search_type="mmr",
-                search_kwargs={
-                    "lambda_mult": lambda_mult,
-                    "k": k_documents
-                }
-            )
-            
-            # Criar prompt template
-            prompt_template = """Use as seguintes informações do contexto para responder à pergunta.
-            Se você não souber a resposta baseada no contexto, diga que não tem informações suficientes.
-
-            Contexto: {context}
-
-            Pergunta: {question}
-
-            Resposta:"""
-
-            PROMPT = PromptTemplate(
-                template=prompt_template,
-                input_variables=["context", "question"]
-            )
-            
-            # Criar chain
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="stuff",
-                retriever=retriever,
-                chain_type_kwargs={"prompt": PROMPT}
-            )
-            
-            # Executar consulta
-            result = qa_chain({"query": query})
-            
-            # Obter documentos utilizados
-            docs = retriever.get_relevant_documents(query)
-            documents_used = [doc.page_content for doc in docs]
-            
-            return result["result"], documents_used
+            return await self.get_pipeline(lambda_mult, k_documents).ainvoke(query, ef_search)
             
         except Exception as e:
             raise Exception(f"Erro ao executar consulta: {str(e)}")
     
+    async def stream_query(self, query: str, lambda_mult: float = 0.8, k_documents: int = 4,
+                           ef_search: Optional[int] = None):
+        """
+        Executa uma consulta emitindo eventos incrementais.
+        
+        Args:
+            query: Pergunta a ser respondida
+            lambda_mult: Parâmetro para Max Marginal Relevance Search
+            k_documents: Número de documentos a retornar
+            ef_search: Candidatos explorados no índice HNSW nesta consulta; só valores acima do da coleção têm efeito
+            
+        Yields:
+            Eventos "documents", "token" e "done" (ou "error" em caso de falha)
+        """
+        try:
+            async for event in self.get_pipeline(lambda_mult, k_documents).astream(query, ef_search):
+                yield event
+        except Exception as e:
+            yield {"event": "error", "data": {"message": f"Erro ao executar consulta: {str(e)}"}}
+    
+    def _corpus_changed(self):
+        """Atualiza a versão do corpus e invalida o cache de respostas."""
+        self.corpus_version = self.registry.get_totals()["version"]
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(self.corpus_version)
+    
+    def count_chunks(self) -> int:
+        """
+        Retorna o número de chunks no banco vetorial.
+        
+        Usa o contador em memória, inicializado uma única vez a partir da
+        contagem da coleção do Chroma; não gera embeddings nem faz buscas.
+        """
+        with self._count_lock:
+            if self._chunk_count is None:
+                self._chunk_count = self.vectorstore._collection.count()
+            return self._chunk_count
+    
+    def _adjust_chunk_count(self, delta: int):
+        """Atualiza o contador em memória após inserções/remoções."""
+        with self._count_lock:
+            if self._chunk_count is None:
+                self._chunk_count = self.vectorstore._collection.count()
+            else:
+                self._chunk_count += delta
+    
     def has_documents(self) -> bool:
         """Verifica se há documentos carregados."""
         try:
-            # Tentar fazer uma consulta simples para verificar se há documentos
-            retriever = self.vectorstore.as_retriever(search_kwargs={"k": 1})
-            docs = retriever.get_relevant_documents("test")
-            return len(docs) > 0
-        except:
+            return self.count_chunks() > 0
+        except Exception:
             return False
     
     async def get_status(self) -> Dict[str, Any]:
-        """Retorna o status do serviço."""
+        """Retorna o status do serviço a partir do registro de estatísticas."""
         try:
-            has_docs = self.has_documents()
-            
-            if has_docs:
-                # Contar documentos
-                retriever = self.vectorstore.as_retriever(search_kwargs={"k": 1000})
-                docs = retriever.get_relevant_documents("test")
-                count = len(docs)
-            else:
-                count = 0
+            totals = await self.run_blocking(self.registry.get_totals)
+            count = await self.run_blocking(self.count_chunks)
+            lexical = await self.run_blocking(self.lexical_index.get_stats) if self.lexical_index else None
             
             return {
-                "has_documents": has_docs,
+                "has_documents": count > 0,
                 "documents_count": count,
-                "last_loaded": datetime.now().isoformat() if has_docs else None
+                "files_count": totals["documents"],
+                "total_tokens": totals["tokens"],
+                "total_bytes": totals["bytes"],
+                "embedding_model": totals["embedding_model"] or self.embedding_model,
+                "embedding_profile": self.embedding_profile["name"],
+                "embedding_dimensions": self.embedding_dimensions,
+                "collection": self.collection_name,
+                "last_loaded": totals["last_ingested_at"],
+                "embedding_cache": self.embedding_cache.get_stats() if self.embedding_cache else None,
+                "embedding_executor": self.embedding_coalescer.get_stats(),
+                "vector_store": (
+                    {"backend": self.vector_store_backend, **self.vectorstore._collection.get_stats()}
+                    if isinstance(self.vectorstore, CompactVectorStore)
+                    else {"backend": "chroma", "hnsw": hnsw_settings(self.vectorstore._collection)}
+                ),
+                "lexical_index": lexical,
+                "answer_cache": self.answer_cache.get_stats() if self.answer_cache else None
             }
         except Exception as e:
             return {
@@ -179,3 +1015,23 @@ class DocumentService:
                 "documents_count": 0,
                 "error": str(e)
             }
+    
+    def get_document_stats(self, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """
+        Retorna as estatísticas por arquivo de forma paginada.
+        
+        Args:
+            offset: Posição inicial
+            limit: Número máximo de arquivos
+            
+        Returns:
+            Página de estatísticas com os totais do corpus
+        """
+        page = self.registry.list_documents(offset=offset, limit=limit)
+        page["totals"] = self.registry.get_totals()
+        return page
+    
+    def close(self):
+        """Libera os pools de threads do serviço."""
+        self.executor.shutdown(wait=False)
+        self.embedding_coalescer.close()
@@ -0,0 +1,360 @@
+"""
+Cache persistente de embeddings endereçado por conteúdo.
+
+Os vetores são guardados em SQLite, indexados por (modelo, hash do texto),
+de modo que reingestões e experimentos de chunking só paguem o embedding
+de textos novos.
+"""
+
+import os
+import math
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+
+EMBEDDING_CACHE_FILENAME = "embedding_cache.db"
+
+
+def text_hash(text: str) -> str:
+    """Retorna o hash SHA-256 de um texto."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Armazenamento SQLite de vetores float32 com despejo LRU por número de
+    entradas e por tamanho total.
+    """
+
+    def __init__(self, db_path: str, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        """Cria a tabela do cache e carrega os totais atuais."""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+            conn.commit()
+            entries, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+        self.entries = entries
+        self.total_bytes = total_bytes
+        self.evictions = 0
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Busca vetores no cache e atualiza o instante de acesso (LRU).
+
+        Args:
+            model: Nome do modelo de embedding
+            hashes: Hashes dos textos
+
+        Returns:
+            Dicionário hash -> vetor, apenas para os encontrados
+        """
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+        now = time.time()
+        with self._connect() as conn:
+            # SQLite limita o número de parâmetros por consulta
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, key) for key in found]
+                )
+            conn.commit()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """
+        Grava vetores no cache e aplica o despejo LRU se necessário.
+
+        Args:
+            model: Nome do modelo de embedding
+            items: Dicionário hash -> vetor
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (model, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._lock, self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_access)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+            inserted = conn.total_changes - before
+            conn.commit()
+            if inserted:
+                self.entries += inserted
+                self.total_bytes += inserted * len(rows[0][2])
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Remove as entradas menos usadas recentemente até respeitar os limites."""
+        while ((self.max_entries and self.entries > self.max_entries) or
+               (self.max_bytes and self.total_bytes > self.max_bytes)):
+            excess = self.entries - self.max_entries if self.max_entries else 0
+            if self.max_bytes and self.total_bytes > self.max_bytes and self.entries:
+                average = self.total_bytes / self.entries
+                excess = max(excess, math.ceil((self.total_bytes - self.max_bytes) / average))
+            excess = max(excess, 1)
+            rows = conn.execute("""
+                SELECT model, text_hash, LENGTH(vector) FROM embeddings
+                ORDER BY last_access LIMIT ?
+            """, (excess,)).fetchall()
+            if not rows:
+                break
+            conn.executemany(
+                "DELETE FROM embeddings WHERE model = ? AND text_hash = ?",
+                [(model, key) for model, key, _ in rows]
+            )
+            conn.commit()
+            self.entries -= len(rows)
+            self.total_bytes -= sum(size for _, _, size in rows)
+            self.evictions += len(rows)
+
+    def clear(self):
+        """Remove todas as entradas do cache."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+            self.entries = 0
+            self.total_bytes = 0
+
+
+def normalize_query(text: str) -> str:
+    """Normaliza uma consulta (Unicode NFC, caixa e espaços) para uso como chave."""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Cache LRU em memória de embeddings de consultas, com expiração (TTL).
+
+    As chaves são as consultas normalizadas, de modo que variações de caixa
+    e espaçamento reutilizam o mesmo vetor.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """Retorna o vetor em cache da consulta, ou None se ausente/expirado."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, vector = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, query: str, vector: List[float]):
+        """Armazena o vetor de uma consulta, despejando o menos recente se necessário."""
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove todas as consultas em cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores do cache de consultas."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envolve um modelo de embedding com os caches de documentos e de consultas.
+
+    Documentos: apenas os textos ausentes do cache persistente (e sem
+    repetição dentro do lote) são enviados ao provedor.
+
+    Consultas: o cache LRU em memória é consultado primeiro e, se
+    persist_queries estiver ativo, o armazenamento em disco (compartilhado
+    entre processos) em seguida.
+    """
+
+    def __init__(self, underlying: Embeddings, store: Optional[EmbeddingStore], model_name: str,
+                 query_cache: Optional[QueryEmbeddingCache] = None, persist_queries: bool = False):
+        self.underlying = underlying
+        self.store = store
+        self.model = model_name
+        self.query_cache = query_cache
+        self.persist_queries = persist_queries and store is not None
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _query_namespace(self) -> str:
+        return f"{self.model}#query"
+
+    def _count(self, hits: int, misses: int):
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _lookup(self, texts: List[str]):
+        hashes = [text_hash(text) for text in texts]
+        cached = self.store.get_many(self.model, list(set(hashes)))
+        missing: Dict[str, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        return hashes, cached, missing
+
+    def _finish(self, hashes: List[str], cached: Dict[str, List[float]], missing: Dict[str, str],
+                vectors: List[List[float]]) -> List[List[float]]:
+        # Arredondar para float32, como no cache, para que o resultado não
+        # dependa de o texto já estar armazenado ou não
+        computed = {
+            key: np.asarray(vector, dtype=np.float32).tolist()
+            for key, vector in zip(missing.keys(), vectors)
+        }
+        self.store.put_many(self.model, computed)
+        self._count(len(hashes) - len(missing), len(missing))
+        return [cached[key] if key in cached else computed[key] for key in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Gera embeddings dos textos, reutilizando os já armazenados."""
+        if self.store is None:
+            return self.underlying.embed_documents(texts)
+        hashes, cached, missing = self._lookup(texts)
+        vectors = self.underlying.embed_documents(list(missing.values())) if missing else []
+        return self._finish(hashes, cached, missing, vectors)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Versão assíncrona de embed_documents."""
+        if self.store is None:
+            return await self.underlying.aembed_documents(texts)
+        hashes, cached, missing = await asyncio.to_thread(self._lookup, texts)
+        vectors = await self.underlying.aembed_documents(list(missing.values())) if missing else []
+        return await asyncio.to_thread(self._finish, hashes, cached, missing, vectors)
+
+    def _cached_query(self, text: str) -> Optional[List[float]]:
+        """Busca o embedding da consulta na memória e, se habilitado, em disco."""
+        if self.query_cache is not None:
+            vector = self.query_cache.get(text)
+            if vector is not None:
+                return vector
+        if self.persist_queries:
+            key = text_hash(normalize_query(text))
+            vector = self.store.get_many(self._query_namespace, [key]).get(key)
+            if vector is not None:
+                if self.query_cache is not None:
+                    self.query_cache.put(text, vector)
+                return vector
+        return None
+
+    def _store_query(self, text: str, vector: List[float]) -> List[float]:
+        vector = np.asarray(vector, dtype=np.float32).tolist()
+        if self.query_cache is not None:
+            self.query_cache.put(text, vector)
+        if self.persist_queries:
+            self.store.put_many(self._query_namespace, {text_hash(normalize_query(text)): vector})
+        return vector
+
+    def embed_query(self, text: str) -> List[float]:
+        """Gera o embedding de uma consulta, reutilizando consultas repetidas."""
+        vector = self._cached_query(text)
+        if vector is not None:
+            return vector
+        return self._store_query(text, self.underlying.embed_query(text))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Versão assíncrona de embed_query."""
+        if self.persist_queries:
+            vector = await asyncio.to_thread(self._cached_query, text)
+        else:
+            vector = self._cached_query(text)
+        if vector is not None:
+            return vector
+        vector = await self.underlying.aembed_query(text)
+        if self.persist_queries:
+            return await asyncio.to_thread(self._store_query, text, vector)
+        return self._store_query(text, vector)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores dos caches de documentos e de consultas."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": self.store.entries if self.store else 0,
+            "bytes": self.store.total_bytes if self.store else 0,
+            "evictions": self.store.evictions if self.store else 0,
+            "queries": self.query_cache.get_stats() if self.query_cache else None
+        }
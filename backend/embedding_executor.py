@@ -0,0 +1,432 @@
+"""
+Executor de embeddings para ingestão.
+
+Divide os textos em lotes limitados por tokens (e por quantidade), envia os
+lotes em paralelo com um limite de requisições simultâneas e trata limites
+de taxa (HTTP 429) com backoff exponencial com jitter e redução adaptativa
+da concorrência e do tamanho dos lotes.
+
+Embeddings de consultas seguem um caminho próprio: não disputam os slots da
+ingestão nem são afetados pela redução adaptativa, para que uma ingestão em
+massa (ou um 429 durante ela) não atrase as perguntas dos usuários.
+
+O EmbeddingCoalescer junta pedidos simultâneos de vários arquivos (ingestão
+em massa) para que arquivos pequenos não gerem uma requisição cada.
+"""
+
+import time
+import asyncio
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDING_BATCH_TOKENS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_RETRY_BASE_DELAY,
+    EMBEDDING_RETRY_MAX_DELAY,
+)
+from tokenizer import count_tokens
+
+
+# Erros transitórios (além do 429) que valem uma nova tentativa
+_TRANSIENT_ERRORS = ("APITimeoutError", "APIConnectionError", "InternalServerError", "Timeout", "ConnectionError")
+
+# Sucessos seguidos necessários para voltar a aumentar concorrência/lote
+_RECOVERY_STREAK = 8
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Indica se o erro é um limite de taxa do provedor (HTTP 429)."""
+    return _status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Indica se o erro é transitório (timeout, conexão, 5xx)."""
+    code = _status_code(error)
+    if code is not None and 500 <= code < 600:
+        return True
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in _TRANSIENT_ERRORS
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Lê o cabeçalho Retry-After da resposta, se houver."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingExecutor(Embeddings):
+    """
+    Embeddings que enviam lotes por tokens, em paralelo e com backoff adaptativo.
+
+    Envolve o modelo do provedor (ex.: OpenAIEmbeddings). A concorrência segue
+    um esquema AIMD: cai pela metade a cada 429 e sobe de um em um após uma
+    sequência de sucessos; o orçamento de tokens por lote faz o mesmo.
+    Consultas (embed_query/aembed_query) ficam fora desse limite e só
+    recebem as novas tentativas com backoff.
+    """
+
+    def __init__(self, underlying: Embeddings, max_batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+                 max_batch_size: int = EMBEDDING_BATCH_SIZE, max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+                 max_retries: int = EMBEDDING_MAX_RETRIES, base_delay: float = EMBEDDING_RETRY_BASE_DELAY,
+                 max_delay: float = EMBEDDING_RETRY_MAX_DELAY,
+                 token_counter: Callable[[str], int] = count_tokens,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.underlying = underlying
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.token_counter = token_counter
+        self.sleep = sleep
+
+        self._pool = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="embedding")
+        self._cond = threading.Condition()
+        self._concurrency_limit = self.max_concurrency
+        self._batch_tokens = max_batch_tokens
+        self._in_flight = 0
+        self._streak = 0
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.texts = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Lotes
+    # ------------------------------------------------------------------
+
+    def make_batches(self, texts: List[str]) -> List[Tuple[int, int, int]]:
+        """
+        Divide os textos em faixas contíguas respeitando o orçamento atual.
+
+        Returns:
+            Lista de (início, fim, tokens) de cada lote
+        """
+        budget = self._batch_tokens
+        batches = []
+        start = tokens = 0
+        for index, text in enumerate(texts):
+            text_tokens = self.token_counter(text)
+            full = index > start and (tokens + text_tokens > budget or index - start >= self.max_batch_size)
+            if full:
+                batches.append((start, index, tokens))
+                start, tokens = index, 0
+            tokens += text_tokens
+        if start < len(texts):
+            batches.append((start, len(texts), tokens))
+        return batches
+
+    # ------------------------------------------------------------------
+    # Controle de concorrência adaptativo
+    # ------------------------------------------------------------------
+
+    def _acquire(self):
+        with self._cond:
+            while self._in_flight >= self._concurrency_limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def _slot(self):
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _aacquire(self):
+        """Espera um slot em uma thread, sem bloquear o event loop."""
+        waiter = asyncio.get_running_loop().run_in_executor(None, self._acquire)
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # O slot obtido depois do cancelamento é devolvido
+            waiter.add_done_callback(lambda _: self._release())
+            raise
+
+    def _on_success(self):
+        with self._cond:
+            self._streak += 1
+            if self._streak >= _RECOVERY_STREAK:
+                self._streak = 0
+                self._concurrency_limit = min(self.max_concurrency, self._concurrency_limit + 1)
+                self._batch_tokens = min(self.max_batch_tokens, int(self._batch_tokens * 1.25))
+                self._cond.notify_all()
+
+    def _on_rate_limit(self, adaptive: bool = True):
+        if adaptive:
+            with self._cond:
+                self._streak = 0
+                self._concurrency_limit = max(1, self._concurrency_limit // 2)
+                self._batch_tokens = max(self.max_batch_tokens // 8, self._batch_tokens // 2)
+        with self._stats_lock:
+            self.rate_limited += 1
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Backoff exponencial com jitter completo (ou o Retry-After do provedor)."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _retry_delay(self, error: Exception, attempt: int, limited: bool) -> Optional[float]:
+        """Espera antes da próxima tentativa, ou None se o erro não deve ser repetido."""
+        rate_limited = is_rate_limit_error(error)
+        if not (rate_limited or is_transient_error(error)) or attempt == self.max_retries:
+            return None
+        if rate_limited:
+            self._on_rate_limit(adaptive=limited)
+        with self._stats_lock:
+            self.retries += 1
+        return self._backoff(attempt, error)
+
+    def _call(self, func: Callable[[], Any], limited: bool = True) -> Any:
+        """
+        Executa uma chamada ao provedor com novas tentativas.
+
+        Com limited=True (lotes da ingestão), a chamada ocupa um dos slots do
+        limite adaptativo de concorrência; consultas usam limited=False.
+        """
+        for attempt in range(self.max_retries + 1):
+            with self._slot() if limited else nullcontext():
+                try:
+                    with self._stats_lock:
+                        self.requests += 1
+                    result = func()
+                except Exception as error:
+                    delay = self._retry_delay(error, attempt, limited)
+                    if delay is None:
+                        raise
+                else:
+                    if limited:
+                        self._on_success()
+                    return result
+            # Esperar fora do slot, liberando-o para outras requisições
+            self.sleep(delay)
+
+    async def _acall(self, func: Callable[[], Awaitable[Any]], limited: bool = True) -> Any:
+        """Versão assíncrona de _call (chama a API assíncrona do provedor)."""
+        for attempt in range(self.max_retries + 1):
+            if limited:
+                await self._aacquire()
+            try:
+                with self._stats_lock:
+                    self.requests += 1
+                result = await func()
+            except Exception as error:
+                delay = self._retry_delay(error, attempt, limited)
+                if delay is None:
+                    raise
+            else:
+                if limited:
+                    self._on_success()
+                return result
+            finally:
+                if limited:
+                    self._release()
+            await asyncio.sleep(delay)
+
+    # ------------------------------------------------------------------
+    # Interface Embeddings
+    # ------------------------------------------------------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Gera embeddings dos textos em lotes paralelos, preservando a ordem."""
+        if not texts:
+            return []
+        started = time.perf_counter()
+        batches = self.make_batches(texts)
+
+        def run(batch: Tuple[int, int, int]) -> List[List[float]]:
+            start, stop, _ = batch
+            return self._call(lambda: self.underlying.embed_documents(texts[start:stop]))
+
+        if len(batches) == 1:
+            results = [run(batches[0])]
+        else:
+            results = list(self._pool.map(run, batches))
+
+        self._record(texts, batches, started)
+        return [vector for result in results for vector in result]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Versão assíncrona de embed_documents (lotes simultâneos com a API assíncrona)."""
+        if not texts:
+            return []
+        started = time.perf_counter()
+        batches = self.make_batches(texts)
+
+        def run(start: int, stop: int) -> Callable[[], Awaitable[List[List[float]]]]:
+            return lambda: self.underlying.aembed_documents(texts[start:stop])
+
+        results = await asyncio.gather(*(self._acall(run(start, stop)) for start, stop, _ in batches))
+        self._record(texts, batches, started)
+        return [vector for result in results for vector in result]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Gera o embedding de uma consulta, fora do limite de concorrência da ingestão."""
+        return self._call(lambda: self.underlying.embed_query(text), limited=False)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Versão assíncrona de embed_query (API assíncrona do provedor)."""
+        return await self._acall(lambda: self.underlying.aembed_query(text), limited=False)
+
+    def _record(self, texts: List[str], batches: List[Tuple[int, int, int]], started: float):
+        with self._stats_lock:
+            self.texts += len(texts)
+            self.tokens += sum(tokens for _, _, tokens in batches)
+            self.seconds += time.perf_counter() - started
+
+    # ------------------------------------------------------------------
+    # Estatísticas
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores e a vazão (tokens/s) do executor."""
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "texts": self.texts,
+                "tokens": self.tokens,
+                "seconds": round(self.seconds, 3),
+                "tokens_per_second": round(self.tokens / self.seconds, 1) if self.seconds else 0.0,
+                "concurrency_limit": self._concurrency_limit,
+                "batch_tokens": self._batch_tokens
+            }
+
+    def close(self):
+        """Libera o pool de threads."""
+        self._pool.shutdown(wait=False)
+
+
+class EmbeddingCoalescer(Embeddings):
+    """
+    Junta pedidos de embedding simultâneos em chamadas maiores ao executor.
+
+    Quem chama primeiro vira o despachante: leva os pedidos pendentes (o seu
+    e os que chegaram enquanto outras chamadas estavam em andamento) em uma
+    única chamada ao EmbeddingExecutor, que os divide em lotes por tokens.
+    Sem concorrência, o pedido é enviado na hora, sem espera adicional.
+
+    Só o pedido mais antigo da fila pode despachar, e cada despachante faz
+    uma única chamada (o seu pedido e os que estão atrás dele) antes de
+    devolver a vaga: nenhuma ingestão fica presa despachando o trabalho de
+    outras enquanto novos pedidos continuam chegando.
+    """
+
+    def __init__(self, executor: EmbeddingExecutor, max_dispatchers: Optional[int] = None,
+                 max_texts: Optional[int] = None):
+        self.executor = executor
+        self.max_dispatchers = max_dispatchers or executor.max_concurrency
+        # Textos por chamada: o suficiente para ocupar todas as requisições simultâneas
+        self.max_texts = max_texts or executor.max_batch_size * executor.max_concurrency
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # Pedidos respondidos ou vaga liberada
+        self._pending: List[Tuple[List[str], Future]] = []
+        self._dispatchers = 0
+        self.calls = 0
+        self.requests = 0
+
+    def _take(self) -> List[Tuple[List[str], Future]]:
+        """Retira da fila os pedidos da próxima chamada (ao menos um)."""
+        group, texts = [], 0
+        while self._pending and (not group or texts + len(self._pending[0][0]) <= self.max_texts):
+            item = self._pending.pop(0)
+            group.append(item)
+            texts += len(item[0])
+        return group
+
+    def _dispatch(self, group: List[Tuple[List[str], Future]]):
+        """Envia um grupo de pedidos em uma única chamada ao executor."""
+        merged = [text for texts, _ in group for text in texts]
+        try:
+            vectors = self.executor.embed_documents(merged)
+        except Exception as error:
+            for _, future in group:
+                future.set_exception(error)
+            return
+        offset = 0
+        for texts, future in group:
+            future.set_result(vectors[offset:offset + len(texts)])
+            offset += len(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Gera embeddings dos textos, agrupando-os com pedidos simultâneos."""
+        if not texts:
+            return []
+        future: Future = Future()
+        with self._changed:
+            self.requests += 1
+            self._pending.append((list(texts), future))
+            # Esperar a resposta, ou uma vaga de despachante quando o pedido é o primeiro da fila
+            while not future.done() and not (
+                self._dispatchers < self.max_dispatchers and self._pending and self._pending[0][1] is future
+            ):
+                self._changed.wait()
+            group = None if future.done() else self._take()
+            if group:
+                self._dispatchers += 1
+                self.calls += 1
+        if group:
+            try:
+                self._dispatch(group)
+            finally:
+                with self._changed:
+                    self._dispatchers -= 1
+                    self._changed.notify_all()
+        return future.result()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Chamadas assíncronas vão direto ao executor (o agrupamento é entre threads)."""
+        return await self.executor.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Consultas não são agrupadas (latência)."""
+        return self.executor.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Versão assíncrona de embed_query."""
+        return await self.executor.aembed_query(text)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do executor mais os pedidos recebidos e as chamadas feitas."""
+        stats = self.executor.get_stats()
+        with self._lock:
+            stats["coalesced_requests"] = self.requests
+            stats["coalesced_calls"] = self.calls
+        return stats
+
+    def close(self):
+        """Libera o executor."""
+        self.executor.close()
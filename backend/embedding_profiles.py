@@ -0,0 +1,135 @@
+"""
+Perfis de embedding (modelo, dimensões de saída e tamanho de lote).
+
+O perfil usado na indexação fica gravado nos metadados da coleção. Vetores de
+modelos ou dimensões diferentes não são comparáveis entre si, então o serviço
+se recusa a abrir uma coleção indexada com outro perfil; a troca é feita
+reindexando os chunks em uma nova coleção (migrate_embeddings.py).
+"""
+
+from typing import Any, Dict, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from config import EMBEDDING_PROFILES, EMBEDDING_PROFILE, EMBEDDING_BATCH_SIZE, OPENAI_API_KEY
+
+
+# Dimensões nativas dos modelos da OpenAI
+MODEL_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingProfileError(Exception):
+    """A coleção foi indexada com um perfil de embedding diferente do ativo."""
+
+
+def get_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retorna um perfil configurado em EMBEDDING_PROFILES.
+
+    Raises:
+        ValueError: Perfil inexistente
+    """
+    name = name or EMBEDDING_PROFILE
+    if name not in EMBEDDING_PROFILES:
+        raise ValueError(f"Perfil de embedding inválido: {name}. Use um de: {', '.join(EMBEDDING_PROFILES)}")
+    return {"name": name, "batch_size": EMBEDDING_BATCH_SIZE, **EMBEDDING_PROFILES[name]}
+
+
+def custom_profile(embeddings: Embeddings) -> Dict[str, Any]:
+    """Perfil de um modelo de embedding fornecido diretamente (ex.: testes)."""
+    model = getattr(embeddings, "model", None) or type(embeddings).__name__
+    dimensions = getattr(embeddings, "dimensions", None)
+    return {"name": "custom", "model": model, "dimensions": dimensions, "batch_size": EMBEDDING_BATCH_SIZE}
+
+
+def profile_key(profile: Dict[str, Any]) -> str:
+    """Identificador do espaço vetorial do perfil (usado nas chaves do cache de embeddings)."""
+    if profile["dimensions"]:
+        return f"{profile['model']}@{profile['dimensions']}"
+    return profile["model"]
+
+
+def output_dimensions(profile: Dict[str, Any]) -> Optional[int]:
+    """Dimensão dos vetores do perfil (None se o modelo não for conhecido)."""
+    return profile["dimensions"] or MODEL_DIMENSIONS.get(profile["model"])
+
+
+def make_embeddings(profile: Dict[str, Any]) -> OpenAIEmbeddings:
+    """Cria o modelo de embedding da OpenAI do perfil (sem novas tentativas próprias)."""
+    return OpenAIEmbeddings(
+        model=profile["model"],
+        dimensions=profile["dimensions"],
+        chunk_size=profile["batch_size"],
+        openai_api_key=OPENAI_API_KEY,
+        max_retries=0
+    )
+
+
+def profile_metadata(profile: Dict[str, Any], dimensions: Optional[int]) -> Dict[str, Any]:
+    """Metadados gravados na coleção."""
+    return {
+        "embedding_profile": profile["name"],
+        "embedding_model": profile["model"],
+        "embedding_dimensions": dimensions
+    }
+
+
+def _stored_dimensions(collection) -> Optional[int]:
+    """Dimensão dos vetores já gravados em uma coleção sem perfil."""
+    found = collection.get(limit=1, include=["embeddings"])
+    embeddings = found.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        return None
+    return len(embeddings[0])
+
+
+def ensure_profile(collection, profile: Dict[str, Any], dimensions: Optional[int]) -> Dict[str, Any]:
+    """
+    Confere o perfil gravado na coleção (ou grava o ativo, se não houver).
+
+    Coleções criadas antes dos perfis são adotadas quando a dimensão dos
+    vetores existentes coincide com a do perfil ativo.
+
+    Args:
+        collection: Coleção do Chroma (ou CompactCollection)
+        profile: Perfil ativo
+        dimensions: Dimensão dos vetores do perfil ativo (None = desconhecida, não conferida)
+
+    Returns:
+        Metadados de perfil da coleção
+
+    Raises:
+        EmbeddingProfileError: A coleção foi indexada com outro modelo ou dimensão
+    """
+    expected = profile_metadata(profile, dimensions)
+    metadata = dict(collection.metadata or {})
+
+    if "embedding_model" not in metadata:
+        legacy_dimensions = _stored_dimensions(collection)
+        if dimensions and legacy_dimensions is not None and legacy_dimensions != dimensions:
+            raise EmbeddingProfileError(
+                f"A coleção '{collection.name}' tem vetores de {legacy_dimensions} dimensões e o perfil "
+                f"'{profile['name']}' gera {dimensions}. Reindexe com migrate_embeddings.py."
+            )
+        if legacy_dimensions is not None:
+            print(f"⚠️ Coleção '{collection.name}' sem perfil gravado; adotando o perfil '{profile['name']}'")
+        expected["embedding_dimensions"] = dimensions or legacy_dimensions
+        # O Chroma não aceita reenviar as chaves hnsw:* ao alterar os metadados
+        metadata = {key: value for key, value in metadata.items() if not key.startswith("hnsw:")}
+        collection.modify(metadata={**metadata, **expected})
+        return expected
+
+    stored = (metadata["embedding_model"], metadata.get("embedding_dimensions"))
+    if stored[0] != profile["model"] or (stored[1] and dimensions and stored[1] != dimensions):
+        raise EmbeddingProfileError(
+            f"A coleção '{collection.name}' foi indexada com o perfil '{metadata.get('embedding_profile')}' "
+            f"({stored[0]}, {stored[1]} dimensões), mas o perfil ativo é '{profile['name']}' "
+            f"({profile['model']}, {dimensions} dimensões). Use migrate_embeddings.py para reindexar "
+            f"em uma nova coleção ou ajuste EMBEDDING_PROFILE/VECTOR_COLLECTION."
+        )
+    return {key: metadata.get(key) for key in expected}
@@ -0,0 +1,169 @@
+"""
+Armazenamento vetorial exato (float32 em memmap, busca por força bruta).
+
+Para coleções pequenas e médias (até ~100 mil chunks), uma varredura da
+matriz float32 inteira com um único produto matriz-vetor (BLAS) seguido de
+argpartition é exata (recall 1.0), não tem índice para construir e costuma
+ser tão rápida quanto o HNSW.
+
+Os vetores normalizados ficam em um arquivo .npy aberto como memmap: a
+matriz não é copiada para a memória do processo e fica no cache de páginas
+do sistema operacional. Novos vetores são acrescentados ao fim do arquivo e
+o cabeçalho (que reserva espaço para o número de linhas crescer) é
+reescrito no lugar. IDs, textos e metadados ficam no mesmo SQLite lateral
+da coleção compacta, com a mesma API no formato do Chroma.
+"""
+
+import os
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from compact_store import CompactCollection, CompactVectorStore
+
+
+EXACT_STORE_DIRNAME = "exact_store"
+VECTORS_FILENAME = "vectors.npy"
+
+# Linhas copiadas por vez ao reescrever a matriz (vacuum)
+_COPY_BLOCK_ROWS = 4096
+
+
+class ExactCollection(CompactCollection):
+    """
+    Coleção de vetores float32 com busca exata.
+
+    Arquivos do diretório:
+        manifest.json  configurações da coleção
+        vectors.npy    vetores float32 normalizados (memmap)
+        chunks.db      IDs, textos e metadados (SQLite)
+    """
+
+    backend = "exact"
+    quantization_modes = ("float32",)
+
+    def __init__(self, directory: str):
+        super().__init__(directory, quantization="float32", dimensions=None, rescore_factor=1,
+                         keep_full_precision=False)
+
+    @property
+    def _code_dtype(self):
+        return np.float32
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def _write_header(self, file, rows: int):
+        """Grava o cabeçalho .npy no início do arquivo (sempre com o mesmo tamanho)."""
+        file.seek(0)
+        np.lib.format.write_array_header_1_0(file, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            "fortran_order": False,
+            "shape": (rows, self.full_dimensions)
+        })
+
+    def _read_header(self) -> Tuple[int, int]:
+        """Retorna (linhas declaradas no cabeçalho, posição do início dos dados)."""
+        with open(self._path(VECTORS_FILENAME), "rb") as file:
+            np.lib.format.read_magic(file)
+            shape, _, _ = np.lib.format.read_array_header_1_0(file)
+            return shape[0], file.tell()
+
+    def _map(self, rows: int):
+        """Abre a matriz em memmap (somente leitura) com as linhas gravadas."""
+        if rows:
+            self._codes = np.lib.format.open_memmap(self._path(VECTORS_FILENAME), mode="r")
+        else:
+            self._codes = np.empty((0, self.full_dimensions or 0), dtype=np.float32)
+        self._size = rows
+
+    def _load(self):
+        """Abre a matriz e descarta escritas incompletas."""
+        self._size = 0
+        self._codes = np.empty((0, self.full_dimensions or 0), dtype=np.float32)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._full = None
+
+        path = self._path(VECTORS_FILENAME)
+        if self.full_dimensions is not None and os.path.exists(path):
+            rows, offset = self._read_header()
+            row_bytes = self.full_dimensions * 4
+            size = min(rows, (os.path.getsize(path) - offset) // row_bytes)
+            # Linhas gravadas sem o cabeçalho atualizado (ou vice-versa): ficam as completas
+            if size != rows or os.path.getsize(path) != offset + size * row_bytes:
+                with open(path, "r+b") as file:
+                    file.truncate(offset + size * row_bytes)
+                    self._write_header(file, size)
+            self._map(size)
+        self._load_slots()
+
+    def _append(self, vectors: np.ndarray) -> np.ndarray:
+        """Acrescenta vetores normalizados ao fim da matriz; retorna as posições."""
+        path = self._path(VECTORS_FILENAME)
+        start, stop = self._size, self._size + len(vectors)
+        if not os.path.exists(path):
+            with open(path, "wb") as file:
+                self._write_header(file, 0)
+        with open(path, "r+b") as file:
+            file.seek(0, os.SEEK_END)
+            vectors.astype(np.float32).tofile(file)
+            self._write_header(file, stop)
+
+        self._reserve(stop)
+        self._alive[start:stop] = True
+        self._map(stop)
+        return np.arange(start, stop)
+
+    def _reserve(self, rows: int):
+        """Garante capacidade no vetor de posições ocupadas (a matriz fica em disco)."""
+        capacity = self._alive.shape[0]
+        if rows <= capacity:
+            return
+        alive = np.zeros(max(rows, capacity * 2, 1024), dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+
+    def vacuum(self):
+        """Reescreve a matriz sem as posições apagadas."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive[:self._size])
+            temp_path = self._path(f"{VECTORS_FILENAME}.tmp")
+            with open(temp_path, "wb") as file:
+                self._write_header(file, len(keep))
+                for start in range(0, len(keep), _COPY_BLOCK_ROWS):
+                    np.asarray(self._codes[keep[start:start + _COPY_BLOCK_ROWS]]).tofile(file)
+
+            # Fechar o memmap antes de substituir o arquivo
+            self._codes = np.empty((0, self.full_dimensions or 0), dtype=np.float32)
+            os.replace(temp_path, self._path(VECTORS_FILENAME))
+            self._renumber(keep)
+            self._map(len(keep))
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosseno exato da consulta com todos os vetores (um produto matriz-vetor)."""
+        return self._codes[:self._size] @ query
+
+    def _embeddings_for(self, slots: np.ndarray) -> np.ndarray:
+        if not len(slots):
+            return np.empty((0, self.full_dimensions or 0), dtype=np.float32)
+        return np.asarray(self._codes[slots])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamanho da coleção em memória e em disco."""
+        stats = super().get_stats()
+        # A matriz é mapeada do disco (cache de páginas do sistema), não copiada para o processo
+        stats["ram_bytes"] = int(self._alive.nbytes)
+        stats["mapped_bytes"] = int(self._size * (self.full_dimensions or 0) * 4)
+        return stats
+
+
+class ExactVectorStore(CompactVectorStore):
+    """VectorStore do LangChain sobre uma ExactCollection."""
+
+    collection_class = ExactCollection
+    dirname = EXACT_STORE_DIRNAME
@@ -1,58 +1,188 @@
 """
-Módulo para implementação de retriever personalizado com filtro de redundância.
+Módulo para implementação de retrievers personalizados: filtro de redundância
+(MMR) e busca híbrida (BM25 + vetorial).
 """
 
-from typing import List
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Sequence, Tuple
 from langchain.schema import BaseRetriever, Document
 from langchain.embeddings.base import Embeddings
-from langchain_chroma import Chroma
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.vectorstores import VectorStore
 
-from config import LAMBDA_MULT, K_DOCUMENTS
+from config import LAMBDA_MULT, K_DOCUMENTS, FETCH_K, RETRIEVAL_TIMEOUT, HYBRID_RRF_K
+from bm25_index import BM25Index, is_lexical_query
+from hnsw_profiles import query_collection
+from mmr import maximal_marginal_relevance
 
 
 class RedundantFilterRetriever(BaseRetriever):
     """
     Retriever personalizado que utiliza Max Marginal Relevance Search
     para reduzir redundância nos documentos retornados.
+
+    Os fetch_k candidatos mais próximos são lidos da coleção junto com seus
+    embeddings e os k_documents finais são escolhidos pelo MMR vetorizado
+    (mmr.py). Funciona com o Chroma e com o armazenamento compacto.
+
+    Na versão assíncrona (ainvoke), o embedding da consulta usa a API
+    assíncrona do modelo e a busca (síncrona) roda no executor informado,
+    sem bloquear o event loop. O tempo total é limitado por timeout
+    (padrão do campo ou por chamada: ainvoke(query, timeout=...)).
     """
-    
+
     embedding: Embeddings
-    chroma: Chroma
+    chroma: VectorStore
     lambda_mult: float = LAMBDA_MULT
     k_documents: int = K_DOCUMENTS
-    
-    def get_relevant_documents(self, query: str) -> List[Document]:
+    fetch_k: int = FETCH_K
+    ef_search: Optional[int] = None  # Candidatos explorados no índice HNSW (só aumenta o ef da coleção)
+    executor: Optional[Executor] = None  # None = pool padrão do event loop
+    timeout: Optional[float] = RETRIEVAL_TIMEOUT
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                timeout: Optional[float] = None) -> List[Document]:
         """
         Busca documentos relevantes usando Max Marginal Relevance Search.
-        
+
         Args:
             query (str): Consulta de busca
-            
+            timeout: Aceito por simetria com a versão assíncrona; chamadas
+                síncronas não são interrompidas
+
         Returns:
             List[Document]: Lista de documentos relevantes
         """
         # Gerar embedding da consulta
         query_embedding = self.embedding.embed_query(query)
-        
-        # Buscar documentos usando Max Marginal Relevance Search
-        documents = self.chroma.max_marginal_relevance_search_by_vector(
-            embedding=query_embedding,
+        return self._search(query_embedding)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       timeout: Optional[float] = None) -> List[Document]:
+        """
+        Versão assíncrona do método de busca.
+
+        O cancelamento da tarefa (ou o fim do prazo) libera o chamador
+        imediatamente; uma busca já iniciada no executor termina em segundo
+        plano e seu resultado é descartado.
+
+        Args:
+            query (str): Consulta de busca
+            timeout: Limite em segundos para esta chamada (padrão: self.timeout)
+
+        Returns:
+            List[Document]: Lista de documentos relevantes
+
+        Raises:
+            TimeoutError: O embedding e a busca não terminaram dentro do prazo
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._aretrieve(query), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Busca de documentos excedeu o limite de {timeout}s")
+
+    async def _aretrieve(self, query: str) -> List[Document]:
+        """Embedding assíncrono da consulta seguido da busca no executor."""
+        query_embedding = await self.embedding.aembed_query(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._search, query_embedding)
+
+    def _search(self, query_embedding: Sequence[float], k: Optional[int] = None) -> List[Document]:
+        """Busca os candidatos com seus embeddings e aplica o MMR (k padrão: k_documents)."""
+        k = k or self.k_documents
+        results = query_collection(
+            self.chroma._collection,
+            [query_embedding],
+            n_results=max(self.fetch_k, k),
+            include=["metadatas", "documents", "embeddings"],
+            ef_search=self.ef_search
+        )
+        if not results["ids"] or not results["ids"][0]:
+            return []
+
+        selected = maximal_marginal_relevance(
+            query_embedding,
+            results["embeddings"][0],
             lambda_mult=self.lambda_mult,
-            k=self.k_documents
+            k=k
         )
-        
-        return documents
-    
-    async def aget_relevant_documents(self, query: str) -> List[Document]:
+
+        return [
+            Document(
+                page_content=results["documents"][0][index],
+                metadata=results["metadatas"][0][index] or {},
+                id=results["ids"][0][index]
+            )
+            for index in selected
+        ]
+
+
+class HybridRetriever(RedundantFilterRetriever):
+    """
+    Retriever híbrido: busca lexical (BM25) + busca vetorial com MMR,
+    combinadas por fusão por posição recíproca (RRF).
+
+    Cada lista contribui com 1 / (rrf_k + posição) para os chunks que
+    contém; os k_documents de maior soma são retornados. A lista vetorial
+    é a ordenação MMR dos fetch_k candidatos, preservando a diversidade.
+
+    Consultas só de nomes próprios/números ou entre aspas (is_lexical_query)
+    usam apenas o BM25 e não chamam o modelo de embedding; se o BM25 não
+    encontrar nada, a busca híbrida é feita normalmente.
+    """
+
+    bm25: BM25Index
+    rrf_k: int = HYBRID_RRF_K
+    lexical_shortcut: bool = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                timeout: Optional[float] = None) -> List[Document]:
         """
-        Versão assíncrona do método de busca.
-        
+        Busca documentos relevantes combinando BM25 e MMR.
+
         Args:
             query (str): Consulta de busca
-            
+            timeout: Aceito por simetria com a versão assíncrona; chamadas
+                síncronas não são interrompidas
+
         Returns:
-            List[Document]: Lista vazia (não implementado)
+            List[Document]: Lista de documentos relevantes
         """
-        # TODO: Implementar versão assíncrona se necessário
-        return []
-    
\ No newline at end of file
+        lexical = self.bm25.search(query, self.fetch_k)
+        if lexical and self._lexical_only(query):
+            return self._fuse([], lexical)
+        vector = self._search(self.embedding.embed_query(query), self.fetch_k)
+        return self._fuse(vector, lexical)
+
+    async def _aretrieve(self, query: str) -> List[Document]:
+        """BM25 no executor e, se necessário, embedding assíncrono + busca vetorial."""
+        loop = asyncio.get_running_loop()
+        lexical = await loop.run_in_executor(self.executor, self.bm25.search, query, self.fetch_k)
+        if lexical and self._lexical_only(query):
+            return await loop.run_in_executor(self.executor, self._fuse, [], lexical)
+        query_embedding = await self.embedding.aembed_query(query)
+        vector = await loop.run_in_executor(self.executor, self._search, query_embedding, self.fetch_k)
+        return await loop.run_in_executor(self.executor, self._fuse, vector, lexical)
+
+    def _lexical_only(self, query: str) -> bool:
+        return self.lexical_shortcut and is_lexical_query(query)
+
+    def _fuse(self, vector: List[Document], lexical: List[Tuple[str, float]]) -> List[Document]:
+        """Combina as listas por RRF e carrega os chunks que vieram só do BM25."""
+        scores: Dict[str, float] = {}
+        for rank, chunk_id in enumerate([doc.id for doc in vector]):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.k_documents]
+
+        documents = {doc.id: doc for doc in vector}
+        missing = [chunk_id for chunk_id in ranked if chunk_id not in documents]
+        if missing:
+            found = self.chroma._collection.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"]):
+                documents[chunk_id] = Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+        # Chunks ainda no índice lexical mas ausentes da coleção são ignorados
+        return [documents[chunk_id] for chunk_id in ranked if chunk_id in documents]
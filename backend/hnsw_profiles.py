@@ -0,0 +1,104 @@
+"""
+Perfis do índice HNSW das coleções do Chroma (latency, balanced, recall).
+
+max_neighbors (M) e ef_construction definem o grafo e só podem ser
+escolhidos na criação da coleção; coleções existentes mantêm os seus.
+ef_search (candidatos explorados por busca) fica gravado na coleção, mas o
+Chroma só o lê ao carregar o índice: um índice já em memória continua com o
+valor antigo. Por isso o ef_search por consulta é aplicado pedindo
+max(k, ef_search) vizinhos, já que o hnswlib busca com max(ef, k), e
+mantendo os k primeiros. Isso só aumenta o ef: valores até o ef_search da
+coleção não têm efeito e a consulta usa o da coleção.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from config import HNSW_PROFILES, HNSW_PROFILE
+from compact_store import CompactCollection
+
+
+HNSW_KEYS = ("max_neighbors", "ef_construction", "ef_search")
+
+
+def get_hnsw_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retorna um perfil configurado em HNSW_PROFILES.
+
+    Raises:
+        ValueError: Perfil inexistente
+    """
+    name = name or HNSW_PROFILE
+    if name not in HNSW_PROFILES:
+        raise ValueError(f"Perfil HNSW inválido: {name}. Use um de: {', '.join(HNSW_PROFILES)}")
+    return {"name": name, **HNSW_PROFILES[name]}
+
+
+def collection_configuration(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Configuração de criação da coleção no formato do Chroma."""
+    return {"hnsw": {key: profile[key] for key in HNSW_KEYS}}
+
+
+def hnsw_settings(collection) -> Optional[Dict[str, Any]]:
+    """Parâmetros HNSW gravados na coleção (None fora do Chroma)."""
+    if isinstance(collection, CompactCollection):
+        return None
+    hnsw = (getattr(collection, "configuration", None) or {}).get("hnsw") or {}
+    return {key: hnsw.get(key) for key in HNSW_KEYS}
+
+
+def set_ef_search(collection, ef_search: int):
+    """
+    Grava o ef_search padrão da coleção.
+
+    Vale a partir do próximo carregamento do índice (reinício do serviço);
+    para a sessão atual, use ef_search por consulta (query_collection).
+    """
+    collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+
+
+def query_collection(collection, query_embeddings: Sequence[Sequence[float]], n_results: int,
+                     include: Iterable[str] = ("metadatas", "documents", "distances"),
+                     ef_search: Optional[int] = None, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Busca no formato do Chroma com ef_search opcional por consulta.
+
+    Com ef_search acima de n_results e do ef_search gravado na coleção, os
+    ef_search vizinhos são buscados só com as distâncias e os dados pedidos
+    em include são lidos apenas para os n_results primeiros. Valores menores
+    não reduzem o ef da coleção e a consulta é feita normalmente. Coleções
+    compactas/exatas ignoram ef_search.
+
+    Args:
+        collection: Coleção do Chroma (ou CompactCollection)
+        query_embeddings: Embeddings das consultas
+        n_results: Vizinhos retornados por consulta
+        include: Campos retornados ("documents", "metadatas", "distances", "embeddings")
+        ef_search: Candidatos explorados no grafo (só valores acima do da coleção têm efeito)
+        where: Filtro de metadados
+
+    Returns:
+        Resultado no formato de collection.query
+    """
+    include = list(include)
+    if ef_search and not isinstance(collection, CompactCollection):
+        ef_search = ef_search if ef_search > (hnsw_settings(collection)["ef_search"] or 0) else None
+    if not ef_search or ef_search <= n_results or isinstance(collection, CompactCollection):
+        return collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where,
+                                include=include)
+
+    found = collection.query(query_embeddings=query_embeddings, n_results=ef_search, where=where,
+                             include=["distances"])
+    fields = [field for field in include if field != "distances"]
+    results: Dict[str, List[Any]] = {"ids": [], **{field: [] for field in include}}
+    for ids, distances in zip(found["ids"], found["distances"]):
+        ids, distances = ids[:n_results], distances[:n_results]
+        rows = collection.get(ids=ids, include=fields) if fields else {"ids": ids}
+        position = {chunk_id: index for index, chunk_id in enumerate(rows["ids"])}
+        # Chunks removidos entre as duas leituras são descartados
+        kept = [index for index, chunk_id in enumerate(ids) if chunk_id in position]
+        results["ids"].append([ids[index] for index in kept])
+        if "distances" in include:
+            results["distances"].append([distances[index] for index in kept])
+        for field in fields:
+            results[field].append([rows[field][position[ids[index]]] for index in kept])
+    return results
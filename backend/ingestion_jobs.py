@@ -0,0 +1,407 @@
+"""
+Fila de ingestão de documentos em segundo plano.
+
+Os jobs ficam persistidos em SQLite (sobrevivem a reinícios) e são
+processados por workers asyncio: a leitura/divisão do arquivo roda em um
+pool de processos e a geração de embeddings/inserção no executor do
+DocumentService, com progresso por etapa gravado no banco.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from config import INGESTION_WORKERS, INGESTION_PROCESS_WORKERS, STREAMING_MIN_BYTES, CHUNKING_STRATEGY
+from chunking import chunk_defaults
+from document_service import iter_chunks, split_document
+
+
+INGESTION_JOBS_FILENAME = "ingestion_jobs.db"
+
+# Status possíveis de um job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Etapas da ingestão, na ordem em que são executadas
+JOB_STAGES = ["fingerprint", "parsing", "indexing"]
+
+_JSON_FIELDS = ("stages", "result")
+
+
+class IngestionJobStore:
+    """Persistência dos jobs de ingestão em SQLite."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.init_database()
+
+    @classmethod
+    def for_directory(cls, persist_directory: str) -> "IngestionJobStore":
+        """Cria a fila ao lado do banco vetorial."""
+        return cls(os.path.join(persist_directory, INGESTION_JOBS_FILENAME))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Cria a tabela de jobs se não existir."""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id TEXT PRIMARY KEY,
+                    file_path TEXT NOT NULL,
+                    source TEXT,
+                    display_name TEXT,
+                    chunk_size INTEGER NOT NULL,
+                    chunk_overlap INTEGER NOT NULL,
+                    chunking TEXT,
+                    cleanup INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    stages TEXT NOT NULL,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    chunks_done INTEGER NOT NULL DEFAULT 0,
+                    chunks_per_second REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(ingestion_jobs)")}
+            if "chunking" not in columns:
+                conn.execute("ALTER TABLE ingestion_jobs ADD COLUMN chunking TEXT")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, created_at)
+            """)
+            conn.commit()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for field in _JSON_FIELDS:
+            job[field] = json.loads(job[field]) if job[field] else None
+        job["cleanup"] = bool(job["cleanup"])
+        return job
+
+    def create(self, file_path: str, chunk_size: int, chunk_overlap: int, source: Optional[str] = None,
+               display_name: Optional[str] = None, cleanup: bool = False,
+               chunking: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Registra um novo job na fila.
+
+        Args:
+            file_path: Arquivo a ser ingerido
+            chunk_size: Tamanho dos chunks
+            chunk_overlap: Sobreposição entre chunks
+            source: Nome lógico do documento no índice (padrão: o próprio caminho)
+            display_name: Nome exibido ao usuário (ex.: nome original do upload)
+            cleanup: Apagar o arquivo ao final (uploads temporários)
+            chunking: Estratégia de chunking ("characters" ou "tokens")
+
+        Returns:
+            Job criado
+        """
+        job_id = uuid.uuid4().hex
+        stages = {stage: {"status": "pending"} for stage in JOB_STAGES}
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO ingestion_jobs (
+                    id, file_path, source, display_name, chunk_size, chunk_overlap, chunking, cleanup,
+                    status, stage, stages, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (job_id, file_path, source, display_name or os.path.basename(file_path), chunk_size,
+                  chunk_overlap, chunking, int(cleanup), JOB_QUEUED, None, json.dumps(stages),
+                  datetime.now().isoformat()))
+            conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna um job, ou None se não existir."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._to_dict(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """
+        Lista os jobs, do mais recente para o mais antigo.
+
+        Args:
+            status: Filtrar por status (opcional)
+            offset: Posição inicial
+            limit: Quantidade máxima de jobs
+
+        Returns:
+            Dicionário com "jobs" e "total"
+        """
+        where, params = ("WHERE status = ?", [status]) if status else ("", [])
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM ingestion_jobs {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM ingestion_jobs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return {"jobs": [self._to_dict(row) for row in rows], "total": total}
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Jobs não finalizados, na ordem de criação (para retomar após reinício)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def update(self, job_id: str, **fields):
+        """Atualiza campos de um job."""
+        if not fields:
+            return
+        for field in _JSON_FIELDS:
+            if field in fields and fields[field] is not None:
+                fields[field] = json.dumps(fields[field], ensure_ascii=False)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"UPDATE ingestion_jobs SET {assignments} WHERE id = ?",
+                list(fields.values()) + [job_id]
+            )
+            conn.commit()
+
+    def update_stage(self, job_id: str, stage: str, **values):
+        """Atualiza o progresso de uma etapa e a marca como etapa atual."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT stages FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["stages"])
+            stages.setdefault(stage, {}).update(values)
+            conn.execute(
+                "UPDATE ingestion_jobs SET stage = ?, stages = ? WHERE id = ?",
+                (stage, json.dumps(stages), job_id)
+            )
+            conn.commit()
+
+
+class IngestionQueue:
+    """
+    Workers asyncio que consomem a fila de jobs de ingestão.
+
+    A leitura/divisão roda em um pool de processos (PDFs grandes são CPU
+    bound); embeddings e inserção rodam no executor do DocumentService.
+    """
+
+    def __init__(self, document_service, store: IngestionJobStore, workers: int = INGESTION_WORKERS,
+                 process_workers: int = INGESTION_PROCESS_WORKERS):
+        self.document_service = document_service
+        self.store = store
+        self.workers = workers
+        self.process_workers = process_workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    async def start(self) -> int:
+        """
+        Inicia os workers e retoma os jobs pendentes.
+
+        Returns:
+            Número de jobs retomados
+        """
+        self._queue = asyncio.Queue()
+        if self.process_workers > 0:
+            # "spawn" evita herdar threads/conexões do processo da API
+            self._process_pool = ProcessPoolExecutor(
+                self.process_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+        pending = await self.document_service.run_blocking(self.store.pending)
+        for job in pending:
+            if job["status"] == JOB_RUNNING:
+                # Interrompido por um reinício: recomeça do início
+                await self.document_service.run_blocking(self.store.update, job["id"], status=JOB_QUEUED)
+            self._queue.put_nowait(job["id"])
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return len(pending)
+
+    async def stop(self):
+        """Para os workers; jobs em andamento são retomados no próximo start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    async def enqueue(self, file_path: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                      source: Optional[str] = None, display_name: Optional[str] = None,
+                      cleanup: bool = False, chunking: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Adiciona um arquivo à fila e retorna o job imediatamente.
+
+        Args:
+            file_path: Arquivo a ser ingerido
+            chunk_size: Tamanho dos chunks
+            chunk_overlap: Sobreposição entre chunks
+            source: Nome lógico do documento no índice (padrão: o próprio caminho)
+            display_name: Nome exibido ao usuário
+            cleanup: Apagar o arquivo ao final
+            chunking: Estratégia de chunking (padrão: CHUNKING_STRATEGY)
+
+        Returns:
+            Job criado (status "queued")
+        """
+        chunking = chunking or CHUNKING_STRATEGY
+        default_size, default_overlap = chunk_defaults(chunking)
+        job = await self.document_service.run_blocking(
+            self.store.create, os.path.abspath(file_path),
+            default_size if chunk_size is None else chunk_size,
+            default_overlap if chunk_overlap is None else chunk_overlap,
+            source, display_name, cleanup, chunking
+        )
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def join(self):
+        """Aguarda até que a fila esteja vazia (útil em testes e scripts)."""
+        await self._queue.join()
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Erro inesperado no job de ingestão {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        service = self.document_service
+        store = self.store
+        job = await service.run_blocking(store.get, job_id)
+        if job is None or job["status"] != JOB_QUEUED:
+            return
+
+        # Um documento por vez: jobs e cargas diretas do mesmo source não se intercalam
+        lock = service.source_lock(job["source"] or job["file_path"])
+        await self._acquire(lock)
+        try:
+            await service.run_blocking(
+                store.update, job_id, status=JOB_RUNNING, started_at=datetime.now().isoformat()
+            )
+            try:
+                result = await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await service.run_blocking(
+                    store.update, job_id, status=JOB_FAILED, error=str(e),
+                    finished_at=datetime.now().isoformat()
+                )
+                print(f"❌ Job de ingestão {job_id} falhou: {e}")
+            else:
+                await service.run_blocking(
+                    store.update, job_id, status=JOB_COMPLETED, result=result,
+                    finished_at=datetime.now().isoformat()
+                )
+            if job["cleanup"] and os.path.exists(job["file_path"]):
+                os.remove(job["file_path"])
+        finally:
+            lock.release()
+
+    @staticmethod
+    async def _acquire(lock: threading.Lock):
+        """Aguarda o lock de um documento sem ocupar o executor do DocumentService."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # O lock ainda pode ser obtido depois do cancelamento: devolvê-lo
+            acquiring.add_done_callback(
+                lambda future: lock.release() if not future.cancelled() and future.result() else None
+            )
+            raise
+
+    async def _process(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        service = self.document_service
+        store = self.store
+        job_id = job["id"]
+        loop = asyncio.get_running_loop()
+
+        # 1. Impressão digital: arquivos inalterados terminam aqui
+        started = time.perf_counter()
+        await service.run_blocking(store.update_stage, job_id, "fingerprint", status="running")
+        prepared = await service.run_blocking(
+            service.prepare_document, job["file_path"], job["chunk_size"], job["chunk_overlap"],
+            False, job["source"], None, job["chunking"]
+        )
+        await service.run_blocking(
+            store.update_stage, job_id, "fingerprint", status="completed",
+            seconds=round(time.perf_counter() - started, 3)
+        )
+        if prepared["unchanged"]:
+            for stage in ("parsing", "indexing"):
+                await service.run_blocking(store.update_stage, job_id, stage, status="skipped")
+            return prepared["unchanged"]
+
+        # 2. Leitura e divisão em chunks: no pool de processos, ou em streaming
+        # junto com a indexação para arquivos grandes (memória constante)
+        started = time.perf_counter()
+        if prepared["file_size"] >= STREAMING_MIN_BYTES:
+            chunks = iter_chunks(
+                prepared["file_path"], prepared["chunk_size"], prepared["chunk_overlap"], prepared["chunking"]
+            )
+            await service.run_blocking(store.update_stage, job_id, "parsing", status="streaming")
+        else:
+            await service.run_blocking(store.update_stage, job_id, "parsing", status="running")
+            chunks = await loop.run_in_executor(
+                self._process_pool or service.executor,
+                split_document, prepared["file_path"], prepared["chunk_size"], prepared["chunk_overlap"],
+                prepared["chunking"]
+            )
+            await service.run_blocking(
+                store.update_stage, job_id, "parsing", status="completed",
+                seconds=round(time.perf_counter() - started, 3), chunks=len(chunks)
+            )
+
+        # 3. Embeddings e inserção em lotes, com progresso e vazão
+        started = time.perf_counter()
+        await service.run_blocking(store.update_stage, job_id, "indexing", status="running")
+
+        def progress(done: int, total: Optional[int]):
+            elapsed = time.perf_counter() - started
+            rate = round(done / elapsed, 2) if done and elapsed > 0 else None
+            store.update(job_id, chunks_done=done, chunks_total=total or done, chunks_per_second=rate)
+            store.update_stage(job_id, "indexing", done=done, total=total)
+
+        result = await service.run_blocking(service.index_chunks, prepared, chunks, progress)
+        seconds = round(time.perf_counter() - started, 3)
+        if not hasattr(chunks, "__len__"):
+            await service.run_blocking(
+                store.update_stage, job_id, "parsing", status="completed",
+                seconds=seconds, chunks=result["documents_count"]
+            )
+        await service.run_blocking(
+            store.update_stage, job_id, "indexing", status="completed", seconds=seconds
+        )
+        return result
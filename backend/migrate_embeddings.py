@@ -0,0 +1,174 @@
+"""
+Migração dos embeddings para outro perfil (modelo/dimensões).
+
+Uso:
+    python migrate_embeddings.py --profile large-1024 [--source langchain] [--target NOME]
+                                 [--backend chroma|compact|exact] [--page-size 500] [--delete-source]
+
+Os chunks (textos e metadados) da coleção de origem são lidos em páginas,
+recebem novos embeddings com o perfil escolhido e são gravados, com os mesmos
+IDs, em uma nova coleção que registra o perfil nos metadados. O índice BM25
+do destino é atualizado a cada página e, ao final, o registro de documentos
+da origem (estatísticas, impressões digitais e IDs dos chunks) é copiado para
+o destino, para que arquivos inalterados não sejam reprocessados. A migração
+pode ser retomada: chunks já presentes no destino são ignorados. Ao final,
+ative a nova coleção com as variáveis EMBEDDING_PROFILE e VECTOR_COLLECTION.
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Any, Dict, Optional
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import PERSIST_DIRECTORY, VECTOR_COLLECTION, VECTOR_STORE_BACKENDS, EMBEDDING_PROFILES
+from document_registry import DocumentRegistry, REGISTRY_FILENAME
+from document_service import DocumentService, collection_db_path, make_vectorstore, resolve_backend
+from tokenizer import count_tokens
+
+
+def copy_registry(source: DocumentRegistry, target: DocumentRegistry, embedding_model: Optional[str] = None,
+                  page_size: int = 500) -> int:
+    """
+    Copia os documentos de um registro para outro (os IDs dos chunks não mudam na migração).
+
+    Returns:
+        Número de documentos copiados
+    """
+    copied = 0
+    while True:
+        page = source.list_documents(offset=copied, limit=page_size)
+        for document in page["items"]:
+            target.upsert_document(
+                source=document["source"],
+                chunks=document["chunks"],
+                tokens=document["tokens"],
+                size_bytes=document["bytes"],
+                chunk_ids=source.get_chunk_ids(document["source"]),
+                embedding_model=embedding_model,
+                file_size=document["file_size"],
+                mtime=document["mtime"],
+                content_hash=document["content_hash"],
+                chunk_size=document["chunk_size"],
+                chunk_overlap=document["chunk_overlap"],
+                chunking=document["chunking"]
+            )
+        copied += len(page["items"])
+        if len(page["items"]) < page_size:
+            return copied
+
+
+def migrate(profile: str, source: str = VECTOR_COLLECTION, target: Optional[str] = None,
+            persist_directory: str = PERSIST_DIRECTORY, backend: Optional[str] = None,
+            page_size: int = 500, delete_source: bool = False, embeddings=None) -> Dict[str, Any]:
+    """
+    Reindexa uma coleção em uma nova coleção com outro perfil de embedding.
+
+    Args:
+        profile: Perfil de destino (ver EMBEDDING_PROFILES)
+        source: Coleção de origem
+        target: Coleção de destino (padrão: "<origem>-<perfil>")
+        persist_directory: Diretório do banco de dados vetorial
+        backend: "chroma", "compact" ou "exact" (padrão: o da coleção de origem)
+        page_size: Chunks lidos e enviados por vez
+        delete_source: Apagar a coleção de origem ao final
+        embeddings: Modelo de embedding (padrão: o do perfil)
+
+    Returns:
+        Dicionário com target, migrated, skipped e seconds
+    """
+    target = target or f"{source}-{profile}"
+    if target == source:
+        raise Exception("A coleção de destino deve ser diferente da de origem")
+
+    backend = resolve_backend(persist_directory, source, backend)
+    source_store = make_vectorstore(persist_directory, None, source, backend)
+    total = source_store._collection.count()
+    if not total:
+        raise Exception(f"Coleção de origem vazia ou inexistente: {source}")
+
+    service = DocumentService(
+        embeddings=embeddings,
+        persist_directory=persist_directory,
+        answer_cache=False,
+        vector_store_backend=backend,
+        embedding_profile=profile,
+        collection_name=target
+    )
+    print(f"🔄 Migrando {total:,} chunks de '{source}' para '{target}' (perfil '{profile}')...")
+
+    started = time.perf_counter()
+    migrated = skipped = offset = 0
+    try:
+        while True:
+            page = source_store._collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+
+            new_ids = set(service._new_chunk_ids(page["ids"]))
+            rows = [
+                (chunk_id, text, metadata or {})
+                for chunk_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+                if chunk_id in new_ids
+            ]
+            skipped += len(page["ids"]) - len(rows)
+            if rows:
+                ids, texts, metadatas = zip(*rows)
+                service.vectorstore.add_texts(list(texts), list(metadatas), ids=list(ids))
+                if service.lexical_index is not None:
+                    service.lexical_index.add(ids, texts, [metadata.get("source") for metadata in metadatas])
+                migrated += len(rows)
+            print(f"   {offset:,}/{total:,} chunks ({migrated:,} migrados, {skipped:,} já presentes)")
+
+        collection = service.vectorstore._collection
+        if service.lexical_index is not None and service.lexical_index.count() != collection.count():
+            # Migração retomada após uma falha entre a coleção e o índice lexical
+            service.lexical_index.rebuild_from_collection(collection)
+
+        source_registry = collection_db_path(persist_directory, REGISTRY_FILENAME, source)
+        if os.path.exists(source_registry) and not DocumentRegistry(source_registry).is_empty():
+            documents = copy_registry(DocumentRegistry(source_registry), service.registry, service.embedding_model)
+        else:
+            # Bancos anteriores ao registro: estatísticas reconstruídas, sem impressões digitais
+            totals = service.registry.rebuild_from_collection(collection, count_tokens, service.embedding_model)
+            documents = totals["documents"]
+        print(f"📋 Registro de documentos do destino atualizado ({documents:,} arquivos)")
+    finally:
+        service.close()
+
+    if delete_source:
+        source_store.delete_collection()
+        print(f"🗑️ Coleção de origem '{source}' apagada")
+
+    return {"target": target, "migrated": migrated, "skipped": skipped,
+            "seconds": round(time.perf_counter() - started, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reindexa os chunks com outro perfil de embedding")
+    parser.add_argument("--profile", required=True, choices=sorted(EMBEDDING_PROFILES))
+    parser.add_argument("--source", default=VECTOR_COLLECTION)
+    parser.add_argument("--target")
+    parser.add_argument("--persist-directory", default=PERSIST_DIRECTORY)
+    parser.add_argument("--backend", choices=VECTOR_STORE_BACKENDS)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--delete-source", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        result = migrate(args.profile, args.source, args.target, args.persist_directory, args.backend,
+                         args.page_size, args.delete_source)
+    except Exception as e:
+        print(f"❌ Erro na migração: {e}")
+        sys.exit(1)
+
+    print(f"✅ {result['migrated']:,} chunks migrados em {result['seconds']}s")
+    print(f"   Para ativar: EMBEDDING_PROFILE={args.profile} VECTOR_COLLECTION={result['target']}")
+
+
+if __name__ == "__main__":
+    main()
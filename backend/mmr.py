@@ -0,0 +1,66 @@
+"""
+Seleção por Max Marginal Relevance (MMR) vetorizada com NumPy.
+
+Substitui o laço do langchain, que recalcula a similaridade de todos os
+candidatos com todos os já escolhidos a cada passo e percorre os candidatos
+em Python. Aqui os candidatos são normalizados uma única vez, a relevância
+para a consulta sai de um único produto matriz-vetor e a redundância (maior
+similaridade com os escolhidos) é atualizada de forma incremental com a
+similaridade do último escolhido. Tudo em float32.
+
+A ordem selecionada é a mesma do langchain (empates resolvidos pelo menor
+índice; vetores nulos têm similaridade 0).
+"""
+
+from typing import List, Sequence, Union
+
+import numpy as np
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza as linhas (linhas nulas continuam nulas)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def maximal_marginal_relevance(query_embedding: Union[np.ndarray, Sequence[float]],
+                               embedding_list: Union[np.ndarray, Sequence[Sequence[float]]],
+                               lambda_mult: float = 0.5, k: int = 4) -> List[int]:
+    """
+    Seleciona k candidatos equilibrando relevância e diversidade.
+
+    Args:
+        query_embedding: Embedding da consulta
+        embedding_list: Embeddings dos candidatos (fetch_k x dimensões)
+        lambda_mult: 1 = só relevância, 0 = só diversidade
+        k: Quantidade de candidatos a selecionar
+
+    Returns:
+        Índices dos candidatos selecionados, na ordem de seleção
+    """
+    count = len(embedding_list)
+    k = min(k, count)
+    if k <= 0:
+        return []
+
+    candidates = _unit_rows(np.asarray(embedding_list, dtype=np.float32).reshape(count, -1))
+    query = _unit_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+
+    similarity_to_query = candidates @ query
+    relevance = np.float32(lambda_mult) * similarity_to_query
+    penalty = np.float32(1.0 - lambda_mult)
+
+    selected = [int(np.argmax(similarity_to_query))]
+    available = np.ones(count, dtype=bool)
+    available[selected[0]] = False
+    max_similarity = candidates @ candidates[selected[0]]
+
+    while len(selected) < k:
+        scores = relevance - penalty * max_similarity
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(max_similarity, candidates @ candidates[chosen], out=max_similarity)
+
+    return selected
@@ -3,15 +3,18 @@ Modelos Pydantic para a API.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 from datetime import datetime
 
 
 class LoadDocumentRequest(BaseModel):
     """Modelo para requisição de carregamento de documento."""
     file_path: str = Field(..., description="Caminho para o arquivo a ser carregado")
-    chunk_size: Optional[int] = Field(600, description="Tamanho dos chunks de texto")
-    chunk_overlap: Optional[int] = Field(200, description="Sobreposição entre chunks")
+    chunk_size: Optional[int] = Field(None, description="Tamanho dos chunks (padrão: 600 caracteres ou 160 tokens)")
+    chunk_overlap: Optional[int] = Field(None, description="Sobreposição entre chunks (padrão: 200 caracteres ou 16 tokens)")
+    chunking: Optional[Literal["characters", "tokens"]] = Field(
+        None, description="Estratégia de chunking: por caracteres ou por tokens respeitando frases"
+    )
 
 
 class LoadDocumentResponse(BaseModel):
@@ -19,6 +22,94 @@ class LoadDocumentResponse(BaseModel):
     success: bool = Field(..., description="Indica se o carregamento foi bem-sucedido")
     message: str = Field(..., description="Mensagem de status")
     documents_count: int = Field(..., description="Número de documentos processados")
+    inserted_count: int = Field(0, description="Número de chunks novos inseridos")
+    skipped_count: int = Field(0, description="Número de chunks ignorados por já estarem indexados")
+    deleted_count: int = Field(0, description="Número de chunks antigos removidos")
+    status: str = Field("added", description="Situação do arquivo: added, updated ou unchanged")
+    peak_rss_mb: Optional[float] = Field(
+        None, description="Maior memória residente do processo medida durante esta ingestão (MB, amostrada por lote)"
+    )
+
+
+class SyncDirectoryRequest(BaseModel):
+    """Modelo para requisição de sincronização de diretório."""
+    directory: str = Field(..., description="Diretório com os documentos")
+    chunk_size: Optional[int] = Field(None, description="Tamanho dos chunks (padrão: 600 caracteres ou 160 tokens)")
+    chunk_overlap: Optional[int] = Field(None, description="Sobreposição entre chunks (padrão: 200 caracteres ou 16 tokens)")
+    chunking: Optional[Literal["characters", "tokens"]] = Field(
+        None, description="Estratégia de chunking: por caracteres ou por tokens respeitando frases"
+    )
+    recursive: Optional[bool] = Field(True, description="Incluir subdiretórios")
+
+
+class SyncDirectoryResponse(BaseModel):
+    """Modelo para resposta de sincronização de diretório."""
+    success: bool = Field(..., description="Indica se a sincronização foi concluída")
+    message: str = Field(..., description="Mensagem de status")
+    added: List[str] = Field(default_factory=list, description="Arquivos novos indexados")
+    updated: List[str] = Field(default_factory=list, description="Arquivos alterados reindexados")
+    unchanged: List[str] = Field(default_factory=list, description="Arquivos sem alteração")
+    removed: List[str] = Field(default_factory=list, description="Arquivos removidos do índice")
+    failed: List[Any] = Field(default_factory=list, description="Arquivos com erro e a mensagem")
+    inserted_count: int = Field(0, description="Número de chunks inseridos")
+    deleted_count: int = Field(0, description="Número de chunks removidos")
+
+
+class BulkIngestRequest(BaseModel):
+    """Modelo para requisição de ingestão em massa (diretório, glob e/ou manifesto)."""
+    directory: Optional[str] = Field(None, description="Diretório com os documentos")
+    pattern: Optional[str] = Field(None, description="Padrão glob dos arquivos (ex.: docs/**/*.pdf)")
+    files: Optional[List[str]] = Field(None, description="Lista explícita de arquivos (manifesto)")
+    recursive: Optional[bool] = Field(True, description="Incluir subdiretórios do diretório")
+    chunk_size: Optional[int] = Field(None, description="Tamanho dos chunks (padrão: 600 caracteres ou 160 tokens)")
+    chunk_overlap: Optional[int] = Field(None, description="Sobreposição entre chunks (padrão: 200 caracteres ou 16 tokens)")
+    chunking: Optional[Literal["characters", "tokens"]] = Field(
+        None, description="Estratégia de chunking: por caracteres ou por tokens respeitando frases"
+    )
+    force: Optional[bool] = Field(False, description="Reprocessar arquivos inalterados")
+    workers: Optional[int] = Field(None, ge=1, le=64, description="Arquivos processados simultaneamente")
+
+
+class BulkIngestResponse(BaseModel):
+    """Modelo para o relatório agregado da ingestão em massa."""
+    success: bool = Field(..., description="Indica se todos os arquivos foram carregados")
+    message: str = Field(..., description="Mensagem de status")
+    files: int = Field(0, description="Arquivos encontrados")
+    added: List[str] = Field(default_factory=list, description="Arquivos novos indexados")
+    updated: List[str] = Field(default_factory=list, description="Arquivos alterados reindexados")
+    unchanged: List[str] = Field(default_factory=list, description="Arquivos sem alteração")
+    failed: List[Any] = Field(default_factory=list, description="Arquivos com erro e a mensagem")
+    inserted_count: int = Field(0, description="Número de chunks inseridos")
+    skipped_count: int = Field(0, description="Número de chunks já indexados")
+    deleted_count: int = Field(0, description="Número de chunks removidos")
+    embedded_tokens: int = Field(0, description="Tokens enviados ao modelo de embedding")
+    seconds: float = Field(0.0, description="Duração da ingestão (s)")
+    chunks_per_second: float = Field(0.0, description="Chunks inseridos por segundo")
+
+
+class IngestionJobResponse(BaseModel):
+    """Modelo para um job de ingestão em segundo plano."""
+    id: str = Field(..., description="Identificador do job")
+    status: str = Field(..., description="Status do job: queued, running, completed ou failed")
+    stage: Optional[str] = Field(None, description="Etapa atual: fingerprint, parsing ou indexing")
+    stages: dict = Field(default_factory=dict, description="Progresso e duração de cada etapa")
+    file_path: str = Field(..., description="Arquivo sendo ingerido")
+    display_name: Optional[str] = Field(None, description="Nome exibido do arquivo")
+    chunking: Optional[str] = Field(None, description="Estratégia de chunking")
+    chunks_total: int = Field(0, description="Chunks do arquivo (em streaming, os lidos até agora)")
+    chunks_done: int = Field(0, description="Chunks já processados (inseridos ou ignorados)")
+    chunks_per_second: Optional[float] = Field(None, description="Vazão da etapa de indexação (chunks/s)")
+    result: Optional[dict] = Field(None, description="Resultado da ingestão quando concluída")
+    error: Optional[str] = Field(None, description="Mensagem de erro quando falhou")
+    created_at: str = Field(..., description="Data de criação")
+    started_at: Optional[str] = Field(None, description="Início do processamento")
+    finished_at: Optional[str] = Field(None, description="Fim do processamento")
+
+
+class IngestionJobListResponse(BaseModel):
+    """Modelo para a listagem de jobs de ingestão."""
+    jobs: List[IngestionJobResponse] = Field(..., description="Jobs da página")
+    total: int = Field(..., description="Total de jobs")
 
 
 class QueryRequest(BaseModel):
@@ -26,6 +117,18 @@ class QueryRequest(BaseModel):
     query: str = Field(..., description="Pergunta ou consulta a ser executada")
     lambda_mult: Optional[float] = Field(0.8, description="Parâmetro para Max Marginal Relevance Search")
     k_documents: Optional[int] = Field(4, description="Número de documentos a retornar")
+    ef_search: Optional[int] = Field(
+        None, ge=1, le=2000,
+        description="Candidatos explorados no índice HNSW. Só aumenta o ef_search da coleção (mais recall, mais "
+                    "latência); valores até o da coleção (ex.: 100 no perfil balanced) não têm efeito"
+    )
+
+
+class SourceDocument(BaseModel):
+    """Modelo para um chunk utilizado na resposta."""
+    content: str = Field(..., description="Conteúdo do chunk")
+    metadata: dict = Field(default_factory=dict, description="Metadados do chunk (origem, página, etc.)")
+    score: Optional[float] = Field(None, description="Score de relevância do chunk para a consulta")
 
 
 class QueryResponse(BaseModel):
@@ -34,6 +137,8 @@ class QueryResponse(BaseModel):
     query: str = Field(..., description="Pergunta original")
     answer: str = Field(..., description="Resposta gerada")
     documents_used: Any = Field(..., description="Documentos utilizados na resposta")
+    sources: List[SourceDocument] = Field(default_factory=list, description="Chunks utilizados com metadados e scores")
+    cached: bool = Field(False, description="Indica se a resposta veio do cache semântico")
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,174 @@
+"""
+Leitura de PDFs com extração de páginas em paralelo.
+
+O PyPDFLoader extrai o texto página a página em um único núcleo. Aqui as
+páginas são divididas em faixas e extraídas em um pool de processos; os
+documentos voltam na ordem das páginas, com os mesmos metadados do
+PyPDFLoader (page, page_label, total_pages, source...).
+
+O pypdf copia o arquivo inteiro para a memória e guarda os objetos já
+lidos, então o leitor vive só durante uma tarefa do pool ou uma chamada de
+lazy_load e nunca fica em cache no processo da API. O ganho com vários
+núcleos ainda não foi medido (o ambiente de desenvolvimento tem um núcleo);
+use bench_pdf_loader.py na máquina de produção antes de ajustar
+PDF_LOADER_WORKERS.
+"""
+
+import os
+import atexit
+import itertools
+import collections
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, Executor
+from typing import Iterator, List, Optional, Tuple
+
+import pypdf
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from config import PDF_LOADER_WORKERS, PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Retorna o pool de processos compartilhado para extração de PDFs (criado sob demanda)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" evita herdar threads/conexões do processo da API
+            _pool = ProcessPoolExecutor(
+                max_workers or PDF_LOADER_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+@atexit.register
+def shutdown_pdf_pool():
+    """Encerra o pool compartilhado."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def normalize_metadata(metadata: dict) -> dict:
+    """
+    Normaliza os metadados do PDF como o PyPDFLoader: chaves sem "/" e em
+    minúsculas, valores que não são str/int convertidos em texto e datas
+    do PDF (D:AAAAMMDDhhmmss) em ISO 8601.
+    """
+    normalized = {}
+    for key, value in metadata.items():
+        if type(value) not in (str, int):
+            value = str(value)
+        key = (key[1:] if key.startswith("/") else key).lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        normalized[key] = value
+    return normalized
+
+
+def _document_metadata(reader: pypdf.PdfReader, source: str) -> dict:
+    """Metadados do documento no mesmo formato do PyPDFLoader."""
+    return normalize_metadata(
+        {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+        | dict(reader.metadata or {})
+        | {"source": source, "total_pages": len(reader.pages)}
+    )
+
+
+def extract_pages(file_path: str, start: int, stop: int, source: Optional[str] = None) -> List[Document]:
+    """
+    Extrai o texto das páginas [start, stop) de um PDF.
+
+    Função de módulo para poder rodar em um pool de processos: cada tarefa
+    abre o arquivo por conta própria, evitando enviar o PDF pelo pipe, e o
+    leitor é descartado ao fim da tarefa.
+    """
+    return read_pages(pypdf.PdfReader(file_path), start, stop, source or file_path)
+
+
+def read_pages(reader: pypdf.PdfReader, start: int, stop: int, source: str) -> List[Document]:
+    """Extrai o texto das páginas [start, stop) de um leitor já aberto."""
+    metadata = _document_metadata(reader, source)
+    labels = reader.page_labels
+    return [
+        Document(
+            page_content=reader.pages[number].extract_text().strip(),
+            metadata=metadata | {"page": number, "page_label": labels[number]}
+        )
+        for number in range(start, min(stop, len(reader.pages)))
+    ]
+
+
+def page_ranges(total_pages: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """Divide as páginas em faixas contíguas [start, stop)."""
+    return [(start, min(start + pages_per_task, total_pages)) for start in range(0, total_pages, pages_per_task)]
+
+
+class ParallelPDFLoader(BaseLoader):
+    """
+    Carregador de PDF que extrai faixas de páginas em paralelo.
+
+    PDFs pequenos (menos de min_pages páginas) e chamadas feitas de dentro
+    de um processo filho (ex.: fila de ingestão) são lidos sequencialmente,
+    sem o custo de despachar tarefas para o pool.
+    """
+
+    def __init__(self, file_path: str, executor: Optional[Executor] = None,
+                 pages_per_task: int = PDF_PAGES_PER_TASK, min_pages: int = PDF_PARALLEL_MIN_PAGES,
+                 max_in_flight: Optional[int] = None):
+        self.file_path = str(file_path)
+        self.executor = executor
+        self.pages_per_task = max(1, pages_per_task)
+        self.min_pages = min_pages
+        self.max_in_flight = max_in_flight or 2 * (PDF_LOADER_WORKERS or os.cpu_count() or 1)
+
+    def _use_pool(self, total_pages: int) -> bool:
+        if self.executor is not None:
+            return True
+        in_child = multiprocessing.parent_process() is not None
+        return total_pages >= self.min_pages and not in_child and (PDF_LOADER_WORKERS or os.cpu_count() or 1) > 1
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Gera os documentos de cada página, na ordem das páginas."""
+        reader = pypdf.PdfReader(self.file_path)
+        total_pages = len(reader.pages)
+        ranges = page_ranges(total_pages, self.pages_per_task)
+
+        if not self._use_pool(total_pages):
+            # Um único leitor para todas as faixas, liberado ao fim da leitura
+            for start, stop in ranges:
+                yield from read_pages(reader, start, stop, self.file_path)
+            return
+        # Os processos do pool abrem o arquivo; o leitor local não é mais necessário
+        del reader
+
+        executor = self.executor or get_pdf_pool()
+        # Janela deslizante: no máximo max_in_flight faixas pendentes, para
+        # que a memória não cresça quando o consumidor (embeddings) é mais lento
+        pending = collections.deque()
+        remaining = iter(ranges)
+        try:
+            for start, stop in itertools.islice(remaining, self.max_in_flight):
+                pending.append(executor.submit(extract_pages, self.file_path, start, stop))
+            while pending:
+                documents = pending.popleft().result()
+                for start, stop in itertools.islice(remaining, 1):
+                    pending.append(executor.submit(extract_pages, self.file_path, start, stop))
+                yield from documents
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,321 @@
+"""
+Pipeline de consulta pré-compilado (recuperação + geração de resposta).
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from langchain.prompts import PromptTemplate
+from langchain.schema import Document
+
+from config import FETCH_K
+from hnsw_profiles import query_collection
+from mmr import maximal_marginal_relevance
+
+
+QA_PROMPT = PromptTemplate(
+    template="""Use as seguintes informações do contexto para responder à pergunta.
+            Se você não souber a resposta baseada no contexto, diga que não tem informações suficientes.
+
+            Contexto: {context}
+
+            Pergunta: {question}
+
+            Resposta:""",
+    input_variables=["context", "question"]
+)
+
+
+class QueryPipeline:
+    """
+    Pipeline de consulta compilado uma única vez para um par
+    (lambda_mult, k_documents) e reutilizado entre requisições.
+
+    Apenas a pergunta é passada a cada execução; prompt, coleção e função de
+    relevância são resolvidos na construção. Se um cache de respostas for
+    informado, ele é consultado logo após o embedding da pergunta.
+    """
+
+    def __init__(self, vectorstore, embeddings, llm, lambda_mult: float, k_documents: int,
+                 fetch_k: int = FETCH_K, prompt: PromptTemplate = QA_PROMPT,
+                 executor: Optional[Executor] = None, answer_cache=None,
+                 corpus_version: Optional[Callable[[], int]] = None):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.llm = llm
+        self.lambda_mult = lambda_mult
+        self.k_documents = k_documents
+        self.fetch_k = max(fetch_k, k_documents)
+        self.prompt = prompt
+        self.executor = executor
+        self.answer_cache = answer_cache
+        self.corpus_version = corpus_version or (lambda: 0)
+
+        self._collection = vectorstore._collection
+        self._relevance_fn = vectorstore._select_relevance_score_fn()
+
+        # Métricas de execução
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "invocations": 0,
+            "cache_hits": 0,
+            "retrieval_seconds": 0.0,
+            "generation_seconds": 0.0
+        }
+
+    @property
+    def key(self) -> Tuple[float, int]:
+        """Chave de cache do pipeline."""
+        return (self.lambda_mult, self.k_documents)
+
+    def _record(self, retrieval_seconds: float, generation_seconds: float, cache_hit: bool = False):
+        with self._stats_lock:
+            self.stats["invocations"] += 1
+            self.stats["cache_hits"] += int(cache_hit)
+            self.stats["retrieval_seconds"] += retrieval_seconds
+            self.stats["generation_seconds"] += generation_seconds
+
+    def _cache_lookup(self, query_embedding: List[float], version: int,
+                      ef_search: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Procura uma resposta para consulta similar, recuperada com os mesmos parâmetros."""
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.lookup(
+            query_embedding, self.lambda_mult, self.k_documents, self.fetch_k, ef_search, version
+        )
+        if cached is not None:
+            cached["cached"] = True
+        return cached
+
+    def _cache_store(self, query: str, query_embedding: List[float], result: Dict[str, Any], version: int,
+                     ef_search: Optional[int] = None):
+        """
+        Armazena a resposta no cache semântico.
+
+        version é a versão do corpus lida antes da recuperação: se uma
+        ingestão terminou durante a consulta, a resposta (montada com o corpus
+        anterior) não é armazenada.
+        """
+        if self.answer_cache is not None and self.corpus_version() == version:
+            self.answer_cache.store(
+                query, query_embedding, self.lambda_mult, self.k_documents, self.fetch_k, ef_search, version, result
+            )
+
+    def retrieve(self, query: str, ef_search: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """
+        Recupera chunks relevantes com Max Marginal Relevance em uma única passada.
+
+        A consulta é transformada em embedding uma única vez; os candidatos
+        são buscados com seus embeddings e distâncias, e o MMR é aplicado
+        localmente sobre eles.
+
+        Args:
+            query: Pergunta a ser respondida
+            ef_search: Candidatos explorados no índice HNSW; só valores acima do da coleção têm efeito
+
+        Returns:
+            Lista de tuplas (documento, score de relevância) na ordem do MMR
+        """
+        query_embedding = self.embeddings.embed_query(query)
+        return self._search(query_embedding, ef_search)
+
+    async def aretrieve(self, query: str, ef_search: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """
+        Versão assíncrona de retrieve.
+
+        O embedding da consulta usa a API assíncrona do modelo; a busca no
+        Chroma (síncrona) é executada no pool de threads limitado do serviço.
+        """
+        query_embedding = await self.embeddings.aembed_query(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._search, query_embedding, ef_search)
+
+    def _search(self, query_embedding: List[float], ef_search: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """Busca os candidatos no Chroma e aplica o MMR."""
+        results = query_collection(
+            self._collection,
+            [query_embedding],
+            n_results=self.fetch_k,
+            include=["metadatas", "documents", "distances", "embeddings"],
+            ef_search=ef_search
+        )
+
+        if not results["ids"] or not results["ids"][0]:
+            return []
+
+        selected = maximal_marginal_relevance(
+            np.array(query_embedding, dtype=np.float32),
+            results["embeddings"][0],
+            k=self.k_documents,
+            lambda_mult=self.lambda_mult
+        )
+
+        retrieved = []
+        for index in selected:
+            document = Document(
+                page_content=results["documents"][0][index],
+                metadata=results["metadatas"][0][index] or {},
+                id=results["ids"][0][index]
+            )
+            retrieved.append((document, self._relevance_fn(results["distances"][0][index])))
+
+        return retrieved
+
+    def build_prompt(self, query: str, retrieved: List[Tuple[Document, float]]) -> str:
+        """Monta o prompt com os chunks recuperados."""
+        context = "\n\n".join(doc.page_content for doc, _ in retrieved)
+        return self.prompt.format(context=context, question=query)
+
+    @staticmethod
+    def format_result(answer: str, retrieved: List[Tuple[Document, float]]) -> Dict[str, Any]:
+        """Converte a resposta e os chunks recuperados no formato da API."""
+        return {
+            "answer": answer,
+            "cached": False,
+            "documents_used": [doc.page_content for doc, _ in retrieved],
+            "sources": [
+                {
+                    "content": doc.page_content,
+                    "metadata": doc.metadata,
+                    "score": score
+                }
+                for doc, score in retrieved
+            ]
+        }
+
+    def invoke(self, query: str, ef_search: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Executa o pipeline para uma pergunta.
+
+        Args:
+            query: Pergunta a ser respondida
+            ef_search: Candidatos explorados no índice HNSW; só valores acima do da coleção têm efeito
+
+        Returns:
+            Dicionário com answer, documents_used e sources
+        """
+        started = time.perf_counter()
+        version = self.corpus_version()
+        query_embedding = self.embeddings.embed_query(query)
+        cached = self._cache_lookup(query_embedding, version, ef_search)
+        if cached is not None:
+            self._record(time.perf_counter() - started, 0.0, cache_hit=True)
+            return cached
+
+        retrieved = self._search(query_embedding, ef_search)
+        retrieved_at = time.perf_counter()
+
+        answer = self.llm.invoke(self.build_prompt(query, retrieved))
+        self._record(retrieved_at - started, time.perf_counter() - retrieved_at)
+
+        result = self.format_result(answer.content, retrieved)
+        self._cache_store(query, query_embedding, result, version, ef_search)
+        return result
+
+    async def ainvoke(self, query: str, ef_search: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Versão assíncrona de invoke, que não bloqueia o event loop.
+
+        Args:
+            query: Pergunta a ser respondida
+            ef_search: Candidatos explorados no índice HNSW; só valores acima do da coleção têm efeito
+
+        Returns:
+            Dicionário com answer, documents_used e sources
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        version = self.corpus_version()
+        query_embedding = await self.embeddings.aembed_query(query)
+        cached = await loop.run_in_executor(self.executor, self._cache_lookup, query_embedding, version, ef_search)
+        if cached is not None:
+            self._record(time.perf_counter() - started, 0.0, cache_hit=True)
+            return cached
+
+        retrieved = await loop.run_in_executor(self.executor, self._search, query_embedding, ef_search)
+        retrieved_at = time.perf_counter()
+
+        answer = await self.llm.ainvoke(self.build_prompt(query, retrieved))
+        self._record(retrieved_at - started, time.perf_counter() - retrieved_at)
+
+        result = self.format_result(answer.content, retrieved)
+        await loop.run_in_executor(self.executor, self._cache_store, query, query_embedding, result, version,
+                                   ef_search)
+        return result
+
+    async def astream(self, query: str, ef_search: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Executa o pipeline emitindo eventos à medida que ficam prontos.
+
+        Emite primeiro os chunks recuperados ("documents"), depois cada pedaço
+        da resposta produzido pelo modelo ("token") e, por fim, um resumo
+        ("done").
+
+        Args:
+            query: Pergunta a ser respondida
+            ef_search: Candidatos explorados no índice HNSW; só valores acima do da coleção têm efeito
+
+        Yields:
+            Dicionários com as chaves "event" e "data"
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        version = self.corpus_version()
+        query_embedding = await self.embeddings.aembed_query(query)
+        cached = await loop.run_in_executor(self.executor, self._cache_lookup, query_embedding, version, ef_search)
+        if cached is not None:
+            self._record(time.perf_counter() - started, 0.0, cache_hit=True)
+            yield {
+                "event": "documents",
+                "data": {"documents_used": cached["documents_used"], "sources": cached["sources"]}
+            }
+            yield {"event": "token", "data": {"content": cached["answer"]}}
+            yield {
+                "event": "done",
+                "data": {
+                    "answer": cached["answer"],
+                    "cached": True,
+                    "retrieval_seconds": round(time.perf_counter() - started, 4),
+                    "generation_seconds": 0.0
+                }
+            }
+            return
+
+        retrieved = await loop.run_in_executor(self.executor, self._search, query_embedding, ef_search)
+        retrieved_at = time.perf_counter()
+
+        documents = self.format_result("", retrieved)
+        yield {
+            "event": "documents",
+            "data": {
+                "documents_used": documents["documents_used"],
+                "sources": documents["sources"]
+            }
+        }
+
+        parts = []
+        async for chunk in self.llm.astream(self.build_prompt(query, retrieved)):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield {"event": "token", "data": {"content": chunk.content}}
+
+        finished = time.perf_counter()
+        self._record(retrieved_at - started, finished - retrieved_at)
+
+        documents["answer"] = "".join(parts)
+        await loop.run_in_executor(self.executor, self._cache_store, query, query_embedding, documents, version,
+                                   ef_search)
+
+        yield {
+            "event": "done",
+            "data": {
+                "answer": documents["answer"],
+                "cached": False,
+                "retrieval_seconds": round(retrieved_at - started, 4),
+                "generation_seconds": round(finished - retrieved_at, 4)
+            }
+        }
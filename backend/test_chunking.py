@@ -0,0 +1,82 @@
+"""
+Testes do divisor por tokens que respeita frases e parágrafos.
+"""
+
+import os
+import sys
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from chunking import SentenceTokenSplitter, make_text_splitter, sentence_spans
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def sentences(text):
+    return [text[start:end].strip() for start, end, _ in sentence_spans(text)]
+
+
+def test_sentence_spans_handle_portuguese_abbreviations():
+    text = (
+        "D. Pedro I proclamou a independência em 1822.[1] O Sr. José Bonifácio apoiou o príncipe. "
+        "Em 1888, a Lei Áurea aboliu a escravidão! Quem assinou? A princesa Isabel."
+    )
+    assert sentences(text) == [
+        "D. Pedro I proclamou a independência em 1822.[1]",
+        "O Sr. José Bonifácio apoiou o príncipe.",
+        "Em 1888, a Lei Áurea aboliu a escravidão!",
+        "Quem assinou?",
+        "A princesa Isabel.",
+    ]
+
+
+def test_abbreviation_check_looks_at_the_whole_word():
+    # "gen" é abreviação, "Copenhagen" não; abreviações também valem após quebra de linha
+    text = "A comitiva visitou Copenhagen. Depois seguiu viagem com o\nSr. Almeida. Fim."
+    assert sentences(text) == [
+        "A comitiva visitou Copenhagen.",
+        "Depois seguiu viagem com o\nSr. Almeida.",
+        "Fim.",
+    ]
+
+
+def test_chunks_are_whole_sentences_within_budget():
+    text = " ".join(f"A frase número {number} fala sobre a história do Brasil." for number in range(30))
+    splitter = SentenceTokenSplitter(chunk_size=30, chunk_overlap=10, token_counter=word_count)
+
+    chunks = splitter.split_text(text)
+
+    assert len(chunks) > 1
+    assert all(word_count(chunk) <= 30 for chunk in chunks)
+    assert all(chunk.startswith("A frase") and chunk.endswith("Brasil.") for chunk in chunks)
+    # Sobreposição de uma frase inteira (10 palavras) entre chunks vizinhos
+    assert chunks[1].split(".")[0] == chunks[0].split(". ")[-1].split(".")[0]
+
+
+def test_paragraphs_are_not_crossed_once_half_full():
+    first = " ".join(["Primeiro parágrafo com cinco palavras."] * 5)
+    second = "Segundo parágrafo curto."
+    splitter = SentenceTokenSplitter(chunk_size=40, chunk_overlap=5, token_counter=word_count)
+
+    chunks = splitter.split_text(f"{first}\n\n{second}")
+
+    assert chunks == [first, second]
+
+
+def test_long_sentence_is_split_by_words():
+    text = " ".join(["palavra"] * 25) + "."
+    splitter = SentenceTokenSplitter(chunk_size=10, chunk_overlap=0, token_counter=word_count)
+
+    chunks = splitter.split_text(text)
+
+    assert [word_count(chunk) for chunk in chunks] == [10, 10, 5]
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        make_text_splitter(100, 10, "paginas")
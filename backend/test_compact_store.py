@@ -0,0 +1,77 @@
+"""
+Testes do armazenamento vetorial compacto (int8/float16, truncamento e reordenação).
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from compact_store import CompactCollection, normalize
+
+
+def make_vectors(count=2000, dims=128, seed=0):
+    """Vetores com energia decrescente por dimensão, como os modelos Matryoshka."""
+    rng = np.random.default_rng(seed)
+    spectrum = 1.0 / np.sqrt(1.0 + np.arange(dims) / 8.0)
+    return (rng.normal(size=(count, dims)) * spectrum).astype(np.float32)
+
+
+def exact_top_k(vectors, queries, k):
+    return np.argsort(-(normalize(queries) @ normalize(vectors).T), axis=1)[:, :k]
+
+
+def recall(collection, vectors, queries, k, **kwargs):
+    expected = exact_top_k(vectors, queries, k)
+    hits = 0
+    for query, truth in zip(queries, expected):
+        slots, _ = collection.search(query, k, **kwargs)
+        hits += len(set(slots.tolist()) & set(truth.tolist()))
+    return hits / expected.size
+
+
+@pytest.mark.parametrize("quantization,dimensions,min_recall", [
+    ("int8", None, 0.99), ("float16", None, 0.99), ("int8", 32, 0.95)
+])
+def test_rescoring_recovers_exact_neighbours(tmp_path, quantization, dimensions, min_recall):
+    vectors = make_vectors()
+    queries = vectors[:50] + 0.3 * make_vectors(50, seed=1)
+    collection = CompactCollection(str(tmp_path), quantization, dimensions, rescore_factor=8)
+    collection.upsert([f"id{i}" for i in range(len(vectors))], vectors)
+
+    assert recall(collection, vectors, queries, 10) >= min_recall
+    assert recall(collection, vectors, queries, 10, rescore=False) <= recall(collection, vectors, queries, 10)
+    stats = collection.get_stats()
+    assert stats["ram_bytes"] < vectors.nbytes / (3.5 if quantization == "int8" else 1.9)
+
+
+def test_deletes_survive_vacuum_and_reload(tmp_path):
+    vectors = make_vectors(100)
+    collection = CompactCollection(str(tmp_path), "int8", 64)
+    collection.upsert(
+        [f"id{i}" for i in range(100)], vectors, [f"texto {i}" for i in range(100)],
+        [{"source": f"arquivo{i % 2}.txt"} for i in range(100)]
+    )
+
+    collection.delete(where={"source": "arquivo0.txt"})
+    assert collection.get_stats()["slots"] == 50  # reescrito ao passar de 25% apagados
+
+    reloaded = CompactCollection(str(tmp_path), "int8", 64)
+    result = reloaded.query([vectors[7]], n_results=1)
+    assert reloaded.count() == 50
+    assert result["ids"] == [["id7"]] and result["documents"] == [["texto 7"]]
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+    assert reloaded.get(ids=["id6", "id7"], include=[])["ids"] == ["id7"]
+
+
+def test_document_service_runs_on_compact_backend(make_service, historia):
+    service = make_service(vector_store_backend="compact")
+
+    first = asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    second = asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    result = asyncio.run(service.query_documents("Quando chegou Cabral?", k_documents=2))
+
+    assert first["inserted"] == service.count_chunks() == 3
+    assert second["status"] == "unchanged"
+    assert len(result["sources"]) == 2
+    assert asyncio.run(service.get_status())["vector_store"]["backend"] == "compact"
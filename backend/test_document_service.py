@@ -0,0 +1,527 @@
+"""
+Testes do serviço de documentos usando modelos locais (sem chamadas à OpenAI).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import hashlib
+import threading
+
+import numpy as np
+import pytest
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_chroma import Chroma
+
+from answer_cache import SemanticAnswerCache
+from document_service import DocumentService, iter_chunks, iter_text_documents, resolve_document_files
+
+
+HISTORIA = (
+    "Pedro Álvares Cabral chegou ao Brasil em 1500.\n"
+    "A independência do Brasil foi proclamada em 1822 por Dom Pedro I.\n"
+    "A abolição da escravatura ocorreu em 1888 com a Lei Áurea.\n"
+    "A República foi proclamada em 1889 pelo Marechal Deodoro da Fonseca.\n"
+)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Embedding determinístico que conta as chamadas recebidas."""
+
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+class SlowChatModel(FakeListChatModel):
+    """Modelo de chat falso com latência assíncrona, simulando a OpenAI."""
+
+    delay: float = 0.3
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.responses[0]))])
+
+
+@pytest.fixture
+def embeddings():
+    return CountingEmbeddings(size=32)
+
+
+@pytest.fixture
+def service(tmp_path, embeddings):
+    llm = FakeListChatModel(responses=["Resposta de teste"] * 20)
+    return DocumentService(
+        llm=llm,
+        embeddings=embeddings,
+        persist_directory=str(tmp_path / "chromadb"),
+        answer_cache=False
+    )
+
+
+@pytest.fixture
+def historia_file(tmp_path):
+    path = tmp_path / "historia.txt"
+    path.write_text(HISTORIA, encoding="utf-8")
+    return str(path)
+
+
+def test_has_documents_does_not_embed(service, embeddings, historia_file):
+    """has_documents usa a contagem da coleção e não chama o modelo de embedding."""
+    assert service.has_documents() is False
+    assert embeddings.calls == 0
+
+    count = asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))["inserted"]
+    calls_after_load = embeddings.calls
+
+    assert service.has_documents() is True
+    assert service.count_chunks() == count
+    assert embeddings.calls == calls_after_load
+
+
+def test_chunk_count_survives_restart(tmp_path, embeddings, historia_file):
+    """O contador é reconstruído a partir da coleção persistida."""
+    persist_directory = str(tmp_path / "chromadb")
+    llm = FakeListChatModel(responses=["ok"])
+    first = DocumentService(llm=llm, embeddings=embeddings, persist_directory=persist_directory)
+    count = asyncio.run(first.load_document(historia_file, chunk_size=80, chunk_overlap=0))["inserted"]
+
+    second = DocumentService(llm=llm, embeddings=embeddings, persist_directory=persist_directory)
+    assert second.count_chunks() == count
+
+
+def test_status_reports_registry_stats(service, embeddings, historia_file):
+    """O status vem do registro lateral, sem gerar embeddings."""
+    count = asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))["inserted"]
+    calls_after_load = embeddings.calls
+
+    status = asyncio.run(service.get_status())
+    assert status["documents_count"] == count
+    assert status["files_count"] == 1
+    assert status["total_tokens"] > 0
+    assert status["total_bytes"] >= len(HISTORIA.strip().encode("utf-8")) - 10
+    assert status["last_loaded"] is not None
+    assert embeddings.calls == calls_after_load
+
+    stats = service.get_document_stats(offset=0, limit=10)
+    assert stats["total"] == 1
+    assert stats["items"][0]["source"] == historia_file
+    assert stats["items"][0]["chunks"] == count
+
+
+def test_query_retrieves_once(service, embeddings, historia_file):
+    """A consulta gera um único embedding e retorna os mesmos chunks do prompt."""
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+    calls_before = embeddings.calls
+
+    result = asyncio.run(
+        service.query_documents("Quem proclamou a independência?", lambda_mult=0.5, k_documents=2)
+    )
+    answer, documents_used, sources = result["answer"], result["documents_used"], result["sources"]
+
+    assert embeddings.calls == calls_before + 1
+    assert answer == "Resposta de teste"
+    assert len(documents_used) == 2
+    assert [source["content"] for source in sources] == documents_used
+    assert all(source["metadata"]["source"] == historia_file for source in sources)
+    assert all(isinstance(source["score"], float) for source in sources)
+
+
+def test_pipeline_is_compiled_once(service, historia_file):
+    """Pipelines são reutilizados entre consultas com os mesmos parâmetros."""
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+    assert service.compile_pipelines([(0.8, 4)]) == 1
+
+    pipeline = service.get_pipeline(0.8, 4)
+    asyncio.run(service.query_documents("Quando o Brasil foi descoberto?", lambda_mult=0.8, k_documents=4))
+    asyncio.run(service.query_documents("Quem aboliu a escravatura?", lambda_mult=0.8, k_documents=4))
+
+    assert service.get_pipeline(0.8, 4) is pipeline
+    assert pipeline.stats["invocations"] == 2
+    assert service.get_pipeline(0.5, 2) is not pipeline
+
+
+def test_parallel_queries_do_not_block(tmp_path, embeddings, historia_file):
+    """N consultas paralelas terminam em tempo próximo ao de uma só."""
+    llm = SlowChatModel(responses=["ok"], delay=0.3)
+    service = DocumentService(llm=llm, embeddings=embeddings, persist_directory=str(tmp_path / "chromadb"),
+                              answer_cache=False)
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+
+    async def run_parallel(n):
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            service.query_documents(f"Pergunta {i}", lambda_mult=0.8, k_documents=2)
+            for i in range(n)
+        ])
+        return time.perf_counter() - started, results
+
+    elapsed, results = asyncio.run(run_parallel(8))
+
+    assert all(result["answer"] == "ok" for result in results)
+    # Sequencialmente seriam ~2.4s; em paralelo, próximo de uma chamada
+    assert elapsed < 0.3 * 3
+
+
+def test_stream_query_emits_documents_then_tokens(service, historia_file):
+    """O streaming emite os chunks, depois os tokens e por fim o resumo."""
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+
+    async def collect():
+        return [event async for event in service.stream_query("Quem foi Cabral?", k_documents=2)]
+
+    events = asyncio.run(collect())
+    names = [event["event"] for event in events]
+
+    assert names[0] == "documents"
+    assert names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    assert len(events[0]["data"]["sources"]) == 2
+    tokens = "".join(event["data"]["content"] for event in events if event["event"] == "token")
+    assert tokens == events[-1]["data"]["answer"] == "Resposta de teste"
+
+
+def test_answer_cache_reuses_and_invalidates(tmp_path, embeddings, historia_file):
+    """Perguntas repetidas usam o cache; uma nova ingestão o invalida."""
+    llm = FakeListChatModel(responses=["primeira", "segunda", "terceira"])
+    service = DocumentService(llm=llm, embeddings=embeddings, persist_directory=str(tmp_path / "chromadb"))
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+
+    first = asyncio.run(service.query_documents("Quem foi Cabral?"))
+    repeated = asyncio.run(service.query_documents("  quem foi CABRAL? "))
+    other_params = asyncio.run(service.query_documents("Quem foi Cabral?", k_documents=2))
+
+    assert first["cached"] is False
+    assert repeated["cached"] is True
+    assert repeated["answer"] == first["answer"] == "primeira"
+    assert repeated["documents_used"] == first["documents_used"]
+    assert other_params["cached"] is False
+
+    extra = tmp_path / "extra.txt"
+    extra.write_text("Getúlio Vargas governou o Brasil a partir de 1930.", encoding="utf-8")
+    asyncio.run(service.load_document(str(extra), chunk_size=80, chunk_overlap=0))
+
+    after_load = asyncio.run(service.query_documents("Quem foi Cabral?"))
+    assert after_load["cached"] is False
+    assert service.answer_cache.get_stats()["hits"] == 1
+
+
+def test_answer_cache_ignores_answers_from_an_older_corpus(tmp_path, embeddings, historia_file):
+    """Respostas montadas antes de uma ingestão não entram no cache nem apagam as mais novas."""
+    llm = FakeListChatModel(responses=["antiga", "nova"])
+    service = DocumentService(llm=llm, embeddings=embeddings, persist_directory=str(tmp_path / "chromadb"))
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+    pipeline = service.get_pipeline(0.8, 4)
+
+    # A ingestão termina entre a recuperação (versão 1) e o armazenamento (versão 2)
+    versions = iter([1, 2])
+    pipeline.corpus_version = lambda: next(versions)
+    asyncio.run(pipeline.ainvoke("Quem foi Cabral?"))
+    assert service.answer_cache.entries == 0
+
+    cache = service.answer_cache
+    vector = embeddings.embed_query("Quem foi Cabral?")
+    result = {"answer": "nova", "documents_used": 1, "sources": []}
+    cache.store("Quem foi Cabral?", vector, 0.8, 4, 20, None, 3, result)
+    cache.store("Quem foi Cabral?", vector, 0.8, 4, 20, None, 2, dict(result, answer="antiga"))
+    assert cache.lookup(vector, 0.8, 4, 20, None, 3)["answer"] == "nova"
+    assert cache.lookup(vector, 0.8, 4, 20, None, 2) is None
+    assert cache.entries == 1
+
+
+def test_answer_cache_key_includes_fetch_k_and_ef_search(tmp_path, embeddings, historia_file):
+    """Respostas recuperadas com outro fetch_k ou ef_search não são reutilizadas."""
+    llm = FakeListChatModel(responses=["primeira", "segunda", "terceira"])
+    service = DocumentService(llm=llm, embeddings=embeddings, persist_directory=str(tmp_path / "chromadb"))
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+
+    first = asyncio.run(service.query_documents("Quem foi Cabral?"))
+    tuned = asyncio.run(service.query_documents("Quem foi Cabral?", ef_search=500))
+    repeated = asyncio.run(service.query_documents("Quem foi Cabral?", ef_search=500))
+    assert (first["cached"], tuned["cached"], repeated["cached"]) == (False, False, True)
+    assert repeated["answer"] == "segunda"
+
+    cache = service.answer_cache
+    vector = embeddings.embed_query("outra pergunta")
+    cache.store("outra pergunta", vector, 0.8, 4, 20, None, service.corpus_version, dict(first, answer="x"))
+    assert cache.lookup(vector, 0.8, 4, 40, None, service.corpus_version) is None
+    assert cache.lookup(vector, 0.8, 4, 20, None, service.corpus_version)["answer"] == "x"
+
+
+def test_answer_cache_evicts_in_memory(tmp_path, monkeypatch):
+    """Com o cache cheio, só as respostas mais antigas saem, sem reler o banco."""
+    cache = SemanticAnswerCache(str(tmp_path / "answers.db"), max_entries=40)
+    vectors = np.eye(64, dtype=np.float32)
+    result = {"answer": "", "documents_used": [], "sources": []}
+    for index in range(30):
+        cache.store(f"p{index}", vectors[index], 0.5, 4, 20, None, 1, dict(result, answer=str(index)))
+    for index in range(30, 64):
+        cache.store(f"p{index}", vectors[index], 0.5, 4, 20, 200, 1, dict(result, answer=str(index)))
+        if index == 40:
+            monkeypatch.setattr(cache, "_load", lambda version: pytest.fail("índice relido do banco"))
+
+    assert cache.entries == 40
+    assert cache.lookup(vectors[23], 0.5, 4, 20, None, 1) is None
+    assert cache.lookup(vectors[24], 0.5, 4, 20, None, 1)["answer"] == "24"
+    assert cache.lookup(vectors[63], 0.5, 4, 20, 200, 1)["answer"] == "63"
+
+    monkeypatch.undo()
+    reopened = SemanticAnswerCache(str(tmp_path / "answers.db"), max_entries=40)
+    assert reopened.lookup(vectors[24], 0.5, 4, 20, None, 1)["answer"] == "24"
+    assert reopened.entries == 40
+
+
+def test_reloading_same_file_skips_duplicates(service, embeddings, historia_file):
+    """Recarregar o mesmo arquivo não duplica chunks nem gera embeddings."""
+    first = asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+    calls_after_first = embeddings.calls
+    version_after_first = service.corpus_version
+
+    second = asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+
+    assert first["inserted"] == first["documents_count"] > 0
+    assert second["status"] == "unchanged"
+    assert second["inserted"] == second["deleted"] == 0
+    assert second["skipped"] == first["documents_count"]
+    assert service.vectorstore._collection.count() == first["inserted"]
+    assert service.count_chunks() == first["inserted"]
+    assert embeddings.calls == calls_after_first
+    assert service.corpus_version == version_after_first
+
+
+def test_modified_file_swaps_stale_chunks(service, embeddings, historia_file):
+    """Um arquivo alterado insere só os chunks novos e remove os que sumiram."""
+    first = asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+
+    with open(historia_file, "w", encoding="utf-8") as file:
+        file.write(HISTORIA.replace("em 1888 com a Lei Áurea", "em 13 de maio de 1888"))
+    calls_before = embeddings.calls
+    second = asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+
+    assert second["status"] == "updated"
+    assert second["inserted"] == second["deleted"] == 1
+    assert embeddings.calls == calls_before + 1
+    assert service.vectorstore._collection.count() == first["documents_count"]
+    assert service.count_chunks() == first["documents_count"]
+
+    contents = service.vectorstore._collection.get()["documents"]
+    assert any("13 de maio" in content for content in contents)
+    assert not any("Lei Áurea" in content for content in contents)
+    assert len(service.registry.get_chunk_ids(os.path.abspath(historia_file))) == first["documents_count"]
+
+
+def test_reloading_a_file_indexed_before_the_registry(tmp_path, embeddings, historia_file, monkeypatch):
+    """Chunks de bancos antigos (source relativo, IDs uuid) são substituídos na recarga."""
+    monkeypatch.chdir(tmp_path)
+    persist_directory = str(tmp_path / "chromadb")
+    legacy = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    legacy.add_texts(HISTORIA.splitlines(), [{"source": "historia.txt"}] * 4)
+    del legacy
+
+    llm = FakeListChatModel(responses=["ok"])
+    service = DocumentService(llm=llm, embeddings=embeddings, persist_directory=persist_directory,
+                              answer_cache=False)
+    assert service.registry.list_sources() == [historia_file]
+
+    result = asyncio.run(service.load_document("historia.txt", chunk_size=80, chunk_overlap=0))
+    assert result["status"] == "updated" and result["deleted"] == 4
+    assert service.vectorstore._collection.count() == service.count_chunks() == 4
+    assert service.lexical_index.count() == 4
+    assert service.registry.get_totals()["documents"] == 1
+    assert service.registry.get_totals()["chunks"] == 4
+
+
+def test_legacy_chunks_are_found_without_a_registry_entry(service, historia_file, monkeypatch):
+    """Sem registro do arquivo, os chunks antigos são localizados pelo caminho relativo."""
+    monkeypatch.chdir(os.path.dirname(historia_file))
+    service.vectorstore.add_texts(["Texto indexado pela versão antiga."], [{"source": "historia.txt"}])
+
+    result = asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+    assert result["status"] == "added" and result["deleted"] == 1
+    assert service.vectorstore._collection.count() == 4
+
+
+def test_changing_chunking_strategy_reindexes(service, historia_file):
+    """Trocar a estratégia de chunking re-divide o arquivo mesmo sem alteração no conteúdo."""
+    asyncio.run(service.load_document(historia_file, chunk_size=80, chunk_overlap=0))
+    second = asyncio.run(service.load_document(historia_file, chunking="tokens"))
+
+    assert second["status"] == "updated"
+    assert service.registry.get_document(os.path.abspath(historia_file))["chunking"] == "tokens"
+    contents = service.vectorstore._collection.get()["documents"]
+    assert all(content.rstrip().endswith(".") for content in contents)
+
+
+def test_sync_directory_removes_deleted_files(service, tmp_path):
+    """A sincronização indexa arquivos novos, ignora os inalterados e remove os apagados."""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "colonia.txt").write_text("Pedro Álvares Cabral chegou ao Brasil em 1500.", encoding="utf-8")
+    (docs / "imperio.txt").write_text("Dom Pedro I proclamou a independência em 1822.", encoding="utf-8")
+    (docs / "ignorado.csv").write_text("ano,evento", encoding="utf-8")
+
+    first = service.sync_directory_sync(str(docs))
+    assert len(first["added"]) == 2
+    assert service.count_chunks() == 2
+
+    os.remove(docs / "imperio.txt")
+    second = service.sync_directory_sync(str(docs))
+
+    assert second["unchanged"] == [str(docs / "colonia.txt")]
+    assert second["removed"] == [str(docs / "imperio.txt")]
+    assert second["deleted"] == 1
+    assert service.vectorstore._collection.count() == service.count_chunks() == 1
+    assert service.registry.get_totals()["documents"] == 1
+
+
+def test_bulk_load_resolves_glob_and_manifest(service, tmp_path):
+    """A ingestão em massa junta diretório, glob e manifesto e agrega o relatório."""
+    docs = tmp_path / "docs"
+    (docs / "imperio").mkdir(parents=True)
+    (docs / "colonia.txt").write_text("Pedro Álvares Cabral chegou ao Brasil em 1500.", encoding="utf-8")
+    (docs / "imperio" / "independencia.md").write_text("Dom Pedro I proclamou a independência.", encoding="utf-8")
+    (docs / "imperio" / "abolicao.txt").write_text("A Lei Áurea foi assinada em 1888.", encoding="utf-8")
+    (docs / "ignorado.csv").write_text("ano,evento", encoding="utf-8")
+
+    paths = resolve_document_files(
+        pattern=str(docs / "**" / "*.txt"),
+        files=[str(docs / "imperio" / "independencia.md"), str(docs / "colonia.txt")]
+    )
+    assert len(paths) == 3
+    assert resolve_document_files(directory=str(docs)) == paths
+    with pytest.raises(Exception):
+        resolve_document_files(files=[str(docs / "ignorado.csv")])
+
+    first = service.bulk_load_sync(paths, workers=3)
+    os.remove(docs / "colonia.txt")
+    second = service.bulk_load_sync(paths, workers=3)
+
+    assert first["files"] == 3 and sorted(first["added"]) == paths
+    assert first["inserted"] == service.count_chunks() == 3
+    assert first["embedded_tokens"] > 0
+    assert second["unchanged"] == paths[1:]
+    assert second["inserted"] == 0 and second["skipped"] == 2
+    assert [failure["file"] for failure in second["failed"]] == [str(docs / "colonia.txt")]
+
+
+def test_index_chunks_consumes_generator_in_batches(service, historia_file, monkeypatch):
+    """Os chunks são lidos lote a lote: cada lote é inserido antes do próximo ser gerado."""
+    monkeypatch.setattr("document_service.INGESTION_BATCH_SIZE", 2)
+    pulled = []
+    pulled_at_insert = []
+
+    def chunks():
+        for chunk in iter_chunks(historia_file, chunk_size=80, chunk_overlap=0):
+            pulled.append(chunk)
+            yield chunk
+
+    original_add = service.vectorstore.add_documents
+
+    def add_documents(documents, ids):
+        pulled_at_insert.append(len(pulled))
+        return original_add(documents, ids=ids)
+
+    monkeypatch.setattr(service.vectorstore, "add_documents", add_documents)
+    prepared = service.prepare_document(historia_file, chunk_size=80, chunk_overlap=0)
+    result = service.index_chunks(prepared, chunks())
+
+    assert result["inserted"] == result["documents_count"] == 4
+    assert pulled_at_insert == [2, 4]
+    assert result["peak_rss_mb"] is None or result["peak_rss_mb"] > 0
+
+
+def test_peak_rss_is_measured_during_the_ingest(service, historia_file, monkeypatch):
+    """peak_rss_mb é o maior RSS amostrado nesta ingestão, não o pico da vida do processo."""
+    monkeypatch.setattr("document_service.INGESTION_BATCH_SIZE", 2)
+    samples = iter([300.0, 340.0, 320.0, 150.0])
+    monkeypatch.setattr("document_service.current_rss_mb", lambda: next(samples))
+
+    prepared = service.prepare_document(historia_file, chunk_size=80, chunk_overlap=0)
+    result = service.index_chunks(prepared, iter_chunks(historia_file, chunk_size=80, chunk_overlap=0))
+    assert result["peak_rss_mb"] == 340.0
+    assert service.load_document_sync(historia_file, chunk_size=80, chunk_overlap=0)["peak_rss_mb"] == 150.0
+
+
+def test_text_is_read_in_blocks(tmp_path):
+    """Arquivos de texto grandes são lidos em blocos terminados em quebra de parágrafo."""
+    path = tmp_path / "grande.txt"
+    paragraphs = [f"Parágrafo {number} sobre a história do Brasil." for number in range(200)]
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+    blocks = list(iter_text_documents(str(path), block_size=500))
+
+    assert len(blocks) > 1
+    assert "".join(block.page_content for block in blocks) == path.read_text(encoding="utf-8")
+    assert all(block.page_content.endswith("\n\n") for block in blocks[:-1])
+    assert len(list(iter_text_documents(str(path)))) == 1
+
+
+def test_reupload_with_known_hash_is_unchanged(service, embeddings, tmp_path):
+    """Um novo upload idêntico (outro arquivo temporário, mesmo nome lógico) não é reprocessado."""
+    source = str(tmp_path / "temp_uploads" / "historia.txt")
+    first_copy = tmp_path / "upload-1.txt"
+    second_copy = tmp_path / "upload-2.txt"
+    for path in (first_copy, second_copy):
+        path.write_text(HISTORIA, encoding="utf-8")
+    content_hash = hashlib.sha256(HISTORIA.encode("utf-8")).hexdigest()
+
+    first = service.load_document_sync(str(first_copy), 80, 0, source=source, content_hash=content_hash)
+    calls = embeddings.calls
+    second = service.load_document_sync(str(second_copy), 80, 0, source=source, content_hash=content_hash)
+
+    assert first["status"] == "added"
+    assert second["status"] == "unchanged"
+    assert embeddings.calls == calls
+    assert service.registry.list_sources() == [source]
+
+
+def test_direct_loads_of_the_same_source_are_serialised(make_service, tmp_path, historia_text):
+    """Duas cargas simultâneas do mesmo source não intercalam a troca de chunks."""
+    service = make_service()
+    first = tmp_path / "primeira.txt"
+    second = tmp_path / "segunda.txt"
+    first.write_text(historia_text, encoding="utf-8")
+    second.write_text(historia_text.replace("1500", "1501"), encoding="utf-8")
+    source = str(tmp_path / "uploads" / "relatorio.txt")
+
+    active, overlaps = [], []
+    prepare = service.prepare_document
+
+    def slow_prepare(*args, **kwargs):
+        active.append(1)
+        overlaps.append(len(active))
+        time.sleep(0.2)
+        try:
+            return prepare(*args, **kwargs)
+        finally:
+            active.pop()
+
+    service.prepare_document = slow_prepare
+    threads = [
+        threading.Thread(target=service.load_document_sync, args=(str(path), 80, 0),
+                         kwargs={"source": source, "force": True})
+        for path in (first, second)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(overlaps) == 1
+    stored = service.vectorstore._collection.get(where={"source": source})
+    assert sorted(stored["ids"]) == sorted(service.registry.get_chunk_ids(source))
+    assert len(stored["ids"]) == 3
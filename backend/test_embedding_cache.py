@@ -0,0 +1,123 @@
+"""
+Testes do cache de embeddings (sem chamadas à OpenAI).
+"""
+
+import os
+import sys
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embedding_cache import CachedEmbeddings, EmbeddingStore, QueryEmbeddingCache
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    """Embedding determinístico que registra os textos enviados ao provedor."""
+
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded = self.embedded + list(texts)
+        return super().embed_documents(texts)
+
+
+def make_cache(tmp_path, **limits):
+    underlying = RecordingEmbeddings(size=8)
+    store = EmbeddingStore(str(tmp_path / "cache.db"), **limits)
+    return underlying, CachedEmbeddings(underlying, store, "fake-model")
+
+
+def test_only_new_texts_are_embedded(tmp_path):
+    """Textos já vistos (inclusive repetidos no lote) não voltam ao provedor."""
+    underlying, cache = make_cache(tmp_path)
+
+    first = cache.embed_documents(["a", "b", "a"])
+    assert underlying.embedded == ["a", "b"]
+    assert first[0] == first[2]
+
+    second = cache.embed_documents(["b", "c"])
+    assert underlying.embedded == ["a", "b", "c"]
+    assert second[0] == first[1]
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["entries"] == 3
+
+
+def test_cache_persists_across_instances(tmp_path):
+    """O cache em disco é reaproveitado por uma nova instância."""
+    _, cache = make_cache(tmp_path)
+    vectors = cache.embed_documents(["Pedro Álvares Cabral"])
+
+    underlying, reopened = make_cache(tmp_path)
+    assert reopened.embed_documents(["Pedro Álvares Cabral"]) == vectors
+    assert underlying.embedded == []
+
+
+def test_lru_eviction(tmp_path):
+    """Entradas menos usadas recentemente são despejadas ao exceder o limite."""
+    underlying, cache = make_cache(tmp_path, max_entries=2)
+    cache.embed_documents(["a"])
+    cache.embed_documents(["b"])
+    cache.embed_documents(["a"])  # "a" passa a ser o mais recente
+    cache.embed_documents(["c"])  # despeja "b"
+
+    assert cache.store.entries == 2
+    assert cache.store.evictions == 1
+
+    cache.embed_documents(["a", "b"])
+    assert underlying.embedded == ["a", "b", "c", "b"]
+
+
+class QueryCountingEmbeddings(DeterministicFakeEmbedding):
+    """Embedding determinístico que conta as consultas enviadas ao provedor."""
+
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def test_repeated_queries_skip_provider(tmp_path):
+    """Consultas repetidas (com variação de caixa/espaços) não chamam o provedor."""
+    underlying = QueryCountingEmbeddings(size=8)
+    cache = CachedEmbeddings(underlying, None, "fake-model", query_cache=QueryEmbeddingCache(max_entries=10))
+
+    first = cache.embed_query("Quem foi Pedro Álvares Cabral?")
+    second = cache.embed_query("  quem foi  PEDRO ÁLVARES CABRAL? ")
+
+    assert first == second
+    assert underlying.queries == 1
+    assert cache.get_stats()["queries"]["hits"] == 1
+
+
+def test_query_cache_ttl_expires(monkeypatch):
+    """Entradas expiram após o TTL."""
+    clock = [1000.0]
+    monkeypatch.setattr("embedding_cache.time.monotonic", lambda: clock[0])
+    query_cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+
+    query_cache.put("1822", [1.0, 2.0])
+    assert query_cache.get("1822") == [1.0, 2.0]
+
+    clock[0] += 61
+    assert query_cache.get("1822") is None
+    assert query_cache.get_stats()["expirations"] == 1
+
+
+def test_query_cache_shared_on_disk(tmp_path):
+    """Com persist_queries, outra instância reaproveita a consulta do disco."""
+    store = EmbeddingStore(str(tmp_path / "cache.db"))
+    first = CachedEmbeddings(QueryCountingEmbeddings(size=8), store, "fake-model",
+                             query_cache=QueryEmbeddingCache(), persist_queries=True)
+    vector = first.embed_query("Lei Áurea")
+
+    underlying = QueryCountingEmbeddings(size=8)
+    second = CachedEmbeddings(underlying, EmbeddingStore(str(tmp_path / "cache.db")), "fake-model",
+                              query_cache=QueryEmbeddingCache(), persist_queries=True)
+    assert second.embed_query("lei áurea") == vector
+    assert underlying.queries == 0
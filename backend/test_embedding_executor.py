@@ -0,0 +1,208 @@
+"""
+Testes do executor de embeddings com um provedor falso com latência e limite de taxa.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embedding_executor import EmbeddingExecutor, EmbeddingCoalescer
+
+
+class RateLimitError(Exception):
+    """Imita o erro 429 do cliente da OpenAI."""
+
+    status_code = 429
+
+
+class FakeProvider(DeterministicFakeEmbedding):
+    """Provedor com latência fixa por requisição e limite de requisições simultâneas."""
+
+    latency: float = 0.05
+    capacity: int = 100
+    in_flight: int = 0
+    peak: int = 0
+    batches: list = []
+    rejected: int = 0
+    lock: object = None
+
+    def model_post_init(self, __context):
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self.lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise RateLimitError("Rate limit reached")
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            self.batches = self.batches + [list(texts)]
+        try:
+            time.sleep(self.latency)
+            return super().embed_documents(texts)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+TEXTS = [f"Fato histórico número {number} do Brasil colonial." for number in range(40)]
+
+
+def make_executor(provider, **kwargs):
+    kwargs.setdefault("max_batch_tokens", 100)
+    kwargs.setdefault("base_delay", 0.01)
+    return EmbeddingExecutor(provider, token_counter=lambda text: 10, **kwargs)
+
+
+def test_batches_respect_token_budget_and_keep_order():
+    provider = FakeProvider(size=8)
+    executor = make_executor(provider, max_concurrency=4)
+
+    vectors = executor.embed_documents(TEXTS)
+
+    assert vectors == DeterministicFakeEmbedding(size=8).embed_documents(TEXTS)
+    assert [len(batch) for batch in provider.batches] == [10] * 4
+    assert executor.get_stats()["tokens"] == 400
+
+
+def test_concurrent_batches_beat_sequential_latency():
+    sequential = make_executor(FakeProvider(size=8, latency=0.1), max_concurrency=1)
+    concurrent = make_executor(FakeProvider(size=8, latency=0.1), max_concurrency=4)
+
+    started = time.perf_counter()
+    sequential.embed_documents(TEXTS)
+    sequential_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    concurrent.embed_documents(TEXTS)
+    concurrent_seconds = time.perf_counter() - started
+
+    assert sequential_seconds >= 0.4
+    assert concurrent_seconds < sequential_seconds / 2
+    assert concurrent.get_stats()["tokens_per_second"] > sequential.get_stats()["tokens_per_second"]
+
+
+def test_rate_limits_back_off_and_shrink_concurrency():
+    provider = FakeProvider(size=8, capacity=1)
+    executor = make_executor(provider, max_concurrency=4)
+
+    vectors = executor.embed_documents(TEXTS)
+
+    stats = executor.get_stats()
+    assert vectors == DeterministicFakeEmbedding(size=8).embed_documents(TEXTS)
+    assert provider.rejected == stats["rate_limited"] > 0
+    assert stats["retries"] >= stats["rate_limited"]
+    assert stats["concurrency_limit"] < 4
+    assert stats["batch_tokens"] < 100
+
+
+def test_non_retryable_errors_are_raised():
+    class BrokenProvider(DeterministicFakeEmbedding):
+        def embed_documents(self, texts):
+            raise ValueError("entrada inválida")
+
+    executor = make_executor(BrokenProvider(size=8))
+    with pytest.raises(ValueError):
+        executor.embed_documents(TEXTS)
+    assert executor.get_stats()["retries"] == 0
+
+
+def test_coalescer_merges_concurrent_small_requests():
+    provider = FakeProvider(size=8, latency=0.1)
+    coalescer = EmbeddingCoalescer(make_executor(provider, max_concurrency=1, max_batch_tokens=1000))
+    groups = [TEXTS[index:index + 2] for index in range(0, 16, 2)]
+    results = [None] * len(groups)
+
+    def embed(index):
+        results[index] = coalescer.embed_documents(groups[index])
+
+    threads = [threading.Thread(target=embed, args=(index,)) for index in range(len(groups))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+
+    expected = DeterministicFakeEmbedding(size=8)
+    assert results == [expected.embed_documents(group) for group in groups]
+    # O primeiro pedido sai sozinho; os demais chegam durante ele e vão juntos
+    assert len(provider.batches) == 2
+    assert coalescer.get_stats()["coalesced_requests"] == len(groups)
+
+
+def test_dispatcher_leaves_once_its_own_request_is_answered():
+    provider = FakeProvider(size=8, latency=0.05)
+    coalescer = EmbeddingCoalescer(make_executor(provider, max_concurrency=1), max_texts=2)
+    dispatched_by = []
+    embed = coalescer.executor.embed_documents
+
+    def recording_embed(texts):
+        dispatched_by.append(threading.current_thread().name)
+        return embed(texts)
+
+    coalescer.executor.embed_documents = recording_embed
+    groups = [TEXTS[index:index + 2] for index in range(0, 16, 2)]
+    results = {}
+
+    def submit(index):
+        results[index] = coalescer.embed_documents(groups[index])
+
+    threads = [threading.Thread(target=submit, args=(index,), name=f"t{index}") for index in range(len(groups))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    expected = DeterministicFakeEmbedding(size=8)
+    assert results == {index: expected.embed_documents(group) for index, group in enumerate(groups)}
+    # Cada thread envia só a chamada com o seu pedido, em ordem de chegada
+    assert dispatched_by == [f"t{index}" for index in range(len(groups))]
+
+
+def test_queries_skip_the_ingestion_concurrency_limit():
+    provider = FakeProvider(size=8, latency=0.2)
+    executor = make_executor(provider, max_concurrency=1)
+    ingestion = threading.Thread(target=executor.embed_documents, args=(TEXTS,))
+    ingestion.start()
+    time.sleep(0.05)
+
+    # O único slot está ocupado pela ingestão; a consulta não espera por ele
+    started = time.perf_counter()
+    vector = executor.embed_query("Quando chegou Cabral?")
+    assert time.perf_counter() - started < 0.1
+    assert vector == DeterministicFakeEmbedding(size=8).embed_query("Quando chegou Cabral?")
+    ingestion.join()
+
+
+def test_async_methods_use_the_async_provider_api():
+    class AsyncProvider(DeterministicFakeEmbedding):
+        threads: list = []
+
+        async def aembed_documents(self, texts):
+            self.threads = self.threads + [threading.current_thread()]
+            return self.embed_documents(texts)
+
+        async def aembed_query(self, text):
+            self.threads = self.threads + [threading.current_thread()]
+            return self.embed_query(text)
+
+    provider = AsyncProvider(size=8)
+    coalescer = EmbeddingCoalescer(make_executor(provider, max_concurrency=2))
+
+    async def run():
+        return await coalescer.aembed_documents(TEXTS), await coalescer.aembed_query("Cabral")
+
+    vectors, query = asyncio.run(run())
+    expected = DeterministicFakeEmbedding(size=8)
+    assert vectors == expected.embed_documents(TEXTS) and query == expected.embed_query("Cabral")
+    # Quatro lotes e a consulta, todos no event loop (sem o executor padrão)
+    assert provider.threads == [threading.main_thread()] * 5
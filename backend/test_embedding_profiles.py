@@ -0,0 +1,92 @@
+"""
+Testes dos perfis de embedding gravados na coleção e da migração entre perfis.
+"""
+
+import asyncio
+
+import pytest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embedding_profiles import EmbeddingProfileError, get_profile, make_embeddings, profile_key
+from migrate_embeddings import migrate
+
+
+@pytest.fixture
+def indexed(tmp_path, make_service, historia):
+    """historia.txt indexado com o perfil large-256; retorna o diretório do teste."""
+    service = make_service(size=256, embedding_profile="large-256")
+    asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    service.close()
+    return tmp_path
+
+
+def test_profile_is_wired_into_the_openai_client(monkeypatch):
+    monkeypatch.setattr("embedding_profiles.OPENAI_API_KEY", "sk-teste")
+    profile = get_profile("small-512")
+    embeddings = make_embeddings(profile)
+
+    assert (embeddings.model, embeddings.dimensions, embeddings.chunk_size) == ("text-embedding-3-small", 512, 1024)
+    assert profile_key(profile) == "text-embedding-3-small@512"
+    assert profile_key(get_profile("large")) == "text-embedding-3-large"
+    with pytest.raises(ValueError):
+        get_profile("inexistente")
+
+
+def test_mixing_profiles_is_refused(indexed, make_service):
+    collection = make_service(size=256, embedding_profile="large-256").vectorstore._collection
+    assert collection.metadata["embedding_dimensions"] == 256
+
+    with pytest.raises(EmbeddingProfileError):
+        make_service(size=1024, embedding_profile="large-1024")
+    with pytest.raises(EmbeddingProfileError):
+        make_service(size=1536, embedding_profile="small")
+
+
+def test_migration_reembeds_into_a_new_collection(indexed, make_service):
+    embeddings = DeterministicFakeEmbedding(size=1024)
+    first = migrate("large-1024", persist_directory=str(indexed / "db"), embeddings=embeddings)
+    again = migrate("large-1024", persist_directory=str(indexed / "db"), embeddings=embeddings)
+
+    assert first["target"] == "langchain-large-1024"
+    assert first["migrated"] == 3 and again["migrated"] == 0 and again["skipped"] == 3
+
+    service = make_service(size=1024, embedding_profile="large-1024", collection_name=first["target"])
+    result = asyncio.run(service.query_documents("Quando chegou Cabral?", k_documents=2))
+    assert service.count_chunks() == 3
+    assert len(result["sources"]) == 2
+
+
+def test_migration_carries_the_registry_and_lexical_index(indexed, make_service, historia):
+    target = migrate("large-1024", persist_directory=str(indexed / "db"),
+                     embeddings=DeterministicFakeEmbedding(size=1024))["target"]
+    service = make_service(size=1024, embedding_profile="large-1024", collection_name=target)
+
+    # Estatísticas (/documents/stats) e busca BM25 disponíveis logo após a migração
+    stats = service.get_document_stats()
+    assert stats["totals"]["documents"] == 1 and stats["totals"]["chunks"] == 3
+    assert stats["items"][0]["content_hash"] is not None
+    found = service.lexical_index.search("Lei Áurea")
+    assert len(found) == 1 and found[0][0] in service.registry.get_chunk_ids(str(historia))
+
+    # A impressão digital veio junto: o arquivo inalterado não é reprocessado
+    result = asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    assert result["status"] == "unchanged"
+    service.close()
+
+
+def test_collections_have_their_own_stores(indexed, make_service):
+    path = str(indexed / "historia.txt")
+    default = make_service(size=256, embedding_profile="large-256", answer_cache=True)
+    asyncio.run(default.query_documents("Quando chegou Cabral?", k_documents=2))
+    default.close()
+
+    # Mesmo arquivo em outra coleção do diretório: não é "unchanged" nem reutiliza respostas
+    other = make_service(size=256, embedding_profile="large-256", answer_cache=True, collection_name="outra")
+    loaded = asyncio.run(other.load_document(path, chunk_size=80, chunk_overlap=0))
+    result = asyncio.run(other.query_documents("Quando chegou Cabral?", k_documents=2))
+
+    assert loaded["status"] != "unchanged" and loaded["inserted"] == 3
+    assert other.count_chunks() == 3 and other.lexical_index.count() == 3
+    assert result["cached"] is False and len(result["sources"]) == 2
+    other.close()
@@ -0,0 +1,87 @@
+"""
+Testes do armazenamento vetorial exato (float32 em memmap, busca por força bruta).
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from compact_store import normalize
+from document_service import resolve_backend
+from exact_store import ExactCollection, VECTORS_FILENAME
+
+
+def make_vectors(count=1000, dims=64, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dims)).astype(np.float32)
+
+
+def test_search_is_exact(tmp_path):
+    vectors = make_vectors()
+    queries = make_vectors(20, seed=1)
+    collection = ExactCollection(str(tmp_path))
+    for start in range(0, len(vectors), 300):
+        collection.upsert([f"id{i}" for i in range(start, min(start + 300, len(vectors)))], vectors[start:start + 300])
+
+    expected = np.argsort(-(normalize(queries) @ normalize(vectors).T), axis=1)[:, :10]
+    for query, truth in zip(queries, expected):
+        slots, similarities = collection.search(query, 10)
+        assert slots.tolist() == truth.tolist()
+        assert np.all(np.diff(similarities) <= 0)
+
+    stats = ExactCollection(str(tmp_path)).get_stats()
+    assert stats["vectors"] == 1000 and stats["mapped_bytes"] == vectors.nbytes
+    assert stats["ram_bytes"] < vectors.nbytes / 100
+
+
+def test_interrupted_append_and_vacuum(tmp_path):
+    vectors = make_vectors(100)
+    collection = ExactCollection(str(tmp_path))
+    collection.upsert([f"id{i}" for i in range(100)], vectors, [f"texto {i}" for i in range(100)],
+                      [{"source": f"arquivo{i % 2}.txt"} for i in range(100)])
+
+    # Meia linha gravada sem atualizar o cabeçalho: descartada na reabertura
+    with open(tmp_path / VECTORS_FILENAME, "ab") as file:
+        file.write(b"\0" * 100)
+    collection = ExactCollection(str(tmp_path))
+    assert collection.count() == 100
+    assert np.load(tmp_path / VECTORS_FILENAME, mmap_mode="r").shape == (100, 64)
+
+    collection.delete(where={"source": "arquivo0.txt"})
+    reloaded = ExactCollection(str(tmp_path))
+    result = reloaded.query([vectors[7]], n_results=1, include=["documents", "distances", "embeddings"])
+    assert reloaded.get_stats()["slots"] == 50
+    assert result["ids"] == [["id7"]] and result["documents"] == [["texto 7"]]
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+    assert np.allclose(result["embeddings"][0][0], normalize(vectors[7:8])[0])
+
+
+def test_backend_is_selected_per_collection(tmp_path, monkeypatch, make_service, historia):
+    monkeypatch.setattr("document_service.VECTOR_COLLECTION_BACKENDS", {"manuais": "exact"})
+    service = make_service(collection_name="manuais")
+    asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    result = asyncio.run(service.query_documents("Quando chegou Cabral?", k_documents=1))
+
+    assert asyncio.run(service.get_status())["vector_store"]["backend"] == "exact"
+    assert service.count_chunks() == 3 and len(result["sources"]) == 1
+    service.close()
+
+    # Sem configuração, a coleção é reaberta com o backend em que foi criada
+    monkeypatch.setattr("document_service.VECTOR_COLLECTION_BACKENDS", {})
+    assert resolve_backend(str(tmp_path / "db"), "manuais") == "exact"
+    assert resolve_backend(str(tmp_path / "db"), "outra") == "chroma"
+    with pytest.raises(ValueError):
+        resolve_backend(str(tmp_path / "db"), "outra", "faiss")
+
+
+def test_same_file_in_chroma_and_exact_collections(monkeypatch, make_service, historia):
+    monkeypatch.setattr("document_service.VECTOR_COLLECTION_BACKENDS", {"manuais": "exact"})
+    results = {}
+    for collection_name in ("langchain", "manuais"):
+        service = make_service(collection_name=collection_name)
+        loaded = asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+        result = asyncio.run(service.query_documents("Quando chegou Cabral?", k_documents=1))
+        results[service.vector_store_backend] = (loaded["inserted"], service.count_chunks(), len(result["sources"]))
+        service.close()
+
+    assert results == {"chroma": (3, 3, 1), "exact": (3, 3, 1)}
@@ -0,0 +1,79 @@
+"""
+Testes dos perfis HNSW das coleções do Chroma e do ef_search por consulta.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+import chromadb
+
+from config import HNSW_PROFILES
+from hnsw_profiles import get_hnsw_profile, hnsw_settings, query_collection
+
+
+def test_profile_is_applied_on_creation(make_service):
+    service = make_service(hnsw_profile="recall")
+    expected = {key: HNSW_PROFILES["recall"][key] for key in ("max_neighbors", "ef_construction", "ef_search")}
+    assert hnsw_settings(service.vectorstore._collection) == expected
+    assert asyncio.run(service.get_status())["vector_store"]["hnsw"] == expected
+    service.close()
+
+    # Coleções existentes mantêm o grafo com que foram criadas
+    service = make_service(hnsw_profile="latency")
+    assert hnsw_settings(service.vectorstore._collection) == expected
+    service.close()
+
+    with pytest.raises(ValueError):
+        get_hnsw_profile("rapido")
+
+
+def test_query_with_ef_search_keeps_order_and_fields(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(300, 16)).astype(np.float32)
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection("vetores")
+    collection.add(ids=[f"id{i}" for i in range(300)], embeddings=vectors,
+                   documents=[f"texto {i}" for i in range(300)], metadatas=[{"n": i} for i in range(300)])
+
+    include = ["documents", "metadatas", "distances"]
+    plain = collection.query(query_embeddings=vectors[:3], n_results=5, include=include)
+    tuned = query_collection(collection, vectors[:3], n_results=5, include=include, ef_search=200)
+
+    assert tuned["ids"] == plain["ids"] and tuned["documents"] == plain["documents"]
+    assert tuned["metadatas"] == plain["metadatas"]
+    assert np.allclose(tuned["distances"], plain["distances"])
+    assert [ids[0] for ids in tuned["ids"]] == ["id0", "id1", "id2"]
+
+
+def test_ef_search_below_the_collection_value_is_ignored(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(300, 16)).astype(np.float32)
+    collection = chromadb.PersistentClient(path=str(tmp_path)).create_collection(
+        "vetores", configuration={"hnsw": {"ef_search": 100}}
+    )
+    collection.add(ids=[f"id{i}" for i in range(300)], embeddings=vectors)
+
+    class Spy:
+        configuration = collection.configuration
+        requested = []
+
+        def query(self, **kwargs):
+            self.requested.append(kwargs["n_results"])
+            return collection.query(**kwargs)
+
+        def get(self, **kwargs):
+            return collection.get(**kwargs)
+
+    spy = Spy()
+    for ef_search in (20, 100, 200):
+        query_collection(spy, vectors[:1], n_results=5, include=["distances"], ef_search=ef_search)
+    # Só o valor acima do ef_search da coleção (100) muda a busca
+    assert spy.requested == [5, 5, 200]
+
+
+def test_query_documents_accepts_ef_search(make_service, historia):
+    service = make_service()
+    asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+
+    result = asyncio.run(service.query_documents("Quando chegou Cabral?", k_documents=1, ef_search=200))
+    documents = service.get_retriever(k_documents=2, ef_search=200).invoke("Quando chegou Cabral?")
+    assert len(result["sources"]) == 1 and len(documents) == 2
+    service.close()
@@ -0,0 +1,98 @@
+"""
+Testes do índice lexical BM25 e do retriever híbrido (BM25 + MMR com RRF).
+"""
+
+import os
+import sqlite3
+import asyncio
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from bm25_index import BM25Index, BM25_INDEX_FILENAME, is_lexical_query, tokenize
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Embedding falso que conta as consultas embedadas."""
+
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def test_tokenizer_and_lexical_queries():
+    assert tokenize("Quando Pedro Álvares Cabral chegou em 1500?") == ["pedro", "alvares", "cabral", "chegou", "1500"]
+    assert is_lexical_query("Pedro Álvares Cabral") and is_lexical_query("1822")
+    assert is_lexical_query("Lei Áurea") and is_lexical_query('"abolição da escravatura"')
+    assert not is_lexical_query("Quando chegou Cabral?")
+    assert not is_lexical_query("Quem proclamou a independência do Brasil em 1822?")
+
+
+def test_bm25_ranks_exact_matches_and_persists(tmp_path, historia_text):
+    index = BM25Index(str(tmp_path / "bm25.db"))
+    lines = historia_text.splitlines()
+    index.add(["c0", "c1", "c2"], lines, ["historia.txt"] * 3)
+
+    assert [chunk_id for chunk_id, _ in index.search("Lei Áurea")] == ["c2"]
+    assert index.search("Brasil 1822")[0][0] == "c1"
+    assert index.search("de que") == []
+
+    assert index.delete(["c1", "inexistente"]) == 1
+    reopened = BM25Index(str(tmp_path / "bm25.db"))
+    assert reopened.count() == 2
+    assert [chunk_id for chunk_id, _ in reopened.search("Brasil")] == ["c0"]
+    assert reopened.get_stats()["chunks"] == 2
+
+
+def test_distinct_term_counter_follows_updates(tmp_path, historia_text):
+    index = BM25Index(str(tmp_path / "bm25.db"))
+    lines = historia_text.splitlines()
+
+    def distinct_terms():
+        with sqlite3.connect(index.db_path) as conn:
+            return conn.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+
+    index.add(["c0", "c1", "c2"], lines)
+    assert index.get_stats()["terms"] == distinct_terms() > 0
+    index.add(["c1"], ["Dom Pedro II governou o Brasil"])
+    assert index.get_stats()["terms"] == distinct_terms()
+    index.delete(["c0", "c2"])
+    assert index.get_stats()["terms"] == distinct_terms()
+    index.delete(["c1"])
+    assert index.get_stats()["terms"] == 0
+
+
+def test_lexical_queries_skip_the_embedding(make_service, historia):
+    embeddings = CountingEmbedding(size=32)
+    service = make_service(embeddings=embeddings)
+    asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    retriever = service.get_hybrid_retriever(k_documents=2)
+
+    documents = retriever.invoke("1822")
+    assert embeddings.queries == 0
+    assert "1822" in documents[0].page_content and len(documents) == 1
+
+    documents = asyncio.run(retriever.ainvoke("Quando chegou Cabral?"))
+    assert embeddings.queries == 1
+    assert "Cabral" in documents[0].page_content and len(documents) == 2
+    service.close()
+
+
+def test_index_follows_updates_and_is_rebuilt(tmp_path, make_service, historia, historia_text):
+    service = make_service()
+    asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+
+    historia.write_text(historia_text.replace("1888", "1889"), encoding="utf-8")
+    asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    assert service.lexical_index.search("1888") == []
+    assert service.lexical_index.count() == 3
+    service.close()
+
+    # Bancos anteriores ao índice lexical: reconstruído a partir da coleção
+    os.remove(tmp_path / "db" / BM25_INDEX_FILENAME)
+    service = make_service()
+    assert service.lexical_index.count() == 3
+    assert len(service.lexical_index.search("1889")) == 1
+    assert asyncio.run(service.get_status())["lexical_index"]["chunks"] == 3
+    service.close()
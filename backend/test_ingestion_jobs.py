@@ -0,0 +1,126 @@
+"""
+Testes da fila de ingestão em segundo plano (sem chamadas à OpenAI).
+"""
+
+import os
+import sys
+import asyncio
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from document_service import DocumentService
+from ingestion_jobs import IngestionJobStore, IngestionQueue, JOB_COMPLETED, JOB_FAILED, JOB_QUEUED
+
+
+HISTORIA = "\n".join(
+    f"No ano {1500 + year} aconteceu um fato importante na história do Brasil." for year in range(40)
+)
+
+
+def make_service(tmp_path):
+    return DocumentService(
+        llm=FakeListChatModel(responses=["ok"]),
+        embeddings=DeterministicFakeEmbedding(size=16),
+        persist_directory=str(tmp_path / "chromadb"),
+        answer_cache=False
+    )
+
+
+async def run_jobs(queue, *paths, **kwargs):
+    await queue.start()
+    try:
+        jobs = [await queue.enqueue(path, chunk_size=80, chunk_overlap=0, **kwargs) for path in paths]
+        await asyncio.wait_for(queue.join(), timeout=60)
+    finally:
+        await queue.stop()
+    return [queue.store.get(job["id"]) for job in jobs]
+
+
+def test_job_reports_stage_progress(tmp_path, monkeypatch):
+    """Um job concluído registra as etapas, o progresso em lotes e a vazão."""
+    monkeypatch.setattr("document_service.INGESTION_BATCH_SIZE", 10)
+    path = tmp_path / "historia.txt"
+    path.write_text(HISTORIA, encoding="utf-8")
+    service = make_service(tmp_path)
+    queue = IngestionQueue(service, IngestionJobStore(str(tmp_path / "jobs.db")), process_workers=1)
+
+    job, = asyncio.run(run_jobs(queue, str(path)))
+
+    assert job["status"] == JOB_COMPLETED
+    assert job["result"]["inserted"] == job["chunks_total"] == job["chunks_done"] == 40
+    assert job["chunks_per_second"] > 0
+    assert [job["stages"][stage]["status"] for stage in ("fingerprint", "parsing", "indexing")] == ["completed"] * 3
+    assert job["stages"]["parsing"]["chunks"] == 40
+    assert service.count_chunks() == 40
+
+
+def test_failed_job_records_error(tmp_path):
+    """Erros de ingestão ficam registrados no job sem derrubar o worker."""
+    good = tmp_path / "historia.txt"
+    good.write_text(HISTORIA, encoding="utf-8")
+    service = make_service(tmp_path)
+    queue = IngestionQueue(service, IngestionJobStore(str(tmp_path / "jobs.db")), process_workers=0)
+
+    missing, ok = asyncio.run(run_jobs(queue, str(tmp_path / "sumiu.txt"), str(good)))
+
+    assert missing["status"] == JOB_FAILED
+    assert "sumiu.txt" in missing["error"]
+    assert ok["status"] == JOB_COMPLETED
+
+
+def test_pending_jobs_resume_after_restart(tmp_path):
+    """Jobs enfileirados antes de um reinício são processados no próximo start."""
+    path = tmp_path / "historia.txt"
+    path.write_text(HISTORIA, encoding="utf-8")
+    store = IngestionJobStore(str(tmp_path / "jobs.db"))
+    queued = store.create(str(path), 80, 0)
+    interrupted = store.create(str(path), 80, 0)
+    store.update(interrupted["id"], status="running")
+
+    service = make_service(tmp_path)
+    queue = IngestionQueue(service, IngestionJobStore(str(tmp_path / "jobs.db")), process_workers=0)
+
+    async def restart():
+        resumed = await queue.start()
+        await asyncio.wait_for(queue.join(), timeout=60)
+        await queue.stop()
+        return resumed
+
+    assert asyncio.run(restart()) == 2
+    first, second = store.get(queued["id"]), store.get(interrupted["id"])
+    assert first["status"] == second["status"] == JOB_COMPLETED
+    assert first["result"]["inserted"] == 40
+    assert second["result"]["status"] == "unchanged"
+    assert store.list_jobs(status=JOB_QUEUED)["total"] == 0
+
+
+def test_job_waits_for_a_direct_load_of_the_same_source(tmp_path):
+    """Jobs e cargas diretas do mesmo documento compartilham o lock por source."""
+    path = tmp_path / "historia.txt"
+    path.write_text(HISTORIA, encoding="utf-8")
+    service = make_service(tmp_path)
+    queue = IngestionQueue(service, IngestionJobStore(str(tmp_path / "jobs.db")), process_workers=0)
+    lock = service.source_lock(str(path))
+
+    async def scenario():
+        await queue.start()
+        try:
+            lock.acquire()  # Uma carga direta em andamento
+            job = await queue.enqueue(str(path), chunk_size=80, chunk_overlap=0)
+            await asyncio.sleep(0.3)
+            waiting = queue.store.get(job["id"])["status"]
+            lock.release()
+            await asyncio.wait_for(queue.join(), timeout=60)
+        finally:
+            await queue.stop()
+        return waiting, queue.store.get(job["id"])
+
+    waiting, job = asyncio.run(scenario())
+
+    assert waiting == JOB_QUEUED
+    assert job["status"] == JOB_COMPLETED
+    assert not lock.locked()
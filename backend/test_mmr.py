@@ -0,0 +1,91 @@
+"""
+Testes da seleção MMR vetorizada e do RedundantFilterRetriever.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores.utils import maximal_marginal_relevance as langchain_mmr
+
+from document_service import make_vectorstore
+from filter_retriever import RedundantFilterRetriever
+from mmr import maximal_marginal_relevance
+
+
+@pytest.mark.parametrize("fetch_k,k,lambda_mult", [(20, 4, 0.8), (100, 50, 0.5), (300, 20, 0.0), (5, 10, 1.0)])
+def test_matches_langchain_selection(fetch_k, k, lambda_mult):
+    rng = np.random.default_rng(fetch_k)
+    centers = rng.normal(size=(max(1, fetch_k // 10), 64))
+    candidates = (centers[rng.integers(0, len(centers), fetch_k)] + 0.3 * rng.normal(size=(fetch_k, 64)))
+    candidates = candidates.astype(np.float32)
+    query = candidates[0] + rng.normal(size=64).astype(np.float32)
+
+    expected = langchain_mmr(query, list(candidates), lambda_mult=lambda_mult, k=k)
+    assert maximal_marginal_relevance(query, list(candidates), lambda_mult, k) == expected
+
+
+def test_edge_cases():
+    assert maximal_marginal_relevance([1.0, 0.0], [], k=4) == []
+    assert maximal_marginal_relevance([1.0, 0.0], [[0.0, 0.0], [1.0, 0.0]], k=0) == []
+    # Vetor nulo tem similaridade 0; duplicatas são evitadas quando lambda_mult < 1
+    assert maximal_marginal_relevance([1.0, 0.0], [[0.0, 0.0], [1.0, 0.0], [1.0, 0.0], [0.0, 1.0]],
+                                      lambda_mult=0.3, k=3) == [1, 0, 3]
+
+
+@pytest.mark.parametrize("backend", ["chroma", "compact"])
+def test_retriever_skips_duplicates(tmp_path, backend):
+    embeddings = DeterministicFakeEmbedding(size=32)
+    store = make_vectorstore(str(tmp_path), embeddings, backend=backend)
+    texts = ["Cabral chegou ao Brasil em 1500."] * 3 + ["A Lei Áurea foi assinada em 1888.",
+                                                          "Dom Pedro I proclamou a independência."]
+    store.add_texts(texts, [{"linha": i} for i in range(len(texts))], ids=[f"id{i}" for i in range(len(texts))])
+
+    retriever = RedundantFilterRetriever(embedding=embeddings, chroma=store, lambda_mult=0.3,
+                                         k_documents=3, fetch_k=5)
+    documents = retriever.invoke("Cabral chegou ao Brasil em 1500.")
+
+    assert len(documents) == 3
+    assert [doc.page_content for doc in documents].count(texts[0]) == 1
+    assert documents[0].page_content == texts[0] and documents[0].id in {"id0", "id1", "id2"}
+
+
+class SlowEmbedding(DeterministicFakeEmbedding):
+    """Embedding cuja versão assíncrona demora (simula a latência da API)."""
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(1.0)
+        return self.embed_query(text)
+
+
+def test_async_retrieval_uses_the_service_pool(make_service, historia):
+    service = make_service()
+    asyncio.run(service.load_document(str(historia), chunk_size=80, chunk_overlap=0))
+    retriever = service.get_retriever(k_documents=2)
+
+    documents = asyncio.run(retriever.ainvoke("Quando chegou Cabral?"))
+    assert retriever.executor is service.executor
+    assert [doc.id for doc in documents] == [doc.id for doc in retriever.invoke("Quando chegou Cabral?")]
+    assert len(documents) == 2
+    service.close()
+
+
+def test_async_retrieval_timeout_and_cancellation(tmp_path):
+    embeddings = SlowEmbedding(size=16)
+    store = make_vectorstore(str(tmp_path), embeddings, backend="compact")
+    store.add_texts(["Cabral chegou ao Brasil em 1500."], ids=["id0"])
+    retriever = RedundantFilterRetriever(embedding=embeddings, chroma=store, timeout=5.0)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(retriever.ainvoke("Cabral", timeout=0.05))
+
+    async def cancel_midway():
+        task = asyncio.create_task(retriever.ainvoke("Cabral"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancel_midway())
@@ -0,0 +1,58 @@
+"""
+Testes da leitura paralela de PDFs.
+"""
+
+import gc
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pypdf
+import pytest
+from langchain_community.document_loaders import PyPDFLoader
+
+from pdf_loader import ParallelPDFLoader, normalize_metadata, page_ranges
+
+
+HISTORIA_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "História_do_Brasil.pdf")
+
+
+def test_page_ranges_cover_all_pages():
+    assert page_ranges(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert page_ranges(0, 4) == []
+
+
+def test_metadata_is_normalized_like_pypdf_loader():
+    metadata = normalize_metadata({
+        "/Producer": " LibreOffice ", "/CreationDate": "D:20240131120000+03'00'",
+        "/ModDate": "ontem", "/Trapped": True, "total_pages": 3
+    })
+    assert metadata == {
+        "producer": "LibreOffice", "creationdate": "2024-01-31T12:00:00+03:00",
+        "moddate": "ontem", "trapped": "True", "total_pages": 3
+    }
+
+
+@pytest.mark.skipif(not os.path.exists(HISTORIA_PDF), reason="PDF de exemplo não encontrado")
+def test_parallel_loader_matches_pypdf_loader():
+    """O resultado é idêntico ao PyPDFLoader: mesmo texto, metadados e ordem das páginas."""
+    expected = PyPDFLoader(HISTORIA_PDF).load()
+
+    with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        documents = ParallelPDFLoader(HISTORIA_PDF, executor=pool, pages_per_task=5).load()
+
+    assert [doc.metadata["page"] for doc in documents] == list(range(len(expected)))
+    assert [doc.page_content for doc in documents] == [doc.page_content for doc in expected]
+    assert [doc.metadata for doc in documents] == [doc.metadata for doc in expected]
+
+
+@pytest.mark.skipif(not os.path.exists(HISTORIA_PDF), reason="PDF de exemplo não encontrado")
+def test_reader_is_released_after_loading():
+    """Nenhum PdfReader (com a cópia do arquivo em memória) sobrevive à leitura."""
+    documents = ParallelPDFLoader(HISTORIA_PDF, min_pages=10 ** 9).load()
+    gc.collect()
+    assert documents and not [obj for obj in gc.get_objects() if isinstance(obj, pypdf.PdfReader)]
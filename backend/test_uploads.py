@@ -0,0 +1,76 @@
+"""
+Testes do recebimento de uploads em disco, em blocos.
+"""
+
+import os
+import io
+import sys
+import asyncio
+import hashlib
+
+# Adicionar o diretório backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from fastapi import UploadFile
+
+from uploads import spool_upload, UploadTooLargeError, UnsupportedUploadError
+
+
+class RecordingFile(io.BytesIO):
+    """Arquivo em memória que registra o tamanho de cada leitura."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def make_upload(data: bytes, filename: str = "historia.txt") -> UploadFile:
+    return UploadFile(file=RecordingFile(data), filename=filename)
+
+
+def test_upload_is_spooled_in_blocks_with_hash(tmp_path):
+    data = "Pedro Álvares Cabral chegou ao Brasil em 1500.\n".encode("utf-8") * 1000
+    upload = make_upload(data)
+
+    first = asyncio.run(spool_upload(upload, directory=str(tmp_path), chunk_size=4096))
+    second = asyncio.run(spool_upload(make_upload(data), directory=str(tmp_path), chunk_size=4096))
+
+    assert first["size"] == len(data)
+    assert first["sha256"] == hashlib.sha256(data).hexdigest()
+    assert open(first["path"], "rb").read() == data
+    assert max(upload.file.reads) == 4096
+    # Mesmo arquivo: temporários distintos, mesmo nome lógico no índice
+    assert first["path"] != second["path"]
+    assert first["source"] == second["source"] == os.path.join(str(tmp_path), first["sha256"][:16], "historia.txt")
+
+
+def test_different_uploads_with_the_same_name_get_distinct_sources(tmp_path):
+    first = asyncio.run(spool_upload(make_upload(b"primeira versao"), directory=str(tmp_path)))
+    second = asyncio.run(spool_upload(make_upload(b"segunda versao"), directory=str(tmp_path)))
+
+    assert first["filename"] == second["filename"] == "historia.txt"
+    assert first["source"] != second["source"]
+    assert os.path.basename(first["source"]) == os.path.basename(second["source"]) == "historia.txt"
+
+
+def test_upload_over_limit_is_rejected_and_removed(tmp_path):
+    upload = make_upload(b"x" * 10_000)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(upload, directory=str(tmp_path), max_bytes=5_000, chunk_size=1024))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_filename_is_sanitized(tmp_path):
+    spooled = asyncio.run(spool_upload(make_upload(b"texto", "../../etc/historia.md"), directory=str(tmp_path)))
+    assert spooled["filename"] == "historia.md"
+    assert os.path.dirname(spooled["path"]) == str(tmp_path)
+
+    with pytest.raises(UnsupportedUploadError):
+        asyncio.run(spool_upload(make_upload(b"texto", "planilha.csv"), directory=str(tmp_path)))
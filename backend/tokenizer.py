@@ -0,0 +1,64 @@
+"""
+Contagem de tokens para estatísticas e dimensionamento de chunks.
+"""
+
+import re
+import threading
+from typing import List
+
+
+# Codificação usada pelos modelos de embedding e chat da OpenAI
+TOKEN_ENCODING = "cl100k_base"
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+# Aproximação usada quando o tiktoken não está disponível (sem rede, por exemplo)
+_APPROX_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]", re.UNICODE)
+
+
+def get_encoding():
+    """
+    Retorna a codificação do tiktoken, ou None se não estiver disponível.
+
+    A falha é memorizada para não repetir o download a cada chamada.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception:
+                _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Conta os tokens de um texto.
+
+    Args:
+        text: Texto a ser contado
+
+    Returns:
+        Número de tokens (exato com tiktoken, aproximado caso contrário)
+    """
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """Conta os tokens de uma lista de textos."""
+    encoding = get_encoding()
+    if encoding is not None:
+        return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
+    findall = _APPROX_TOKEN_RE.findall
+    return [len(findall(text)) for text in texts]
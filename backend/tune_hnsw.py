@@ -0,0 +1,182 @@
+"""
+Ajuste offline dos parâmetros HNSW do Chroma no nosso corpus.
+
+Uso:
+    python tune_hnsw.py [--persist-directory ./chromadb] [--collection langchain]
+    python tune_hnsw.py --text historia.txt [--scale N] [--dims D]
+
+    Opções da varredura: [--m 16,32] [--ef-construction 100,200,400]
+                         [--ef-search 20,50,100,200,300] [--queries 200] [--k 20]
+                         [--target-recall 0.95] [--apply]
+
+Os vetores vêm dos embeddings já gravados na coleção (sem chamar o modelo) ou
+de um texto com embeddings locais, como em bench_vector_store.py. As
+consultas são vetores do corpus com ruído e a referência é a busca exata em
+float32. Para cada combinação de max_neighbors (M) e ef_construction é criada
+uma coleção temporária; para cada ef_search são medidos p50/p99 e recall@k com
+ef_search por consulta (query_collection), o mesmo caminho da API; essa
+latência inclui a busca extra dos ef_search vizinhos, que não existe quando o
+valor está gravado na coleção.
+
+Ao final são indicados a combinação mais rápida com recall >= --target-recall
+e o resultado dos perfis de HNSW_PROFILES. Com --apply, o ef_search indicado é
+gravado na coleção (vale a partir do próximo carregamento do índice); M e
+ef_construction só valem para coleções novas (HNSW_PROFILE).
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chromadb
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from config import PERSIST_DIRECTORY, VECTOR_COLLECTION, FETCH_K, HNSW_PROFILES
+from compact_store import normalize
+from document_service import make_vectorstore, resolve_backend
+from hnsw_profiles import query_collection, set_ef_search
+from bench_vector_store import HashedProjectionEmbeddings, recall_at_k
+
+
+def parse_list(value: str):
+    return sorted({int(item) for item in value.split(",") if item.strip()})
+
+
+def load_collection_vectors(persist_directory: str, collection_name: str, page_size: int = 1000):
+    """Lê os embeddings gravados na coleção; retorna (vetores normalizados, coleção)."""
+    backend = resolve_backend(persist_directory, collection_name)
+    if backend == "chroma":
+        try:
+            collection = chromadb.PersistentClient(path=persist_directory).get_collection(collection_name)
+        except Exception:
+            raise Exception(f"Coleção '{collection_name}' não encontrada em {persist_directory} (use --text)")
+    else:
+        collection = make_vectorstore(persist_directory, None, collection_name, backend)._collection
+
+    pages, offset = [], 0
+    while True:
+        page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+        if not len(page["ids"]):
+            break
+        pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+    if not pages:
+        raise Exception(f"Coleção '{collection_name}' está vazia")
+    return normalize(np.concatenate(pages)), collection
+
+
+def load_text_vectors(path: str, scale: int, dims: int, rng):
+    """Chunks do texto com embeddings locais, replicados com ruído (--scale cópias)."""
+    with open(path, encoding="utf-8") as file:
+        chunks = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=200).split_text(file.read())
+    base = HashedProjectionEmbeddings(dims).embed_documents(chunks)
+    copies = [base] + [
+        normalize(base + 0.5 * normalize(rng.standard_normal(base.shape).astype(np.float32)))
+        for _ in range(scale - 1)
+    ]
+    return np.concatenate(copies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajuste dos parâmetros HNSW (latência vs recall@k)")
+    parser.add_argument("--persist-directory", default=PERSIST_DIRECTORY)
+    parser.add_argument("--collection", default=VECTOR_COLLECTION)
+    parser.add_argument("--text", help="Usar os chunks deste texto com embeddings locais em vez da coleção")
+    parser.add_argument("--scale", type=int, default=5, help="Cópias (com ruído) dos chunks do texto")
+    parser.add_argument("--dims", type=int, default=3072, help="Dimensões dos embeddings locais")
+    parser.add_argument("--m", type=parse_list, default="16,32", help="Valores de max_neighbors")
+    parser.add_argument("--ef-construction", type=parse_list, default="100,200,400")
+    parser.add_argument("--ef-search", type=parse_list, default="20,50,100,200,300")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5, help="Ruído das consultas (fração da norma)")
+    parser.add_argument("--k", type=int, default=FETCH_K, help="Vizinhos por consulta (padrão: FETCH_K)")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--apply", action="store_true", help="Gravar o ef_search indicado na coleção")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if args.text:
+        vectors, source = load_text_vectors(args.text, args.scale, args.dims, rng), None
+        origin = f"{os.path.basename(args.text)} (projeção local)"
+    else:
+        vectors, source = load_collection_vectors(args.persist_directory, args.collection)
+        origin = f"coleção '{args.collection}'"
+
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = normalize(vectors[picks] + args.noise * normalize(
+        rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32)))
+    k = min(args.k, len(vectors))
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+    ef_values = sorted({max(ef, k) for ef in args.ef_search})
+
+    print(f"📄 {len(vectors):,} vetores de {vectors.shape[1]} dimensões ({origin}); "
+          f"{len(queries)} consultas, k={k}\n")
+    print(f"{'M':>4}{'ef_constr':>11}{'ef_search':>11}{'Carga s':>9}{'p50 ms':>9}{'p99 ms':>9}{f'recall@{k}':>11}")
+
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="tune_hnsw_")
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        for m in args.m:
+            for ef_construction in args.ef_construction:
+                name = f"tune-m{m}-efc{ef_construction}"
+                collection = client.create_collection(name, configuration={"hnsw": {
+                    "max_neighbors": m, "ef_construction": ef_construction, "ef_search": k
+                }})
+                started = time.perf_counter()
+                for start in range(0, len(vectors), 1000):
+                    collection.add(ids=ids[start:start + 1000], embeddings=vectors[start:start + 1000])
+                load_seconds = time.perf_counter() - started
+
+                for ef_search in ef_values:
+                    latencies, results = [], []
+                    for query in queries:
+                        started = time.perf_counter()
+                        found = query_collection(collection, [query], n_results=k, include=[], ef_search=ef_search)
+                        latencies.append(time.perf_counter() - started)
+                        results.append([int(chunk_id.split("-")[1]) for chunk_id in found["ids"][0]])
+                    row = (m, ef_construction, ef_search, load_seconds, np.percentile(latencies, 50) * 1000,
+                           np.percentile(latencies, 99) * 1000, recall_at_k(results, truth))
+                    rows.append(row)
+                    print(f"{row[0]:>4}{row[1]:>11}{row[2]:>11}{row[3]:>9.2f}{row[4]:>9.2f}{row[5]:>9.2f}{row[6]:>11.3f}")
+                client.delete_collection(name)
+        del client
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n📋 Perfis (HNSW_PROFILES):")
+    for name, profile in HNSW_PROFILES.items():
+        match = [row for row in rows if row[:3] == (profile["max_neighbors"], profile["ef_construction"],
+                                                    max(profile["ef_search"], k))]
+        if match:
+            print(f"   {name:<10} p50 {match[0][4]:.2f} ms, p99 {match[0][5]:.2f} ms, recall@{k} {match[0][6]:.3f}")
+        else:
+            print(f"   {name:<10} fora da varredura")
+
+    eligible = [row for row in rows if row[6] >= args.target_recall]
+    if not eligible:
+        print(f"\n⚠️ Nenhuma combinação atingiu recall@{k} >= {args.target_recall}; aumente --ef-search")
+        return
+    best = min(eligible, key=lambda row: row[4])
+    print(f"\n✅ Mais rápida com recall@{k} >= {args.target_recall}: M={best[0]}, ef_construction={best[1]}, "
+          f"ef_search={best[2]} (p50 {best[4]:.2f} ms, recall {best[6]:.3f})")
+
+    if args.apply:
+        if source is None or resolve_backend(args.persist_directory, args.collection) != "chroma":
+            print("⚠️ --apply só vale para coleções do Chroma (sem --text)")
+            return
+        set_ef_search(source, best[2])
+        print(f"💾 ef_search={best[2]} gravado em '{args.collection}' (vale a partir do próximo carregamento)")
+
+
+if __name__ == "__main__":
+    main()
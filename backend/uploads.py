@@ -0,0 +1,118 @@
+"""
+Recebimento de uploads em disco, em blocos.
+
+O arquivo enviado é copiado em blocos de tamanho fixo para um arquivo
+temporário com nome único (uploads simultâneos com o mesmo nome não se
+sobrescrevem), calculando o SHA-256 no caminho e respeitando o tamanho
+máximo configurado. A memória usada não depende do tamanho do arquivo.
+
+O nome lógico no índice inclui um prefixo do hash: dois uploads diferentes
+chamados "relatorio.pdf" viram documentos distintos, enquanto reenviar o
+mesmo arquivo cai no mesmo documento (e é detectado como inalterado).
+"""
+
+import os
+import uuid
+import hashlib
+from typing import Dict, Any, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    UPLOAD_TEMP_DIR,
+    UPLOAD_CHUNK_SIZE,
+    MAX_UPLOAD_BYTES,
+    UPLOAD_SOURCE_HASH_CHARS,
+    SUPPORTED_EXTENSIONS
+)
+
+
+class UploadTooLargeError(Exception):
+    """O upload excedeu o tamanho máximo permitido."""
+
+
+class UnsupportedUploadError(Exception):
+    """Nome de arquivo ausente ou extensão não suportada."""
+
+
+def upload_filename(upload: UploadFile) -> str:
+    """
+    Valida e retorna o nome do arquivo enviado (sem diretórios).
+
+    Raises:
+        UnsupportedUploadError: Nome ausente ou extensão não suportada
+    """
+    filename = os.path.basename((upload.filename or "").replace("\\", "/"))
+    if not filename:
+        raise UnsupportedUploadError("Nome do arquivo não fornecido")
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise UnsupportedUploadError(
+            f"Tipo de arquivo não suportado. Tipos permitidos: {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
+    return filename
+
+
+def upload_source(filename: str, sha256: str, directory: str = UPLOAD_TEMP_DIR) -> str:
+    """Nome lógico sob o qual um upload é indexado: <diretório>/<prefixo do hash>/<nome original>."""
+    return os.path.join(directory, sha256[:UPLOAD_SOURCE_HASH_CHARS], filename)
+
+
+async def spool_upload(upload: UploadFile, directory: str = UPLOAD_TEMP_DIR,
+                       max_bytes: Optional[int] = MAX_UPLOAD_BYTES,
+                       chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Copia um upload para um arquivo temporário único, em blocos.
+
+    Args:
+        upload: Arquivo recebido pelo FastAPI
+        directory: Diretório dos arquivos temporários
+        max_bytes: Tamanho máximo permitido (None = sem limite)
+        chunk_size: Tamanho de cada bloco lido/escrito
+
+    Returns:
+        Dicionário com filename, path (arquivo temporário), source (nome
+        lógico para o índice), size e sha256
+
+    Raises:
+        UnsupportedUploadError: Nome ausente ou extensão não suportada
+        UploadTooLargeError: O arquivo excedeu max_bytes (o temporário é removido)
+    """
+    filename = upload_filename(upload)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}{os.path.splitext(filename)[1].lower()}")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as buffer:
+            while block := await upload.read(chunk_size):
+                size += len(block)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"Arquivo excede o tamanho máximo de {max_bytes // (1024 * 1024)} MB"
+                    )
+                digest.update(block)
+                await run_in_threadpool(buffer.write, block)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    sha256 = digest.hexdigest()
+    return {
+        "filename": filename,
+        "path": path,
+        "source": upload_source(filename, sha256, directory),
+        "size": size,
+        "sha256": sha256
+    }
+
+
+def discard_upload(spooled: Dict[str, Any]):
+    """Remove o arquivo temporário de um upload."""
+    try:
+        os.remove(spooled["path"])
+    except FileNotFoundError:
+        pass
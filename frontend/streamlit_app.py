@@ -1421,9 +1421,6 @@ def render_files_page():
             
             if submitted:
                 with st.spinner("Carregando documento..."):
-                    # Ler o conteúdo do arquivo
-                    file_content = uploaded_file.read()
-                    
                     # Enviar para o backend
                     try:
                         headers = get_auth_headers()
@@ -1432,8 +1429,10 @@ def render_files_page():
                             return
                         
                         # Preparar dados para envio
+                        uploaded_file.seek(0)
                         files = {
-                            'file': (uploaded_file.name, file_content, uploaded_file.type)
+                            # O objeto de arquivo é enviado diretamente, sem cópia extra em memória
+                            'file': (uploaded_file.name, uploaded_file, uploaded_file.type)
                         }
                         data = {
                             'chunk_size': chunk_size,
@@ -1452,7 +1451,8 @@ def render_files_page():
                             result = response.json()
                             if result.get("success"):
                                 st.success(f"✅ {result.get('message')}")
-                                st.info(f"📊 {result.get('documents_count')} documentos processados")
+                                st.info(f"📊 {result.get('documents_count')} documentos processados "
+                                        f"({result.get('inserted_count', 0)} novos, {result.get('skipped_count', 0)} já indexados)")
                                 # Atualizar status
                                 status = make_api_request("/documents/status")
                                 if status:
@@ -1513,7 +1513,8 @@ def render_files_page():
                 
                 if response and response.get("success"):
                     st.success(f"✅ {response.get('message')}")
-                    st.info(f"📊 {response.get('documents_count')} documentos processados")
+                    st.info(f"📊 {response.get('documents_count')} documentos processados "
+                            f"({response.get('inserted_count', 0)} novos, {response.get('skipped_count', 0)} já indexados)")
                     # Atualizar status
                     status = make_api_request("/documents/status")
                     if status:
@@ -1701,6 +1702,31 @@ def render_files_page():
             
             # Botões de carregamento usando Streamlit
             st.markdown("### ⚡ Ações Rápidas")
+            if st.button(f"📚 Carregar todos ({len(backend_files)})", key="load_all_backend_files"):
+                with st.spinner(f"Carregando {len(backend_files)} arquivos..."):
+                    response = make_api_request(
+                        "/documents/bulk",
+                        "POST",
+                        {
+                            "files": [os.path.join(backend_path, file_info['name']) for file_info in backend_files],
+                            "chunk_size": 600,
+                            "chunk_overlap": 200
+                        }
+                    )
+                    
+                    if response and response.get("success"):
+                        st.success(
+                            f"✅ {response.get('message')} "
+                            f"({response.get('inserted_count', 0)} chunks em {response.get('seconds', 0):.1f}s)"
+                        )
+                        st.rerun()
+                    elif response:
+                        st.warning(f"⚠️ {response.get('message')}")
+                        for failure in response.get("failed", []):
+                            st.error(f"❌ {os.path.basename(failure['file'])}: {failure['error']}")
+                    else:
+                        st.error("❌ Falha ao carregar os arquivos")
+            
             for file_info in backend_files:
                 col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
                 with col1: